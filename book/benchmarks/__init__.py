@@ -0,0 +1,7 @@
+"""
+Benchmarks for the ``healthgis`` helpers on the bundled datasets.
+
+Run them from the ``book/`` directory, e.g. ``python -m benchmarks.bench_io``.
+The suite of notebook operations, stored per commit to spot regressions,
+runs with ``python -m benchmarks.run``.
+"""
@@ -0,0 +1,88 @@
+"""
+Dissolve of the land use polygons by class: ``GeoDataFrame.dissolve``
+versus :func:`healthgis.dissolve.dissolve`, and the union of the African
+countries: ``union_all`` versus :func:`healthgis.dissolve.union_all`.
+
+Checks that the dissolved geometries are the same (up to floating point
+noise along the merged edges) and reports the time for 1 up to
+``--max-workers`` worker processes.
+
+    python -m benchmarks.bench_dissolve --max-workers 4
+"""
+
+import argparse
+import os
+
+import pandas as pd
+import geopandas
+
+from healthgis import dissolve
+from healthgis.paths import DATA_DIR
+
+from ._common import best_of
+
+# Maximum area of the symmetric difference with the reference result,
+# relative to the area of the reference geometry.
+RTOL = 1e-9
+
+
+def check_same(result, expected):
+    difference = result.symmetric_difference(expected, align=False).area
+    if (difference > RTOL * expected.area.values).any():
+        raise AssertionError("dissolved geometries differ from the reference")
+
+
+def run(max_workers=None, repeat=3):
+    land_use = geopandas.read_file(DATA_DIR / "paris_land_use.zip")
+    countries = geopandas.read_file(DATA_DIR / "ne_110m_admin_0_countries.zip")
+    africa = countries[countries["continent"] == "Africa"]
+
+    expected = land_use.dissolve(by="class")
+    expected_africa = geopandas.GeoSeries([africa.union_all()])
+    records = [
+        {"case": "land use by class", "method": "GeoDataFrame.dissolve",
+         "seconds": best_of(lambda: land_use.dissolve(by="class"), repeat)},
+        {"case": "africa", "method": "GeoSeries.union_all",
+         "seconds": best_of(lambda: africa.union_all(), repeat)},
+    ]
+    for n in range(1, (max_workers or os.cpu_count() or 1) + 1):
+        result = dissolve.dissolve(land_use, by="class", max_workers=n)
+        check_same(result.geometry, expected.geometry)
+        records.append({
+            "case": "land use by class",
+            "method": "dissolve ({} workers)".format(n),
+            "seconds": best_of(
+                lambda: dissolve.dissolve(land_use, by="class", max_workers=n),
+                repeat,
+            ),
+        })
+        result = dissolve.union_all(africa.geometry, chunk_size=8, max_workers=n)
+        check_same(geopandas.GeoSeries([result]), expected_africa)
+        records.append({
+            "case": "africa",
+            "method": "union_all ({} workers)".format(n),
+            "seconds": best_of(
+                lambda: dissolve.union_all(africa.geometry, chunk_size=8,
+                                           max_workers=n),
+                repeat,
+            ),
+        })
+    timings = pd.DataFrame(records).sort_values("case", kind="stable")
+    timings = timings.set_index(["case", "method"])
+    baseline = timings.groupby(level="case")["seconds"].transform("first")
+    timings["speedup"] = baseline / timings["seconds"]
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    timings = run(args.max_workers, args.repeat)
+    print("Dissolved geometries identical to the geopandas reference")
+    print(timings.round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
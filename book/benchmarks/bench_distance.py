@@ -0,0 +1,103 @@
+"""
+Distances between the world's populated places: reprojection followed by
+planar distances, versus the ``haversine`` and ``geodesic`` modes of
+:func:`healthgis.distance.distance`, and the nearest populated place with
+a planar versus a spherical :class:`healthgis.knn.PointIndex`.
+
+Reports the time of each method and its error relative to the geodesic
+distance on the WGS 84 ellipsoid.
+
+    python -m benchmarks.bench_distance --pairs 1000000
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+import geopandas
+
+from healthgis.crs import to_crs
+from healthgis.distance import distance, geodesic, lonlat
+from healthgis.knn import PointIndex
+from healthgis.paths import DATA_DIR
+
+from ._common import best_of
+
+# World equidistant cylindrical, a typical "one CRS for everything" choice.
+PLANAR_CRS = "EPSG:4087"
+
+
+def relative_error(result, expected):
+    keep = expected > 0
+    error = np.abs(result[keep] - expected[keep]) / expected[keep]
+    return {"median error": np.median(error), "max error": error.max()}
+
+
+def distance_records(places, pairs, repeat, seed=0):
+    rng = np.random.default_rng(seed)
+    i, j = rng.integers(0, len(places), (2, pairs))
+    lon, lat = lonlat(places)
+
+    def planar():
+        projected = to_crs(places.geometry, PLANAR_CRS)
+        x, y = projected.x.values, projected.y.values
+        return distance(x[i], y[i], x[j], y[j])
+
+    methods = {
+        "reproject + planar": planar,
+        "haversine": lambda: distance(lon[i], lat[i], lon[j], lat[j],
+                                      mode="haversine"),
+        "geodesic": lambda: geodesic(lon[i], lat[i], lon[j], lat[j]),
+    }
+    expected = methods["geodesic"]()
+    return [
+        {"case": "{} pairs".format(pairs), "method": name,
+         "seconds": best_of(func, repeat),
+         **relative_error(func(), expected)}
+        for name, func in methods.items()
+    ]
+
+
+def knn_records(places, repeat):
+    def planar():
+        projected = to_crs(places, PLANAR_CRS)
+        return PointIndex(projected).query(projected, k=2)
+
+    def spherical():
+        return PointIndex(places, metric="haversine").query(places, k=2)
+
+    # The nearest neighbour other than the place itself.
+    expected_ids, _ = spherical()
+    lon, lat = lonlat(places)
+    nearest = places.index.get_indexer(expected_ids[:, 1])
+    expected = geodesic(lon, lat, lon[nearest], lat[nearest])
+    records = []
+    for name, func in [("reproject + planar kNN", planar),
+                       ("spherical kNN", spherical)]:
+        ids, distances = func()
+        records.append({
+            "case": "nearest place", "method": name,
+            "seconds": best_of(func, repeat),
+            "same neighbour": (ids[:, 1] == expected_ids[:, 1]).mean(),
+            **relative_error(distances[:, 1], expected),
+        })
+    return records
+
+
+def run(pairs=1_000_000, repeat=5):
+    places = geopandas.read_file(DATA_DIR / "ne_110m_populated_places.zip")
+    places = places[["geometry"]].to_crs("EPSG:4326")
+    records = distance_records(places, pairs, repeat) + knn_records(places, repeat)
+    return pd.DataFrame(records).set_index(["case", "method"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pairs", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(run(args.pairs, args.repeat).to_string(float_format="{:.4g}".format))
+
+
+if __name__ == "__main__":
+    main()
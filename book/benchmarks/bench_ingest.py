@@ -0,0 +1,89 @@
+"""
+Construction of points from a "lat, lon" string column: a ``Point`` per
+row with ``Series.map``, as in ``data/data-preparation.ipynb``, versus
+:func:`healthgis.ingest.points_from_xy`.
+
+The line list is synthetic, with a fraction of missing and malformed
+coordinates, and is also written to a CSV file to time
+:func:`healthgis.ingest.read_csv` with and without ``chunksize``.
+
+    python -m benchmarks.bench_ingest --rows 1000000
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import geopandas
+from shapely.geometry import Point
+
+from healthgis import ingest
+
+from ._common import best_of
+
+
+def line_list(rows, invalid=0.01, seed=0):
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(48.81, 48.90, rows).round(6)
+    lon = rng.uniform(2.25, 2.42, rows).round(6)
+    xy = pd.Series(lat.astype(str)).str.cat(lon.astype(str), sep=", ")
+    bad = rng.random(rows) < invalid
+    xy[bad] = rng.choice([None, "", "n/a", "48.85"], bad.sum())
+    return pd.DataFrame({"case_id": np.arange(rows), "XY": xy})
+
+
+def per_row(df):
+    df = df.dropna(subset=["XY"])
+    df = df[df["XY"].str.contains(", ")]
+    geometry = df["XY"].str.split(", ").map(
+        lambda x: Point(float(x[1]), float(x[0]))
+    )
+    return geopandas.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
+
+
+def run(rows=1_000_000, chunksize=100_000, repeat=3):
+    df = line_list(rows)
+    expected = per_row(df)
+    result = ingest.points_from_xy(df, xy="XY")
+    if not (result.index.equals(expected.index)
+            and result.geom_equals(expected).all()):
+        raise AssertionError("points differ from the per-row reference")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "cases.csv"
+        df.to_csv(path, index=False)
+        records = [
+            {"method": "Series.map(Point)",
+             "seconds": best_of(lambda: per_row(df), repeat)},
+            {"method": "points_from_xy",
+             "seconds": best_of(lambda: ingest.points_from_xy(df, xy="XY"),
+                                repeat)},
+            {"method": "read_csv",
+             "seconds": best_of(lambda: ingest.read_csv(path, xy="XY"), repeat)},
+            {"method": "read_csv (chunksize={})".format(chunksize),
+             "seconds": best_of(
+                 lambda: sum(len(chunk) for chunk in ingest.read_csv(
+                     path, xy="XY", chunksize=chunksize)),
+                 repeat,
+             )},
+        ]
+    timings = pd.DataFrame(records).set_index("method")
+    timings["speedup"] = timings["seconds"].iloc[0] / timings["seconds"]
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    timings = run(args.rows, args.chunksize, args.repeat)
+    print("Points identical to the per-row reference")
+    print(timings.round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Load time of every dataset in ``book/data`` per file format.
+
+Each dataset is written as shapefile, GeoJSON and GeoPackage to a temporary
+directory and read back with ``geopandas.read_file``, and compared with the
+GeoParquet cache of :mod:`healthgis.parquet` (full read and a read of the
+attribute columns only).
+
+    python -m benchmarks.bench_io
+"""
+
+import argparse
+import tempfile
+import warnings
+from pathlib import Path
+
+import pandas as pd
+import geopandas
+
+from healthgis import parquet
+from healthgis.paths import resolve
+
+from ._common import best_of
+
+FORMATS = {
+    "shapefile": ("ESRI Shapefile", ".shp"),
+    "geojson": ("GeoJSON", ".geojson"),
+    "gpkg": ("GPKG", ".gpkg"),
+}
+
+
+def run(repeat=5):
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in parquet.datasets():
+            source = resolve(path)[1]
+            gdf = geopandas.read_file(source)
+            parquet.convert(path, cache_dir=tmp)
+            attributes = [c for c in gdf.columns if c != gdf.geometry.name]
+            record = {"dataset": path.name, "rows": len(gdf)}
+
+            for name, (driver, suffix) in FORMATS.items():
+                target = Path(tmp) / (path.stem + suffix)
+                try:
+                    with warnings.catch_warnings():
+                        warnings.simplefilter("ignore")
+                        gdf.to_file(target, driver=driver)
+                except Exception:
+                    record[name] = float("nan")
+                    continue
+                record[name] = best_of(lambda: geopandas.read_file(target), repeat)
+
+            record["parquet"] = best_of(
+                lambda: parquet.read(path, cache_dir=tmp), repeat
+            )
+            record["parquet (columns)"] = best_of(
+                lambda: parquet.read(path, columns=attributes, cache_dir=tmp),
+                repeat,
+            )
+            records.append(record)
+    return pd.DataFrame(records).set_index("dataset")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    result = run(repeat=args.repeat)
+    timings = result.drop(columns="rows")
+    print("Load time (ms)")
+    print((timings * 1000).round(2).to_string())
+    print()
+    print("Speedup of the GeoParquet cache")
+    print(timings.drop(columns=["parquet", "parquet (columns)"])
+          .div(timings["parquet"], axis=0).round(1).to_string())
+
+
+if __name__ == "__main__":
+    main()
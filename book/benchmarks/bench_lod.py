@@ -0,0 +1,77 @@
+"""
+GeoJSON payload of a layer at full resolution versus the levels of a
+:func:`healthgis.lod.build_pyramid` pyramid.
+
+Runs on the Natural Earth countries and on the Paris districts split into
+``--cells`` densified Voronoi cells (:func:`healthgis.synthetic.polygons_like`),
+a stand-in for fine administrative boundaries. Reports the size of the
+serialized GeoJSON (with a single name property) and the time to
+serialize it for each zoom level, and the time to build the pyramid.
+
+    python -m benchmarks.bench_lod --cells 20000
+"""
+
+import argparse
+import json
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+import geopandas
+
+from healthgis.lod import build_pyramid
+from healthgis.paths import DATA_DIR
+from healthgis.synthetic import polygons_like
+
+from ._common import best_of
+
+ZOOMS = (0, 4, 8, 10, 12, 14)
+
+
+def payload_records(name, data, columns, repeat, tmpdir):
+    path = Path(tmpdir) / "{}.gpkg".format(name)
+    build = best_of(
+        lambda: path.unlink(missing_ok=True) or build_pyramid(
+            data, max_zoom=max(ZOOMS), path=path),
+        repeat=1,
+    )
+    pyramid = build_pyramid(data, max_zoom=max(ZOOMS), path=path)
+    full = data[columns + ["geometry"]].to_crs("EPSG:4326").__geo_interface__
+    records = [{
+        "layer": name, "zoom": "full", "MB": len(json.dumps(full)) / 1e6,
+        "seconds": best_of(lambda: json.dumps(full), repeat),
+        "build seconds": build,
+    }]
+    for zoom in ZOOMS:
+        records.append({
+            "layer": name, "zoom": zoom,
+            "MB": len(json.dumps(pyramid.geojson(zoom, columns))) / 1e6,
+            "seconds": best_of(
+                lambda: json.dumps(pyramid.geojson(zoom, columns)), repeat),
+        })
+    return records
+
+
+def run(cells=20_000, repeat=3):
+    countries = geopandas.read_file(DATA_DIR / "ne_110m_admin_0_countries.zip")
+    districts = geopandas.read_file(DATA_DIR / "paris_districts_utm.geojson")
+    cells = polygons_like(districts, cells, seed=0, max_segment_length=10)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        records = (
+            payload_records("countries", countries, ["name"], repeat, tmpdir)
+            + payload_records("district cells", cells, ["district_name"],
+                              repeat, tmpdir)
+        )
+    return pd.DataFrame(records).set_index(["layer", "zoom"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cells", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(run(args.cells, args.repeat).to_string(float_format="{:.4g}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Land use x districts intersection: ``geopandas.overlay`` versus
+:func:`healthgis.overlay.overlay_intersection`.
+
+Checks that the total area per land use class is identical, and reports
+the time of both for 1 up to ``--max-workers`` worker processes.
+
+    python -m benchmarks.bench_overlay --max-workers 4
+"""
+
+import argparse
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import geopandas
+
+from healthgis.overlay import overlay_intersection
+from healthgis.paths import DATA_DIR
+
+from ._common import best_of
+
+
+def load():
+    land_use = geopandas.read_file(DATA_DIR / "paris_land_use.zip")
+    districts = geopandas.read_file(DATA_DIR / "paris_districts.geojson")
+    return land_use, districts.to_crs(land_use.crs)
+
+
+def area_per_class(df):
+    return df.geometry.area.groupby(df["class"]).sum()
+
+
+def run(max_workers=None, repeat=3):
+    land_use, districts = load()
+    with warnings.catch_warnings():
+        # geopandas warns about the dropped line intersections.
+        warnings.simplefilter("ignore", UserWarning)
+        expected = geopandas.overlay(land_use, districts, how="intersection")
+        baseline = best_of(
+            lambda: geopandas.overlay(land_use, districts, how="intersection"),
+            repeat,
+        )
+
+    records = [{"method": "geopandas.overlay", "seconds": baseline}]
+    for n in range(1, (max_workers or os.cpu_count() or 1) + 1):
+        result = overlay_intersection(land_use, districts, max_workers=n)
+        np.testing.assert_allclose(area_per_class(result),
+                                   area_per_class(expected), rtol=1e-9)
+        seconds = best_of(
+            lambda: overlay_intersection(land_use, districts, max_workers=n),
+            repeat,
+        )
+        records.append({"method": "overlay_intersection ({} workers)".format(n),
+                        "seconds": seconds})
+    timings = pd.DataFrame(records).set_index("method")
+    timings["speedup"] = baseline / timings["seconds"]
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    timings = run(args.max_workers, args.repeat)
+    print("Total area per class identical to geopandas.overlay")
+    print(timings.round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Scaling of the parallel tree density job with the number of workers.
+
+The Paris trees are copied ``--factor`` times to get a realistic workload,
+and :func:`healthgis.partition.scaling_curve` times
+:func:`healthgis.partition.parallel_count_within` for 1 up to
+``--max-workers`` workers. Reports the wall time, the speedup relative to
+one worker and the parallel efficiency.
+
+    python -m benchmarks.bench_partition --factor 50 --max-workers 8
+"""
+
+import argparse
+import os
+
+import pandas as pd
+import geopandas
+
+from healthgis.partition import scaling_curve
+from healthgis.paths import DATA_DIR
+
+
+def run(factor=50, max_workers=None, repeat=3):
+    trees = geopandas.read_file(DATA_DIR / "paris_trees.gpkg")
+    districts = geopandas.read_file(
+        DATA_DIR / "paris_districts.geojson"
+    ).to_crs(trees.crs)
+    trees = pd.concat([trees] * factor, ignore_index=True)
+    return scaling_curve(trees, districts, by="district_name",
+                         max_workers=max_workers, repeat=repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--factor", type=int, default=50)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    curve = run(args.factor, args.max_workers, args.repeat)
+    print(curve.to_string(float_format="{:.3g}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+One map per Paris district: a ``GeoDataFrame.plot`` loop versus
+:func:`healthgis.render.render_maps` with 1 up to ``--max-workers`` worker
+processes.
+
+Reports the figures per second of each method, and the speedup and
+parallel efficiency of the workers relative to one worker.
+
+    python -m benchmarks.bench_render --figures 400 --max-workers 4
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import geopandas
+import matplotlib
+
+from healthgis.paths import DATA_DIR
+from healthgis.render import render_maps
+
+CRS = "EPSG:2154"
+
+
+def specs(districts, figures):
+    names = districts["district_name"]
+    return [
+        {"name": "map{}".format(i), "column": "population", "scheme": "quantiles",
+         "filter": "district_name == {!r}".format(names.iloc[i % len(names)])}
+        for i in range(figures)
+    ]
+
+
+def plot_loop(districts, specs, out_dir):
+    """The notebook way: reproject, plot and save one figure at a time."""
+    import matplotlib.pyplot as plt
+
+    for spec in specs:
+        projected = districts.to_crs(CRS)
+        ax = projected.plot(column=spec["column"], scheme=spec["scheme"],
+                            legend=True, figsize=(8, 8))
+        minx, miny, maxx, maxy = projected.query(spec["filter"]).total_bounds
+        ax.set_xlim(minx, maxx)
+        ax.set_ylim(miny, maxy)
+        ax.set_title(spec["name"])
+        ax.set_axis_off()
+        ax.figure.savefig(Path(out_dir) / "{}.png".format(spec["name"]))
+        plt.close(ax.figure)
+
+
+def run(figures=200, max_workers=None):
+    matplotlib.use("Agg")
+    max_workers = max_workers or os.cpu_count() or 1
+    districts = geopandas.read_file(DATA_DIR / "paris_districts.geojson")
+    tasks = specs(districts, figures)
+    records = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        start = time.perf_counter()
+        plot_loop(districts, tasks, out_dir)
+        records.append(("GeoDataFrame.plot", 1, time.perf_counter() - start))
+        for n in range(1, max_workers + 1):
+            start = time.perf_counter()
+            render_maps(districts, tasks, out_dir, crs=CRS, max_workers=n)
+            records.append(("render_maps", n, time.perf_counter() - start))
+    table = pd.DataFrame(records, columns=["method", "workers", "seconds"])
+    table["figures/s"] = figures / table["seconds"]
+    single = table.loc[table["method"] == "render_maps", "seconds"].iloc[0]
+    table["speedup"] = single / table["seconds"]
+    table["efficiency"] = table["speedup"] / table["workers"]
+    return table.set_index(["method", "workers"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--figures", type=int, default=200)
+    parser.add_argument("--max-workers", type=int)
+    args = parser.parse_args()
+    print(run(args.figures, args.max_workers).to_string(
+        float_format="{:.4g}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Peak memory of the tree density job: full read versus streaming.
+
+Synthetic tree layers of increasing size are made by jittering copies of
+``paris_trees.gpkg``. For every size, the trees-by-district counts are
+computed once by reading the whole file (``geopandas.read_file`` +
+``sjoin``) and once with :func:`healthgis.streaming.count_within`, each in
+a fresh process, and the peak resident memory of that process is reported.
+
+    python -m benchmarks.bench_streaming --sizes 100000 1000000
+"""
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import geopandas
+
+from healthgis import partition, streaming
+from healthgis.paths import DATA_DIR
+
+
+def make_trees(n, path, seed=0):
+    """Write ``n`` trees, resampled from the Paris trees with 50 m jitter."""
+    trees = geopandas.read_file(DATA_DIR / "paris_trees.gpkg")
+    rng = np.random.default_rng(seed)
+    sample = trees.iloc[rng.integers(0, len(trees), n)].reset_index(drop=True)
+    x = sample.geometry.x + rng.normal(0, 50, n)
+    y = sample.geometry.y + rng.normal(0, 50, n)
+    sample["geometry"] = geopandas.points_from_xy(x, y, crs=trees.crs)
+    sample.to_file(path, driver="GPKG")
+
+
+def _full(path, districts):
+    trees = geopandas.read_file(path)
+    return partition.count_within(trees, districts, "district_name")
+
+
+def _streaming(path, districts, chunksize):
+    return streaming.count_within(path, districts, "district_name",
+                                  chunksize=chunksize)
+
+
+def peak_rss_mb():
+    """Peak resident memory of the current process, in MB."""
+    try:
+        # Unlike ru_maxrss, VmHWM is reset on exec, so a spawned process
+        # does not report the peak of the parent it was forked from.
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux, but in bytes on macOS.
+    return maxrss / (2**20 if sys.platform == "darwin" else 1024)
+
+
+def _measure(func, args, queue):
+    start = time.perf_counter()
+    counts = func(*args)
+    seconds = time.perf_counter() - start
+    queue.put((peak_rss_mb(), seconds, int(counts.sum())))
+
+
+def measure(func, *args):
+    """Run ``func(*args)`` in a fresh process, return (peak MB, seconds, n)."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(func, args, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def run(sizes, chunksize=50_000):
+    districts = geopandas.read_file(DATA_DIR / "paris_districts.geojson")
+    districts = districts.to_crs("EPSG:32631")[["district_name", "geometry"]]
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = Path(tmp) / "trees_{}.gpkg".format(n)
+            make_trees(n, path)
+            full = measure(_full, path, districts)
+            stream = measure(_streaming, path, districts, chunksize)
+            if full[2] != stream[2]:
+                raise AssertionError("streaming counts differ from the full read")
+            records.append({
+                "trees": n,
+                "full peak MB": full[0], "streaming peak MB": stream[0],
+                "full s": full[1], "streaming s": stream[1],
+            })
+            path.unlink()
+    return pd.DataFrame(records).set_index("trees")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[100_000, 300_000, 1_000_000])
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    args = parser.parse_args()
+    print(run(args.sizes, chunksize=args.chunksize).round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
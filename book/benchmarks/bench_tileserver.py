@@ -0,0 +1,135 @@
+"""
+Load test of :class:`healthgis.tileserver.TileServer`.
+
+Requests the tiles covering each layer at a range of zoom levels, from
+``--clients`` concurrent keep-alive connections, first with an empty tile
+cache (tiles are encoded on demand) and then again with a warm cache.
+Reports the tiles per second, the median and 99th percentile latency, and
+the volume served for each pass.
+
+    python -m benchmarks.bench_tileserver --clients 8 --zooms 0 14
+
+Pass ``--url`` to load test a server that is already running, e.g. one
+started with ``python -m healthgis.tileserver``; its cache is only cold if
+it was just started.
+"""
+
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+import geopandas
+
+from healthgis.paths import resolve
+from healthgis.tiles import ORIGIN, tiles_for_bounds, to_mercator
+from healthgis.tileserver import LAYERS, TileServer
+
+# Tiles requested per layer and zoom level, at most.
+MAX_TILES = 64
+
+
+def requests(layers, zooms, max_tiles=MAX_TILES):
+    """``/<layer>/<z>/<x>/<y>.pbf`` paths of tiles covering each layer."""
+    paths = []
+    for name, dataset in layers.items():
+        minx, miny, maxx, maxy = to_mercator(
+            geopandas.read_file(resolve(dataset)[1])).total_bounds
+        cx, cy = (minx + maxx) / 2, (miny + maxy) / 2
+        for z in zooms:
+            # The tiles around the center of the layer, as a map window
+            # would show, rather than all tiles of the world at deep zooms.
+            half = 4 * 2 * ORIGIN / 2 ** z
+            window = (max(minx, cx - half), max(miny, cy - half),
+                      min(maxx, cx + half), min(maxy, cy + half))
+            paths.extend("/{}/{}/{}/{}.pbf".format(name, z, x, y)
+                         for x, y in tiles_for_bounds(window, z)[:max_tiles])
+    return paths
+
+
+async def _client(host, port, paths, latencies, sizes):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for path in paths:
+            start = time.perf_counter()
+            writer.write("GET {} HTTP/1.1\r\nHost: {}\r\n\r\n".format(
+                path, host).encode())
+            await writer.drain()
+            status = await reader.readline()
+            length = 0
+            while True:
+                header = await reader.readline()
+                if header in (b"\r\n", b""):
+                    break
+                key, _, value = header.decode("latin-1").partition(":")
+                if key.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            sizes.append(length)
+            if b" 200 " not in status:
+                raise RuntimeError("{} {}".format(path, status.decode().strip()))
+    finally:
+        writer.close()
+
+
+async def load(host, port, paths, clients):
+    """Request ``paths`` from ``clients`` connections; return the timings."""
+    latencies, sizes = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, paths[i::clients], latencies, sizes)
+        for i in range(clients)
+    ))
+    seconds = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    return {
+        "tiles": len(latencies),
+        "tiles/s": len(latencies) / seconds,
+        "p50 ms": np.percentile(latencies, 50),
+        "p99 ms": np.percentile(latencies, 99),
+        "max ms": latencies.max(),
+        "MB": sum(sizes) / 1e6,
+    }
+
+
+def run(zooms=range(0, 15), clients=8, url=None, seed=0):
+    paths = requests(LAYERS, zooms)
+    # Shuffle, as a map pans and zooms over several layers at once.
+    np.random.default_rng(seed).shuffle(paths)
+    server = None
+    if url is None:
+        server = TileServer(port=0).start()
+        host, port = server.host, server.port
+        # Read the layers and build their pyramids before timing.
+        for name in LAYERS:
+            server.layer(name)
+    else:
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or 80
+    try:
+        records = {}
+        for name in ("cold", "warm"):
+            records[name] = asyncio.run(load(host, port, paths, clients))
+    finally:
+        if server is not None:
+            server.stop()
+    return pd.DataFrame(records).T
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--zooms", type=int, nargs=2, default=[0, 14],
+                        metavar=("MIN", "MAX"))
+    parser.add_argument("--url", help="server to test, e.g. http://127.0.0.1:8765")
+    args = parser.parse_args()
+    zooms = range(args.zooms[0], args.zooms[1] + 1)
+    print(run(zooms, args.clients, args.url).to_string(
+        float_format="{:.4g}".format))
+
+
+if __name__ == "__main__":
+    main()
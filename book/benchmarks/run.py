@@ -0,0 +1,140 @@
+"""
+Run the benchmark suite and store the timings of the current commit.
+
+The results are written to ``benchmarks/results/<commit>.json`` together
+with the versions of the geospatial stack, so that a regression after a
+geopandas, shapely or GDAL upgrade shows up when comparing two commits.
+
+    python -m benchmarks.run --scales 1 10 100
+    python -m benchmarks.run --compare HEAD~1
+"""
+
+import argparse
+import datetime
+import fnmatch
+import json
+import platform
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import geopandas
+import pyogrio
+import pyproj
+import shapely
+
+from ._common import best_of
+from .suite import CASES, SCALES, Data
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Slowdown relative to the reference reported as a regression.
+THRESHOLD = 1.2
+
+
+def git(*args):
+    return subprocess.run(
+        ["git", *args], capture_output=True, text=True, check=True,
+        cwd=Path(__file__).parent,
+    ).stdout.strip()
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "node": platform.node(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "geopandas": geopandas.__version__,
+        "shapely": shapely.__version__,
+        "geos": shapely.geos_version_string,
+        "pyproj": pyproj.__version__,
+        "proj": pyproj.proj_version_str,
+        "pyogrio": pyogrio.__version__,
+        "gdal": pyogrio.__gdal_version_string__,
+    }
+
+
+def run(scales=(1, 10, 100), pattern="*", repeat=3, verbose=True):
+    """Time the cases matching ``pattern`` at each scale."""
+    records = []
+    for scale in scales:
+        data = Data(scale)
+        for name, (notebook, func) in CASES.items():
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            seconds = best_of(lambda: func(data), repeat)
+            records.append({"case": name, "notebook": notebook,
+                            "scale": scale, "seconds": seconds})
+            if verbose:
+                print("{:>10.4f}s  {:>5}x  {}".format(seconds, scale, name))
+    return records
+
+
+def save(records, results_dir=RESULTS_DIR):
+    commit = git("rev-parse", "--short=12", "HEAD")
+    result = {
+        "commit": commit,
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "results": records,
+    }
+    path = Path(results_dir) / "{}.json".format(commit)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=1)
+    return path
+
+
+def load(ref, results_dir=RESULTS_DIR):
+    """Results of a commit (any git revision) or of a results file."""
+    path = Path(ref)
+    if not path.exists():
+        path = Path(results_dir) / "{}.json".format(
+            git("rev-parse", "--short=12", ref)
+        )
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(records, reference, threshold=THRESHOLD):
+    """Ratio of the timings to those of ``reference``, flagging regressions."""
+    index = ["case", "scale"]
+    current = pd.DataFrame(records).set_index(index)["seconds"]
+    before = pd.DataFrame(reference["results"]).set_index(index)["seconds"]
+    table = pd.DataFrame({"before": before, "after": current}).dropna()
+    table["ratio"] = table["after"] / table["before"]
+    table["regression"] = table["ratio"] > threshold
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        choices=SCALES)
+    parser.add_argument("-k", "--cases", default="*",
+                        help="glob pattern of the cases to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compare", metavar="REF",
+                        help="commit or results file to compare with")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    records = run(args.scales, args.cases, args.repeat)
+    if not args.no_save:
+        print("Results written to", save(records))
+    if args.compare:
+        reference = load(args.compare)
+        table = compare(records, reference)
+        print("Compared with {} ({})".format(
+            reference["commit"], reference["environment"]["geopandas"]))
+        print(table.round(4).to_string())
+        if table["regression"].any():
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+The core spatial operation of each notebook as a timed benchmark case.
+
+Every case runs on the bundled ``book/data`` layers, scaled up with
+:func:`benchmarks._common.tile` (10x, 100x, 1000x the points and polygons)
+to expose how the operation scales. Cases are registered with the
+:func:`case` decorator and run by :mod:`benchmarks.run`; like asv, the
+``setup`` work is done once per scale and is not timed.
+"""
+
+import functools
+import tempfile
+from pathlib import Path
+
+import geopandas
+import shapely
+
+from healthgis.paths import resolve
+
+from ._common import tile
+
+SCALES = (1, 10, 100, 1000)
+
+# All Paris layers are compared in the UTM zone of the districts.
+CRS = "EPSG:32631"
+
+CASES = {}
+
+
+def case(notebook):
+    """Register a benchmark case, timing ``func(Data(scale))``."""
+    def decorate(func):
+        CASES[func.__name__] = (notebook, func)
+        return func
+    return decorate
+
+
+@functools.lru_cache(maxsize=None)
+def _paris():
+    layers = {
+        "districts": "paris_districts_utm.geojson",
+        "stations": "paris_bike_stations.geojson",
+        "trees": "paris_trees.gpkg",
+        "land_use": "paris_land_use.zip",
+    }
+    layers = {
+        name: geopandas.read_file(resolve(path)[1]).to_crs(CRS)
+        for name, path in layers.items()
+    }
+    # Reprojection leaves a few land use polygons self-intersecting.
+    land_use = layers["land_use"]
+    land_use.geometry = shapely.make_valid(
+        land_use.geometry.values, method="structure", keep_collapsed=False
+    )
+    bounds = geopandas.GeoSeries(
+        [shapely.box(*layer.total_bounds) for layer in layers.values()]
+    ).total_bounds
+    return layers, tuple(bounds)
+
+
+class Data:
+    """The Paris layers scaled up ``scale`` times, aligned on one grid."""
+
+    def __init__(self, scale):
+        self.scale = scale
+        layers, self.bounds = _paris()
+        for name, layer in layers.items():
+            setattr(self, name, tile(layer, scale, self.bounds))
+        self.center = shapely.Point(
+            (self.bounds[0] + self.bounds[2]) / 2,
+            (self.bounds[1] + self.bounds[3]) / 2,
+        )
+        self._tmp = tempfile.TemporaryDirectory()
+        self.districts_file = Path(self._tmp.name) / "districts.gpkg"
+        self.districts.to_file(self.districts_file)
+
+
+@case("01_GeospatialData")
+def read_file(data):
+    return geopandas.read_file(data.districts_file)
+
+
+@case("02-coordinate-reference-systems")
+def to_crs(data):
+    return data.trees.to_crs("EPSG:4326")
+
+
+@case("03-spatial-relationships-operations")
+def contains(data):
+    return data.districts.contains(data.center)
+
+
+@case("03-spatial-relationships-operations")
+def distance(data):
+    return data.trees.distance(data.center)
+
+
+@case("04-spatial-joins")
+def sjoin(data):
+    return geopandas.sjoin(data.stations, data.districts, predicate="within")
+
+
+@case("04-spatial-joins")
+def overlay(data):
+    return geopandas.overlay(data.land_use, data.districts, how="intersection")
+
+
+@case("04-spatial-joins")
+def dissolve(data):
+    return data.land_use.dissolve(by="class")
+
+
+@case("04-spatial-joins")
+def union_all(data):
+    return data.districts.union_all()
+
+
+@case("case-conflict-mapping")
+def sjoin_nearest(data):
+    return geopandas.sjoin_nearest(data.stations, data.trees)
+
+
+@case("06-scaling-geopandas-dask")
+def count_within(data):
+    joined = geopandas.sjoin(data.trees, data.districts, predicate="within")
+    return joined.groupby("district_name").size()
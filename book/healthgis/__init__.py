@@ -0,0 +1,15 @@
+"""
+Reusable helpers for the HealthGIS with Python notebooks.
+
+The package is importable from the notebooks, whatever their directory,
+when ``book/`` is on the ``PYTHONPATH`` (see the README)::
+
+    from healthgis import nearest
+"""
+
+from .paths import DATA_DIR, CACHE_DIR
+from .crs import reproject
+from .nearest import nearest
+from .registry import load_layer
+
+__all__ = ["DATA_DIR", "CACHE_DIR", "nearest", "load_layer", "reproject"]
@@ -0,0 +1,405 @@
+"""
+Offline basemaps from a local MBTiles tile store.
+
+``contextily.add_basemap`` downloads the web map tiles behind a plot every
+time a figure is drawn. :class:`TileStore` keeps the tiles of a provider in
+an `MBTiles <https://github.com/mapbox/mbtiles-spec>`_ file (a SQLite
+database) instead: :meth:`TileStore.prefetch` downloads the tiles of an
+area and a range of zoom levels once, and :func:`add_basemap` draws the
+basemap of a matplotlib axes from the store only, with decoded tiles kept
+in an LRU cache. Figures are then drawn without network access, from the
+same tiles every time. The MBTiles file can be copied to machines that
+have no network access at all.
+
+>>> from healthgis.basemap import TileStore, add_basemap
+>>> store = TileStore()
+>>> store.prefetch((2.22, 48.81, 2.47, 48.91), zooms=range(10, 16))
+>>> ax = stations.to_crs(epsg=3857).plot()
+>>> add_basemap(ax, store=store)
+
+or, from ``book/``::
+
+    python -m healthgis.basemap --dataset paris_districts.geojson --zooms 10 15
+"""
+
+import argparse
+import io
+import sqlite3
+import threading
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import geopandas
+import shapely
+from PIL import Image
+from pyproj import CRS
+
+from .crs import get_transformer
+from .paths import CACHE_DIR, resolve
+from .tiles import (MAX_LATITUDE, MERCATOR, ORIGIN, tile_bounds,
+                    tiles_for_bounds, zoom_for_bounds)
+
+OSM = {
+    "name": "OpenStreetMap",
+    "url": "https://tile.openstreetmap.org/{z}/{x}/{y}.png",
+    "attribution": "(C) OpenStreetMap contributors",
+}
+
+# Number of decoded tiles kept in memory, per store.
+CACHE_SIZE = 256
+
+# Largest number of tiles downloaded by one prefetch, to stay within the
+# usage policies of public tile servers.
+MAX_TILES = 50_000
+
+USER_AGENT = "healthgis-basemap"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS tiles (
+    zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB,
+    PRIMARY KEY (zoom_level, tile_column, tile_row)
+);
+"""
+
+
+def _build_url(provider, z, x, y):
+    # contextily / xyzservices providers know how to fill their templates.
+    if hasattr(provider, "build_url"):
+        return provider.build_url(x=x, y=y, z=z)
+    return provider["url"].format(z=z, x=x, y=y, s="a")
+
+
+def _download(url, timeout=30):
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+class TileStore:
+    """
+    Raster tiles of one provider in an MBTiles file.
+
+    Parameters
+    ----------
+    path : str or Path, optional
+        MBTiles file, created if needed. Defaults to
+        ``CACHE_DIR / "basemaps" / "<provider name>.mbtiles"``.
+    provider : dict or xyzservices.TileProvider, optional
+        With the "name", "url" template and "attribution" of the tile
+        server, used by :meth:`prefetch`; defaults to :data:`OSM`, or to
+        the provider recorded in an existing file.
+    cache_size : int, default 256
+        Number of decoded tiles kept in memory.
+    """
+
+    def __init__(self, path=None, provider=None, cache_size=CACHE_SIZE):
+        if path is None:
+            name = (provider or OSM)["name"]
+            path = CACHE_DIR / "basemaps" / "{}.mbtiles".format(
+                name.replace(" ", "_").replace(".", "_"))
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self._db.executescript(_SCHEMA)
+        metadata = self.metadata
+        if provider is None:
+            provider = {key: metadata[key] for key in ("name", "url", "attribution")
+                        if key in metadata} or OSM
+        self.provider = provider
+        if not metadata:
+            self._set_metadata(name=provider["name"],
+                               attribution=provider.get("attribution", ""),
+                               url=provider.get("url", ""),
+                               format="png", type="baselayer", version="1.1")
+
+    @property
+    def _db(self):
+        # SQLite connections cannot be shared between threads.
+        if not hasattr(self._local, "db"):
+            self._local.db = sqlite3.connect(self.path)
+        return self._local.db
+
+    def __repr__(self):
+        return "TileStore({!r}, {} tiles)".format(str(self.path), len(self))
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+
+    def __contains__(self, zxy):
+        return self.get(*zxy) is not None
+
+    @property
+    def metadata(self):
+        return dict(self._db.execute("SELECT name, value FROM metadata"))
+
+    def _set_metadata(self, **values):
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?)",
+                [(key, str(value)) for key, value in values.items()])
+
+    @property
+    def attribution(self):
+        return self.metadata.get("attribution", "")
+
+    def get(self, z, x, y):
+        """Encoded tile ``(z, x, y)`` (XYZ numbering), or None if missing."""
+        # MBTiles numbers rows from the south (TMS).
+        row = self._db.execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? "
+            "AND tile_row=?", (z, x, 2 ** z - 1 - y)).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, tiles):
+        """Store ``{(z, x, y): encoded tile}``."""
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+                [(z, x, 2 ** z - 1 - y, sqlite3.Binary(data))
+                 for (z, x, y), data in tiles.items()])
+
+    def image(self, z, x, y):
+        """
+        Tile ``(z, x, y)`` decoded to an RGBA array, or None if missing.
+
+        Decoded tiles are kept in an LRU cache, so redrawing a figure does
+        not decode its tiles again.
+        """
+        key = (z, x, y)
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                return self._images[key]
+        data = self.get(z, x, y)
+        if data is None:
+            return None
+        image = np.asarray(Image.open(io.BytesIO(data)).convert("RGBA"))
+        with self._lock:
+            self._images[key] = image
+            if len(self._images) > self.cache_size:
+                self._images.popitem(last=False)
+        return image
+
+    def missing(self, bounds, zooms, margin=0):
+        """
+        The ``(z, x, y)`` tiles covering ``bounds`` (EPSG:3857) that are not
+        stored, with ``margin`` more tiles on each side.
+        """
+        tiles = []
+        for z in zooms:
+            pad = margin * 2 * ORIGIN / 2 ** z
+            minx, miny, maxx, maxy = bounds
+            tiles.extend((z, x, y) for x, y in tiles_for_bounds(
+                (minx - pad, miny - pad, maxx + pad, maxy + pad), z))
+        return [tile for tile in tiles if tile not in self]
+
+    def prefetch(self, bounds, zooms, crs="EPSG:4326", max_workers=4,
+                 max_tiles=MAX_TILES):
+        """
+        Download the tiles covering ``bounds`` at each of ``zooms``.
+
+        One more tile is fetched on each side, to cover the margins
+        matplotlib adds around the data. Tiles already in the store are not
+        downloaded again.
+
+        Parameters
+        ----------
+        bounds : tuple of (minx, miny, maxx, maxy)
+        zooms : iterable of int
+        crs : default "EPSG:4326"
+            CRS of ``bounds``.
+        max_workers : int, default 4
+            Concurrent downloads.
+        max_tiles : int, default 50_000
+
+        Returns
+        -------
+        int
+            The number of tiles downloaded.
+        """
+        tiles = self.missing(_mercator_bounds(bounds, crs), zooms, margin=1)
+        if len(tiles) > max_tiles:
+            raise ValueError(
+                "{} tiles to download, more than max_tiles={}; reduce the area "
+                "or the zoom levels.".format(len(tiles), max_tiles))
+        urls = [_build_url(self.provider, *tile) for tile in tiles]
+        # Store in batches, so that an interrupted prefetch keeps the tiles
+        # downloaded so far.
+        batch = {}
+        try:
+            with ThreadPoolExecutor(max_workers) as pool:
+                for tile, data in zip(tiles, pool.map(_download, urls)):
+                    batch[tile] = data
+                    if len(batch) == 256:
+                        self.put(batch)
+                        batch = {}
+        finally:
+            self.put(batch)
+        return len(tiles)
+
+    def mosaic(self, bounds, zoom, download=False):
+        """
+        Image of the tiles covering ``bounds`` (EPSG:3857) at ``zoom``.
+
+        Parameters
+        ----------
+        bounds : tuple of (minx, miny, maxx, maxy)
+        zoom : int
+        download : bool, default False
+            Download missing tiles (and store them) instead of raising.
+
+        Returns
+        -------
+        image : ndarray of shape (height, width, 4)
+        extent : tuple of (minx, maxx, miny, maxy)
+            In EPSG:3857, as expected by ``imshow``.
+        """
+        tiles = tiles_for_bounds(bounds, zoom)
+        missing = [(zoom, x, y) for x, y in tiles if (zoom, x, y) not in self]
+        if missing and download:
+            self.put({tile: _download(_build_url(self.provider, *tile))
+                      for tile in missing})
+        elif missing:
+            raise ValueError(
+                "{} tiles at zoom {} are not in {}; download them with "
+                "TileStore.prefetch, or pass download=True.".format(
+                    len(missing), zoom, self.path))
+        xs = sorted({x for x, _ in tiles})
+        ys = sorted({y for _, y in tiles})
+        # High resolution ("@2x") providers have tiles of 512 pixels.
+        size = self.image(zoom, *tiles[0]).shape[0]
+        image = np.zeros((len(ys) * size, len(xs) * size, 4), dtype="uint8")
+        for x, y in tiles:
+            i, j = (y - ys[0]) * size, (x - xs[0]) * size
+            image[i:i + size, j:j + size] = self.image(zoom, x, y)
+        minx, _, _, maxy = tile_bounds(zoom, xs[0], ys[0])
+        _, miny, maxx, _ = tile_bounds(zoom, xs[-1], ys[-1])
+        return image, (minx, maxx, miny, maxy)
+
+
+def _is_mercator(crs):
+    return crs is None or CRS.from_user_input(crs).equals(MERCATOR)
+
+
+def _mercator_bounds(bounds, crs):
+    if _is_mercator(crs):
+        return tuple(bounds)
+    box = geopandas.GeoSeries([shapely.box(*bounds)], crs=crs)
+    if box.crs.is_geographic:
+        box = box.clip_by_rect(-180, -MAX_LATITUDE, 180, MAX_LATITUDE)
+    return tuple(box.to_crs(MERCATOR).total_bounds)
+
+
+def _warp(image, extent, bounds, crs):
+    """
+    Resample a web mercator image to ``bounds`` in ``crs``, with the
+    nearest pixel, so that it lines up with data that is not in EPSG:3857.
+    """
+    height, width = image.shape[:2]
+    minx, miny, maxx, maxy = bounds
+    x = np.linspace(minx, maxx, width)
+    y = np.linspace(maxy, miny, height)
+    x, y = np.meshgrid(x, y)
+    transformer = get_transformer(crs, MERCATOR)
+    mx, my = transformer.transform(x, y)
+    column = ((mx - extent[0]) / (extent[1] - extent[0]) * width).astype("int64")
+    row = ((extent[3] - my) / (extent[3] - extent[2]) * height).astype("int64")
+    inside = (column >= 0) & (column < width) & (row >= 0) & (row < height)
+    warped = np.zeros_like(image)
+    warped[inside] = image[row[inside], column[inside]]
+    return warped, (minx, maxx, miny, maxy)
+
+
+def add_basemap(ax, zoom="auto", store=None, crs=None, download=False,
+                attribution=None, interpolation="bilinear", zorder=0, **kwargs):
+    """
+    Add a basemap from a :class:`TileStore` to a matplotlib axes.
+
+    A replacement for ``contextily.add_basemap`` that reads the tiles from
+    the store instead of downloading them.
+
+    Parameters
+    ----------
+    ax : matplotlib Axes
+        With the data already plotted, in EPSG:3857 unless ``crs`` is
+        given.
+    zoom : int or "auto", default "auto"
+        Zoom level of the tiles; "auto" picks the level matching the size
+        of the axes in pixels.
+    store : TileStore, optional
+        Defaults to the OpenStreetMap store in ``CACHE_DIR``.
+    crs : optional
+        CRS of the data of ``ax``; the basemap is reprojected to it.
+    download : bool, default False
+        Download tiles missing from the store instead of raising.
+    attribution : str or False, optional
+        Text added in the corner of the map. Defaults to the attribution of
+        the provider; pass False to leave it out.
+    interpolation : str, default "bilinear"
+    zorder : int, default 0
+    **kwargs
+        Passed to ``ax.imshow``, e.g. ``alpha``.
+
+    Returns
+    -------
+    AxesImage
+    """
+    store = TileStore() if store is None else store
+    xmin, xmax = ax.get_xlim()
+    ymin, ymax = ax.get_ylim()
+    bounds = _mercator_bounds((xmin, ymin, xmax, ymax), crs)
+    if zoom == "auto":
+        zoom = zoom_for_bounds(bounds, width=ax.get_window_extent().width)
+    image, extent = store.mosaic(bounds, zoom, download=download)
+    if not _is_mercator(crs):
+        image, extent = _warp(image, extent, (xmin, ymin, xmax, ymax), crs)
+    artist = ax.imshow(image, extent=extent, interpolation=interpolation,
+                       zorder=zorder, **kwargs)
+    # Keep the extent of the data, not of the tiles.
+    ax.set_xlim(xmin, xmax)
+    ax.set_ylim(ymin, ymax)
+    if attribution is None:
+        attribution = store.attribution
+    if attribution:
+        ax.text(0.005, 0.005, attribution, transform=ax.transAxes, size=8,
+                ha="left", va="bottom", alpha=0.8, zorder=zorder + 1)
+    return artist
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    area = parser.add_mutually_exclusive_group(required=True)
+    area.add_argument("--bounds", type=float, nargs=4,
+                      metavar=("MINLON", "MINLAT", "MAXLON", "MAXLAT"))
+    area.add_argument("--dataset", help="dataset in book/data whose bounds to use")
+    parser.add_argument("--zooms", type=int, nargs=2, required=True,
+                        metavar=("MIN", "MAX"))
+    parser.add_argument("--url", help="tile url template, defaults to OpenStreetMap")
+    parser.add_argument("--name", help="name of the provider (and of the store)")
+    parser.add_argument("--path", help="MBTiles file")
+    parser.add_argument("--max-workers", type=int, default=4)
+    args = parser.parse_args()
+
+    provider = None
+    if args.url:
+        provider = {"name": args.name or "custom", "url": args.url, "attribution": ""}
+    store = TileStore(args.path, provider)
+    if args.dataset:
+        data = geopandas.read_file(resolve(args.dataset)[1])
+        bounds, crs = data.total_bounds, data.crs
+    else:
+        bounds, crs = args.bounds, "EPSG:4326"
+    zooms = range(args.zooms[0], args.zooms[1] + 1)
+    count = store.prefetch(bounds, zooms, crs=crs, max_workers=args.max_workers)
+    print("Downloaded {} tiles to {} ({} tiles)".format(count, store.path, len(store)))
+
+
+if __name__ == "__main__":
+    main()
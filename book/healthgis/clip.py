@@ -0,0 +1,61 @@
+"""
+Clip a layer to a polygon without creating empty geometries.
+
+``land_use.geometry.intersection(muette)`` intersects every row with the
+mask and then throws most of the (empty) results away. :func:`clip` first
+selects the candidate rows with the spatial index, passes the rows lying
+completely inside the mask through untouched and only intersects the rows
+crossing its boundary. The cost depends on the number of candidates, not
+on the size of the layer.
+
+>>> from healthgis.clip import clip
+>>> land_use_muette = clip(land_use, muette)
+"""
+
+import numpy as np
+import geopandas
+import shapely
+
+
+def clip(gdf, mask):
+    """
+    Clip the features of ``gdf`` to ``mask``.
+
+    Parameters
+    ----------
+    gdf : GeoDataFrame or GeoSeries
+    mask : Polygon, MultiPolygon, GeoDataFrame or GeoSeries
+        Area to clip to, in the CRS of ``gdf``. The geometries of a
+        GeoDataFrame or GeoSeries are unioned first.
+
+    Returns
+    -------
+    GeoDataFrame or GeoSeries
+        Only the rows intersecting ``mask``, in their original order and
+        with their original index, clipped to the mask. Features crossing
+        the boundary of the mask only partly (e.g. a polygon touching it
+        along an edge) can result in a geometry of a lower dimension.
+    """
+    if isinstance(mask, (geopandas.GeoDataFrame, geopandas.GeoSeries)):
+        if mask.crs != gdf.crs:
+            raise ValueError(
+                "CRS mismatch between the layer ({}) and the mask ({}).".format(
+                    gdf.crs, mask.crs
+                )
+            )
+        mask = mask.geometry.union_all()
+    shapely.prepare(mask)
+
+    candidates = np.sort(gdf.sindex.query(mask, predicate="intersects"))
+    geometry = np.asarray(gdf.geometry.values)[candidates]
+    crossing = np.flatnonzero(~shapely.covers(mask, geometry))
+    geometry[crossing] = shapely.intersection(geometry[crossing], mask)
+
+    keep = ~shapely.is_empty(geometry)
+    result = gdf.iloc[candidates[keep]].copy()
+    clipped = geopandas.GeoSeries(geometry[keep], index=result.index,
+                                  crs=gdf.crs)
+    if isinstance(result, geopandas.GeoSeries):
+        return clipped.rename(result.name)
+    result[result.geometry.name] = clipped
+    return result
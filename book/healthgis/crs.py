@@ -0,0 +1,277 @@
+"""
+Fast reprojection with cached transformers.
+
+Creating a ``pyproj.Transformer`` is much more expensive than using it, and
+the notebooks convert the same layers between the same few CRSs over and
+over. Here transformers are cached per (source, target) pair, coordinates
+are transformed in one vectorized pass, and reprojected copies of
+reference layers are memoized.
+
+>>> from healthgis.crs import reproject
+>>> districts_l93 = reproject(districts, land_use.crs)  # cached after the first call
+
+:func:`to_local_crs` picks a suitable UTM or equal-area CRS from the bounds
+of a layer, so distances and areas can be computed without looking up the
+right EPSG code by hand.
+"""
+
+import functools
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import geopandas
+import shapely
+from pyproj import CRS, Transformer
+
+
+@functools.lru_cache(maxsize=128)
+def _transformer(source, target):
+    return Transformer.from_crs(source, target, always_xy=True)
+
+
+def get_transformer(source, target):
+    """
+    Cached ``pyproj.Transformer`` from ``source`` to ``target``.
+
+    The CRSs can be anything accepted by ``pyproj.CRS.from_user_input``.
+    Coordinates are always in (x, y) = (lon, lat) order.
+    """
+    return _transformer(CRS.from_user_input(source), CRS.from_user_input(target))
+
+
+def transform_xy(x, y, source, target):
+    """Transform coordinate arrays from ``source`` to ``target``."""
+    return get_transformer(source, target).transform(
+        np.asarray(x, dtype="float64"), np.asarray(y, dtype="float64")
+    )
+
+
+def transform_geometry(geometry, source, target):
+    """
+    Reproject an array of shapely geometries.
+
+    All coordinates of all geometries are passed to the transformer in a
+    single call, instead of transforming the geometries one by one. Z
+    coordinates are kept and transformed too, as ``GeoSeries.to_crs``
+    does.
+    """
+    transformer = get_transformer(source, target)
+    geometry = np.asarray(geometry)
+    include_z = bool(shapely.has_z(geometry).any())
+
+    def func(coords):
+        return np.column_stack(transformer.transform(*coords.T))
+
+    return shapely.transform(geometry, func, include_z=include_z)
+
+
+def to_crs(data, crs):
+    """
+    Reproject a GeoDataFrame or GeoSeries, like ``data.to_crs(crs)``.
+
+    Returns a new object; ``data`` itself is not modified.
+    """
+    crs = CRS.from_user_input(crs)
+    if data.crs is None:
+        raise ValueError(
+            "Cannot transform naive geometries. Please set a crs on the "
+            "object first."
+        )
+    if data.crs == crs:
+        return data.copy()
+    geometry = data.geometry if isinstance(data, geopandas.GeoDataFrame) else data
+    values = transform_geometry(geometry.values, data.crs, crs)
+    result = geopandas.GeoSeries(values, index=data.index, crs=crs,
+                                 name=geometry.name)
+    if isinstance(data, geopandas.GeoSeries):
+        return result
+    data = data.copy()
+    data[geometry.name] = result
+    return data
+
+
+# id(frame) -> (weakref to the frame, its geometry array, {crs: result})
+_reprojected = {}
+
+
+def reproject(data, crs):
+    """
+    Memoized :func:`to_crs` for layers that are not modified afterwards.
+
+    The reprojected copy is cached as long as ``data`` is alive, so repeated
+    calls such as ``reproject(districts, land_use.crs)`` only cost a cache
+    lookup. Assigning a new geometry column to ``data`` invalidates the
+    cache; modifying the geometries in place does not, so only use this for
+    reference layers that are treated as read-only.
+
+    Returns
+    -------
+    GeoDataFrame or GeoSeries
+        A shallow copy of the cached result, so adding columns to it does
+        not affect later calls.
+    """
+    crs = CRS.from_user_input(crs)
+    entry = _reprojected.get(id(data))
+    if (entry is None or entry[0]() is not data
+            or entry[1] is not data.geometry.values):
+        entry = (weakref.ref(data, _forget(id(data))), data.geometry.values, {})
+        _reprojected[id(data)] = entry
+    cache = entry[2]
+    if crs not in cache:
+        cache[crs] = to_crs(data, crs)
+    return cache[crs].copy(deep=False)
+
+
+def _forget(key):
+    def callback(ref):
+        entry = _reprojected.get(key)
+        if entry is not None and entry[0] is ref:
+            del _reprojected[key]
+    return callback
+
+
+def _lonlat(data):
+    """Longitude and latitude of the bounding box center of each feature."""
+    bounds = data.geometry.bounds.values
+    x = (bounds[:, 0] + bounds[:, 2]) / 2
+    y = (bounds[:, 1] + bounds[:, 3]) / 2
+    if data.crs is None:
+        raise ValueError("Cannot estimate a local CRS for naive geometries.")
+    if not data.crs.is_geographic or data.crs.to_epsg() != 4326:
+        x, y = transform_xy(x, y, data.crs, "EPSG:4326")
+    return x, y
+
+
+def utm_epsg(lon, lat):
+    """
+    EPSG codes of the WGS 84 / UTM zones containing the given locations.
+
+    Includes the exceptions of the UTM grid around Norway and Svalbard.
+    """
+    lon = np.asarray(lon, dtype="float64")
+    lat = np.asarray(lat, dtype="float64")
+    zone = (np.floor((lon + 180) / 6).astype(int) % 60) + 1
+    zone = np.where((lat >= 56) & (lat < 64) & (lon >= 3) & (lon < 12), 32, zone)
+    svalbard = (lat >= 72) & (lat < 84)
+    for lon_min, lon_max, svalbard_zone in [(0, 9, 31), (9, 21, 33),
+                                            (21, 33, 35), (33, 42, 37)]:
+        zone = np.where(svalbard & (lon >= lon_min) & (lon < lon_max),
+                        svalbard_zone, zone)
+    return np.where(lat >= 0, 32600, 32700) + zone
+
+
+def estimate_utm_crs(data):
+    """
+    UTM CRS of the zone containing the center of the bounds of ``data``.
+
+    Unlike ``GeoDataFrame.estimate_utm_crs``, this does not query the PROJ
+    database, so it is cheap enough to call for every layer.
+    """
+    xmin, ymin, xmax, ymax = data.total_bounds
+    center = geopandas.GeoSeries(
+        [shapely.box(xmin, ymin, xmax, ymax)], crs=data.crs
+    )
+    lon, lat = _lonlat(center)
+    return CRS.from_epsg(int(utm_epsg(lon, lat)[0]))
+
+
+def estimate_equal_area_crs(data):
+    """
+    Lambert azimuthal equal-area CRS centered on ``data``.
+
+    Use it instead of UTM for layers spanning several UTM zones, when areas
+    matter more than shapes.
+    """
+    xmin, ymin, xmax, ymax = data.total_bounds
+    center = geopandas.GeoSeries(
+        [shapely.box(xmin, ymin, xmax, ymax)], crs=data.crs
+    )
+    lon, lat = _lonlat(center)
+    return CRS.from_proj4(
+        "+proj=laea +lat_0={:.4f} +lon_0={:.4f} +datum=WGS84 +units=m "
+        "+no_defs".format(lat[0], lon[0])
+    )
+
+
+def to_local_crs(data, kind="utm"):
+    """
+    Reproject ``data`` to a local projected CRS, picked from its bounds.
+
+    Parameters
+    ----------
+    data : GeoDataFrame or GeoSeries
+    kind : {"utm", "equal_area"}, default "utm"
+        See :func:`estimate_utm_crs` and :func:`estimate_equal_area_crs`.
+    """
+    if kind == "utm":
+        crs = estimate_utm_crs(data)
+    elif kind == "equal_area":
+        crs = estimate_equal_area_crs(data)
+    else:
+        raise ValueError(
+            "kind should be one of 'utm' or 'equal_area', got {!r}".format(kind)
+        )
+    return to_crs(data, crs)
+
+
+def utm_zones(data):
+    """
+    EPSG code of the UTM zone of each feature, as a Series.
+
+    Empty and missing geometries have no location, and get a missing zone.
+    """
+    lon, lat = _lonlat(data)
+    geometry = np.asarray(data.geometry.values)
+    located = ~(shapely.is_missing(geometry) | shapely.is_empty(geometry))
+    zones = pd.Series(pd.NA, index=data.index, dtype="Int64", name="utm_epsg")
+    zones.iloc[located] = utm_epsg(lon[located], lat[located])
+    return zones
+
+
+def _apply_in_zone(args):
+    func, part, epsg = args
+    return func(to_crs(part, epsg))
+
+
+def apply_by_utm_zone(data, func, max_workers=1):
+    """
+    Apply ``func`` to the features of each UTM zone, in that zone's CRS.
+
+    For layers spanning several zones (e.g. a whole country), distances and
+    areas are only accurate when every feature is measured in its own zone.
+    The features are split by :func:`utm_zones`, every group is reprojected
+    to its zone and passed to ``func``, and the results are combined.
+
+    Parameters
+    ----------
+    data : GeoDataFrame or GeoSeries
+    func : callable
+        Called with the reprojected features of one zone; should return a
+        Series or DataFrame indexed like its input, e.g.
+        ``lambda df: df.area``.
+    max_workers : int, default 1
+        With more than one worker, the zones are processed in parallel in a
+        process pool. ``func`` then has to be picklable, i.e. defined at the
+        top level of a module rather than a lambda.
+
+    Returns
+    -------
+    Series or DataFrame
+        In the row order and with the index of ``data``. Empty and missing
+        geometries are not passed to ``func`` and get missing values.
+    """
+    zones = utm_zones(data).to_numpy(dtype="float64", na_value=np.nan)
+    # Work on positions, so that a duplicated index is no problem.
+    positional = data.reset_index(drop=True)
+    tasks = [(func, positional[zones == epsg], int(epsg))
+             for epsg in np.unique(zones[~np.isnan(zones)])]
+    if max_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers) as pool:
+            results = list(pool.map(_apply_in_zone, tasks))
+    else:
+        results = [_apply_in_zone(task) for task in tasks]
+    if not results:
+        return pd.Series(np.nan, index=data.index)
+    return pd.concat(results).reindex(positional.index).set_axis(data.index)
@@ -0,0 +1,133 @@
+"""
+Distances between points in planar, haversine or geodesic mode.
+
+For continental-scale layers, reprojecting to a single projected CRS
+distorts distances far from its center. The ``haversine`` (great-circle on
+a sphere) and ``geodesic`` (on the WGS 84 ellipsoid) modes compute
+distances directly from longitude/latitude coordinates, vectorized over
+whole arrays, so no reprojection is needed.
+
+>>> from healthgis.distance import point_distance
+>>> distances = point_distance(data, goma, mode="haversine")  # in meters
+"""
+
+import numpy as np
+import pandas as pd
+import geopandas
+import shapely
+from pyproj import Geod
+
+from .crs import transform_xy
+
+# Mean Earth radius (IUGG), in meters.
+EARTH_RADIUS = 6_371_008.8
+
+MODES = ("planar", "haversine", "geodesic")
+
+_geod = Geod(ellps="WGS84")
+
+
+def haversine(lon1, lat1, lon2, lat2, radius=EARTH_RADIUS):
+    """Great-circle distance between coordinates in degrees, in meters."""
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * radius * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def geodesic(lon1, lat1, lon2, lat2):
+    """Distance on the WGS 84 ellipsoid between coordinates in degrees, in meters."""
+    lon1, lat1, lon2, lat2 = np.broadcast_arrays(
+        *(np.asarray(a, dtype="float64") for a in (lon1, lat1, lon2, lat2))
+    )
+    return _geod.inv(lon1, lat1, lon2, lat2)[2]
+
+
+def distance(x1, y1, x2, y2, mode="planar"):
+    """
+    Distance between coordinate arrays.
+
+    Parameters
+    ----------
+    x1, y1, x2, y2 : array-like
+        Coordinates, broadcast against each other. For the "haversine" and
+        "geodesic" modes, these are longitudes and latitudes in degrees.
+    mode : {"planar", "haversine", "geodesic"}, default "planar"
+
+    Returns
+    -------
+    ndarray
+        In the units of the coordinates for "planar", in meters otherwise.
+    """
+    if mode == "planar":
+        return np.hypot(np.subtract(x2, x1), np.subtract(y2, y1))
+    elif mode == "haversine":
+        return haversine(x1, y1, x2, y2)
+    elif mode == "geodesic":
+        return geodesic(x1, y1, x2, y2)
+    raise ValueError("mode should be one of {}, got {!r}".format(MODES, mode))
+
+
+def point_coordinates(points):
+    """
+    (n, 2) coordinates of an array of points, one row per point.
+
+    Empty and missing points get NaN coordinates, so that the rows stay
+    aligned with the input; other geometry types raise a ValueError.
+    """
+    points = np.atleast_1d(np.asarray(points))
+    type_id = shapely.get_type_id(points)
+    if not ((type_id == shapely.GeometryType.POINT)
+            | (type_id == shapely.GeometryType.MISSING)).all():
+        raise ValueError("Only point geometries are supported.")
+    coords = np.full((len(points), 2), np.nan)
+    located = ~(shapely.is_missing(points) | shapely.is_empty(points))
+    coords[located] = shapely.get_coordinates(points[located])
+    return coords
+
+
+def lonlat(points):
+    """
+    Longitudes and latitudes of a GeoSeries or GeoDataFrame of points.
+
+    Empty and missing points get NaN coordinates.
+    """
+    coords = point_coordinates(points.geometry.values)
+    x, y = coords[:, 0], coords[:, 1]
+    if points.crs is None:
+        raise ValueError("Cannot compute distances for naive geometries.")
+    if points.crs.to_epsg() != 4326:
+        x, y = transform_xy(x, y, points.crs, "EPSG:4326")
+    return x, y
+
+
+def point_distance(points, other, mode="haversine"):
+    """
+    Distance from each point of ``points`` to ``other``.
+
+    Parameters
+    ----------
+    points : GeoSeries or GeoDataFrame of points
+    other : Point, or GeoSeries / GeoDataFrame of points
+        A single point, in the CRS of ``points``, or a layer of points
+        aligned with ``points``.
+    mode : {"planar", "haversine", "geodesic"}, default "haversine"
+        With "planar", the distance is computed in the CRS of ``points``;
+        otherwise the points are converted to longitude/latitude (if
+        needed) and the result is in meters.
+
+    Returns
+    -------
+    Series
+        Indexed like ``points``; NaN for empty and missing points.
+    """
+    if not isinstance(other, (geopandas.GeoSeries, geopandas.GeoDataFrame)):
+        other = geopandas.GeoSeries([other], crs=points.crs)
+    if mode == "planar":
+        (x1, y1), (x2, y2) = (
+            point_coordinates(p.geometry.values).T for p in (points, other)
+        )
+    else:
+        (x1, y1), (x2, y2) = lonlat(points), lonlat(other)
+    result = distance(x1, y1, x2, y2, mode=mode)
+    return pd.Series(result, index=points.index, name="distance")
@@ -0,0 +1,306 @@
+"""
+Parallel, cached execution of the book's notebooks with per-cell timings.
+
+Each notebook listed in ``_toc.yml`` or found in ``book/notebooks`` runs in
+its own kernel, in the directory of the notebook (as ``jb build`` runs
+them), up to ``max_workers`` notebooks at a time. Executed notebooks are
+stored in the jupyter-cache of the book (``_build/.jupyter_cache``), the
+cache that ``jb build`` reads with ``execute_notebooks: cache``: only the
+notebooks whose code changed are run again, here or by the next
+``jb build``. For every cell, the wall time and the peak memory of the
+kernel are recorded in a JSON report, including the cells that ran before
+a failing one.
+
+    python -m healthgis.execute --max-workers 4 --report _build/execution.json
+
+>>> from healthgis.execute import execute_all
+>>> report = execute_all(max_workers=4)
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import nbformat
+import psutil
+import yaml
+from jupyter_cache import get_cache
+from jupyter_cache.base import CacheBundleIn
+from nbclient import NotebookClient
+
+from .paths import DATA_DIR
+
+BOOK_DIR = DATA_DIR.parent
+
+# The cache of executed notebooks of ``jb build``.
+JUPYTER_CACHE = BOOK_DIR / "_build" / ".jupyter_cache"
+
+# Key of the timings in the data of the jupyter-cache records.
+REPORT_KEY = "healthgis.execute"
+
+# Interval between two samples of the kernel memory, in seconds.
+SAMPLE_INTERVAL = 0.01
+
+
+def discover(book_dir=BOOK_DIR):
+    """
+    Notebooks of the book: the ``.ipynb`` files of ``_toc.yml``, followed by
+    the other notebooks of ``notebooks/``.
+    """
+    book_dir = Path(book_dir)
+    paths = []
+    toc = book_dir / "_toc.yml"
+    if toc.exists():
+        with open(toc, encoding="utf-8") as f:
+            for name in _toc_files(yaml.safe_load(f) or {}):
+                path = book_dir / name
+                if path.suffix != ".ipynb":
+                    path = path.with_suffix(".ipynb")
+                if path.exists():
+                    paths.append(path)
+    paths += sorted((book_dir / "notebooks").glob("*.ipynb"))
+    return list(dict.fromkeys(path.resolve() for path in paths))
+
+
+def _toc_files(entry):
+    if isinstance(entry, dict):
+        for key in ("root", "file"):
+            if key in entry:
+                yield entry[key]
+        for key in ("parts", "chapters", "sections"):
+            for child in entry.get(key, []):
+                yield from _toc_files(child)
+    elif isinstance(entry, list):
+        for child in entry:
+            yield from _toc_files(child)
+
+
+class _MemorySampler(threading.Thread):
+    """Track the peak resident memory of a process and its children."""
+
+    def __init__(self, pid, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak = 0
+        self._done = threading.Event()
+
+    def rss(self):
+        try:
+            processes = [self.process, *self.process.children(recursive=True)]
+            return sum(p.memory_info().rss for p in processes)
+        except psutil.Error:
+            return 0
+
+    def reset(self):
+        self.peak = self.rss()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, self.rss())
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def _kernel_env():
+    """Environment of the kernels, with ``book/`` on the ``PYTHONPATH``."""
+    paths = [str(BOOK_DIR)] + [p for p in os.environ.get(
+        "PYTHONPATH", "").split(os.pathsep) if p]
+    return {**os.environ, "PYTHONPATH": os.pathsep.join(paths)}
+
+
+def execute_notebook(path, cwd=None, timeout=600, kernel_name=None,
+                     cells=None):
+    """
+    Execute a notebook and time each of its code cells.
+
+    Parameters
+    ----------
+    path : str or Path
+    cwd : str or Path, optional
+        Working directory of the kernel. Defaults to the directory of the
+        notebook. ``book/`` is always on the ``PYTHONPATH`` of the kernel,
+        so that ``healthgis`` can be imported.
+    timeout : int, default 600
+        Maximum time for a cell, in seconds.
+    kernel_name : str, optional
+        Defaults to the kernel of the notebook.
+    cells : list, optional
+        List the timings are appended to as the cells run, so that they
+        are available even when a cell raises.
+
+    Returns
+    -------
+    nb : NotebookNode
+        The executed notebook.
+    cells : list of dict
+        For each executed code cell, its index, wall time in seconds and
+        the peak memory of the kernel in MB, as well as whether it raised.
+    """
+    path = Path(path)
+    nb = nbformat.read(str(path), as_version=4)
+    cells = [] if cells is None else cells
+    state = {}
+
+    def on_notebook_start(notebook):
+        state["sampler"] = _MemorySampler(client.km.provisioner.process.pid)
+        state["sampler"].start()
+
+    def on_cell_execute(cell, cell_index):
+        state["sampler"].reset()
+        state["start"] = time.perf_counter()
+
+    def on_cell_executed(cell, cell_index, execute_reply):
+        sampler = state["sampler"]
+        cells.append({
+            "index": cell_index,
+            "seconds": time.perf_counter() - state["start"],
+            "peak_memory_mb": max(sampler.peak, sampler.rss()) / 2**20,
+            "error": False,
+        })
+
+    def on_cell_error(cell, cell_index, execute_reply):
+        # Called after on_cell_executed for the same cell.
+        cells[-1]["error"] = True
+
+    client = NotebookClient(
+        nb, timeout=timeout, kernel_name=kernel_name or "",
+        # No timing metadata in the cells: jupyter-cache hashes the cell
+        # metadata, so the executed notebook would not match its source.
+        record_timing=False,
+        resources={"metadata": {"path": str(cwd or path.parent)}},
+        on_notebook_start=on_notebook_start,
+        on_cell_execute=on_cell_execute,
+        on_cell_executed=on_cell_executed,
+        on_cell_error=on_cell_error,
+    )
+    try:
+        client.execute(env=_kernel_env())
+    finally:
+        if "sampler" in state:
+            state["sampler"].stop()
+    return nb, cells
+
+
+def _execute(path, cwd, timeout):
+    """Execute one notebook; return its record and the executed notebook."""
+    start = time.perf_counter()
+    record = {"path": str(path), "cached": False, "error": None}
+    cells = []
+    try:
+        nb, _ = execute_notebook(path, cwd=cwd, timeout=timeout, cells=cells)
+    except Exception as e:
+        # The timings of the cells run so far locate the failure.
+        error = "{}: {}".format(getattr(e, "ename", type(e).__name__),
+                                getattr(e, "evalue", e))
+        record.update(seconds=time.perf_counter() - start, cells=cells,
+                      error=error)
+        return record, None
+    record.update(seconds=time.perf_counter() - start, cells=cells)
+    return record, nbformat.writes(nb)
+
+
+def _cached(cache, path):
+    """Record of the cached execution of a notebook, or None."""
+    nb = nbformat.read(str(path), as_version=4)
+    try:
+        entry = cache.match_cache_notebook(nb)
+    except KeyError:
+        return None
+    # Notebooks executed by jb build have no timings.
+    record = {"seconds": 0.0, "cells": [], **(entry.data or {}).get(REPORT_KEY, {})}
+    return {**record, "path": str(path), "cached": True, "error": None}
+
+
+def execute_all(paths=None, cwd=None, max_workers=1, timeout=600,
+                cache_dir=None, force=False):
+    """
+    Execute notebooks in parallel kernels, reusing cached results.
+
+    Parameters
+    ----------
+    paths : list of str or Path, optional
+        Defaults to :func:`discover`.
+    cwd : str or Path, optional
+        Working directory of the kernels. Defaults to the directory of
+        each notebook.
+    max_workers : int, default 1
+        Number of notebooks executed at the same time.
+    timeout : int, default 600
+        Maximum time for a cell, in seconds.
+    cache_dir : str or Path, optional
+        jupyter-cache directory. Defaults to :data:`JUPYTER_CACHE`, the
+        cache of ``jb build``.
+    force : bool, default False
+        Execute the notebooks even if their code did not change.
+
+    Returns
+    -------
+    dict
+        The report, with the total wall time and a record per notebook, in
+        the order of ``paths``. Failed notebooks are not cached and come
+        with the timings of the cells executed before the error.
+    """
+    paths = discover() if paths is None else [Path(p).resolve() for p in paths]
+    # Only this process reads and writes the cache database; the workers
+    # just execute.
+    cache = get_cache(cache_dir or JUPYTER_CACHE)
+    start = time.perf_counter()
+    records = {path: None if force else _cached(cache, path) for path in paths}
+    pending = [path for path, record in records.items() if record is None]
+    if max_workers == 1:
+        results = (_execute(path, cwd, timeout) for path in pending)
+    else:
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers)
+        results = pool.map(_execute, pending, [cwd] * len(pending),
+                           [timeout] * len(pending))
+    try:
+        for path, (record, nb) in zip(pending, results):
+            records[path] = record
+            if nb is not None:
+                cache.cache_notebook_bundle(
+                    CacheBundleIn(nbformat.reads(nb, as_version=4), str(path),
+                                  data={REPORT_KEY: record}),
+                    check_validity=False, overwrite=True,
+                )
+    finally:
+        if max_workers != 1:
+            pool.shutdown()
+    return {"seconds": time.perf_counter() - start,
+            "notebooks": list(records.values())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("notebooks", nargs="*",
+                        help="defaults to the notebooks of the book")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--timeout", type=int, default=600)
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the cached results")
+    parser.add_argument("--report", default=None,
+                        help="JSON file to write the report to")
+    args = parser.parse_args()
+    report = execute_all(args.notebooks or None, max_workers=args.max_workers,
+                         timeout=args.timeout, force=args.force)
+    for record in report["notebooks"]:
+        status = "cached" if record["cached"] else (
+            "failed" if record["error"] else "executed")
+        print("{:>8.1f}s  {:8}  {}".format(
+            record["seconds"], status, Path(record["path"]).name))
+    print("{:>8.1f}s  total".format(report["seconds"]))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+    if any(record["error"] for record in report["notebooks"]):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Content hashes of layers, used as keys of the caches in this package.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+import shapely
+
+
+def layer_hash(data, columns=None):
+    """
+    Hash of the geometries (and CRS) of a GeoSeries or GeoDataFrame.
+
+    Two layers with the same geometries in the same order have the same
+    hash, whatever their index. Pass ``columns`` to also include attribute
+    columns of a GeoDataFrame, e.g. the column a choropleth is colored by.
+    """
+    digest = hashlib.sha1()
+    digest.update(str(data.crs).encode())
+    for wkb in shapely.to_wkb(np.asarray(data.geometry.values)):
+        digest.update(b"" if wkb is None else wkb)
+    if columns:
+        values = pd.util.hash_pandas_object(data[list(columns)], index=False)
+        digest.update(values.values.tobytes())
+    return digest.hexdigest()
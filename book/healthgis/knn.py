@@ -0,0 +1,201 @@
+"""
+K-nearest-neighbour and radius queries on point layers.
+
+``stations.distance(eiffel_tower).min()`` computes the distance to every
+station for every query point, which is O(n * m) for n queries. A
+:class:`PointIndex` builds a KD-tree over the points of a layer once and
+answers the k nearest neighbours, or all neighbours within a radius, for a
+whole batch of query points in O(n log m).
+
+>>> from healthgis.knn import PointIndex
+>>> clinics_index = PointIndex(clinics, ids="clinic_id")
+>>> ids, distances = clinics_index.query(patients, k=3)
+>>> stations_eiffel = PointIndex(stations).query_radius([eiffel_tower], 1000)
+
+With ``metric="haversine"``, the index works on the sphere instead: layers
+in longitude/latitude are searched without reprojection, and distances are
+great-circle distances in meters.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import geopandas
+from scipy.spatial import cKDTree
+
+from .distance import EARTH_RADIUS, lonlat, point_coordinates
+
+
+def _coordinates(points):
+    """
+    (n, 2) coordinates of a GeoSeries, GeoDataFrame or array of points.
+
+    Empty and missing points get NaN coordinates, so that the rows stay
+    aligned with the input.
+    """
+    if isinstance(points, (geopandas.GeoSeries, geopandas.GeoDataFrame)):
+        points = points.geometry.values
+    points = np.asarray(points)
+    if points.dtype != object:
+        return np.atleast_2d(points).astype("float64")
+    return point_coordinates(points)
+
+
+def _located(coords):
+    """Positions of the rows of ``coords`` that are not empty or missing."""
+    return np.flatnonzero(np.isfinite(coords).all(axis=1))
+
+
+def _unit_vectors(lon, lat):
+    """Points on the unit sphere, so chord distance orders like arc length."""
+    lon, lat = np.radians(lon), np.radians(lat)
+    return np.column_stack([
+        np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)
+    ])
+
+
+def _arc_to_chord(distance):
+    return 2 * np.sin(np.minimum(np.asarray(distance, dtype="float64")
+                                 / EARTH_RADIUS, np.pi) / 2)
+
+
+def _chord_to_arc(chord):
+    return 2 * EARTH_RADIUS * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+class PointIndex:
+    """
+    KD-tree over the points of a layer.
+
+    Parameters
+    ----------
+    points : GeoDataFrame or GeoSeries
+        Point layer to search, in a projected CRS.
+    ids : str, optional
+        Column holding the identifiers to return. Defaults to the index.
+    metric : {"euclidean", "haversine"}, default "euclidean"
+        With "haversine", points in any CRS are converted to
+        longitude/latitude and indexed on the unit sphere; distances (and
+        ``max_distance`` / ``radius`` arguments) are great-circle distances
+        in meters, and query points can be given in any CRS too.
+
+    Empty and missing points are left out of the index; as query points,
+    they have no neighbours.
+    """
+
+    def __init__(self, points, ids=None, metric="euclidean"):
+        if metric not in ("euclidean", "haversine"):
+            raise ValueError(
+                "metric should be one of 'euclidean' or 'haversine', got "
+                "{!r}".format(metric)
+            )
+        self.metric = metric
+        if (metric == "euclidean" and points.crs is not None
+                and points.crs.is_geographic):
+            warnings.warn(
+                "Geometry is in a geographic CRS. Distances are computed in "
+                "degrees; use 'to_crs()' to re-project to a projected CRS "
+                "first.",
+                UserWarning,
+                stacklevel=2,
+            )
+        self.crs = points.crs
+        coords = self._coordinates(points)
+        located = _located(coords)
+        self.ids = np.asarray(points.index if ids is None else points[ids])[located]
+        self.tree = cKDTree(coords[located])
+
+    def __len__(self):
+        return self.tree.n
+
+    def _coordinates(self, points):
+        if self.metric == "euclidean":
+            return _coordinates(points)
+        if isinstance(points, (geopandas.GeoSeries, geopandas.GeoDataFrame)):
+            return _unit_vectors(*lonlat(points))
+        # Plain geometries or coordinates are taken to be longitude/latitude.
+        coords = _coordinates(points)
+        return _unit_vectors(coords[:, 0], coords[:, 1])
+
+    def query(self, points, k=1, max_distance=np.inf, workers=1):
+        """
+        The ``k`` nearest points of the index for each query point.
+
+        Parameters
+        ----------
+        points : GeoSeries, GeoDataFrame, array of Points or (n, 2) array
+            Query points, in the CRS of the index.
+        k : int, default 1
+        max_distance : float, optional
+            Only return neighbours within this distance.
+        workers : int, default 1
+            Number of threads; -1 uses all CPUs.
+
+        Returns
+        -------
+        ids : ndarray of shape (n, k)
+            Identifiers of the neighbours, nearest first. Missing
+            neighbours (beyond ``max_distance`` or when ``k`` exceeds the
+            number of points) are None.
+        distances : ndarray of shape (n, k)
+            Distances to the neighbours, NaN when missing.
+        """
+        if self.metric == "haversine":
+            max_distance = _arc_to_chord(max_distance) if np.isfinite(
+                max_distance) else max_distance
+        coords = self._coordinates(points)
+        located = _located(coords)
+        distances = np.full((len(coords), k), np.inf)
+        positions = np.full((len(coords), k), self.tree.n)
+        distances[located], positions[located] = self.tree.query(
+            coords[located], k=[*range(1, k + 1)],
+            distance_upper_bound=max_distance, workers=workers,
+        )
+        if self.metric == "haversine":
+            distances = _chord_to_arc(distances)
+        missing = positions == self.tree.n
+        ids = self.ids.astype(object)[np.where(missing, 0, positions)]
+        ids[missing] = None
+        distances[missing] = np.nan
+        return ids, distances
+
+    def query_radius(self, points, radius, workers=1):
+        """
+        All points of the index within ``radius`` of each query point.
+
+        Parameters
+        ----------
+        radius : float or array-like
+            A single radius, or one per query point.
+
+        Returns
+        -------
+        DataFrame
+            One row per (query, neighbour) pair, sorted by query and then by
+            distance, with the position of the query point (``query``), the
+            identifier of the neighbour (``id``) and the ``distance``.
+        """
+        coords = self._coordinates(points)
+        located = _located(coords)
+        radius = np.broadcast_to(np.asarray(radius, dtype="float64"),
+                                 (len(coords),))[located]
+        if self.metric == "haversine":
+            radius = _arc_to_chord(radius)
+        neighbours = self.tree.query_ball_point(coords[located], radius,
+                                                workers=workers)
+        counts = np.fromiter((len(n) for n in neighbours), dtype=np.intp,
+                             count=len(neighbours))
+        query = np.repeat(located, counts)
+        positions = np.fromiter((i for n in neighbours for i in n),
+                                dtype=np.intp, count=counts.sum())
+        distance = np.linalg.norm(self.tree.data[positions] - coords[query],
+                                  axis=1)
+        if self.metric == "haversine":
+            distance = _chord_to_arc(distance)
+        order = np.lexsort((distance, query))
+        return pd.DataFrame({
+            "query": query[order],
+            "id": self.ids[positions[order]],
+            "distance": distance[order],
+        })
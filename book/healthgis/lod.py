@@ -0,0 +1,244 @@
+"""
+Level-of-detail pyramid of simplified geometries for interactive maps.
+
+folium and ipyleaflet send the full-resolution ``__geo_interface__`` of a
+layer to the browser, although at most zoom levels many vertices fall in
+the same screen pixel. :func:`build_pyramid` simplifies a polygon or line
+layer once per zoom level, with a tolerance of one pixel at that zoom, and
+stores all levels in a GeoPackage (one table per zoom) in
+:data:`~healthgis.paths.CACHE_DIR`, keyed by the layer hash. The layer is
+simplified as a coverage, so borders shared by neighbouring polygons are
+simplified once and stay consistent: no gaps or slivers appear between
+countries or districts.
+
+:class:`Pyramid` picks the level for a zoom, serializes it to GeoJSON with
+coordinates rounded to the pixel size, and keeps an ipyleaflet layer in
+sync with the zoom of its map.
+
+>>> from healthgis.lod import build_pyramid
+>>> pyramid = build_pyramid(countries, max_zoom=8)
+>>> folium.GeoJson(pyramid.geojson(zoom=2)).add_to(m)
+>>> m.add(pyramid.ipyleaflet_layer(m))
+"""
+
+import math
+import os
+import warnings
+from pathlib import Path
+
+import numpy as np
+import geopandas
+import pyogrio
+import shapely
+
+from .hashing import layer_hash
+from .paths import CACHE_DIR
+from .tiles import ORIGIN, TILE_SIZE, to_mercator
+
+MIN_ZOOM = 0
+MAX_ZOOM = 12
+
+
+def tolerance(zoom, tile_size=TILE_SIZE):
+    """Size of a pixel at ``zoom``, in web mercator meters."""
+    return 2 * ORIGIN / (tile_size * 2 ** zoom)
+
+
+def precision(zoom, tile_size=TILE_SIZE):
+    """Number of decimals of longitudes and latitudes to keep at ``zoom``."""
+    degrees = 360 / (tile_size * 2 ** zoom)
+    return max(int(math.ceil(-math.log10(degrees))) + 1, 0)
+
+
+def _is_coverage(geometry):
+    return bool(shapely.coverage_is_valid(geometry))
+
+
+def _polygonal(geometry):
+    type_ids = shapely.get_type_id(geometry)
+    return np.isin(type_ids, [shapely.GeometryType.POLYGON,
+                              shapely.GeometryType.MULTIPOLYGON]).all()
+
+
+def _coverage(geometry):
+    """``geometry`` as a valid coverage, or None if it cannot be made one."""
+    if not _polygonal(geometry):
+        return None
+    if _is_coverage(geometry):
+        return geometry
+    # Boundaries digitized separately for each polygon rarely match
+    # exactly; snapping them together removes the tiny gaps and overlaps.
+    cleaned = shapely.coverage_clean(geometry)
+    if _is_coverage(cleaned):
+        return cleaned
+    return None
+
+
+def simplify(geometry, zoom, tile_size=TILE_SIZE):
+    """
+    Simplify web mercator geometries to one pixel at ``zoom``.
+
+    Polygons forming a coverage (or that can be cleaned into one) are
+    simplified with :func:`shapely.coverage_simplify`, which keeps shared
+    edges identical. Other geometries are simplified one by one,
+    preserving their topology.
+
+    Parameters
+    ----------
+    geometry : array-like of shapely geometries, in EPSG:3857
+    zoom : int
+    tile_size : int, default 256
+
+    Returns
+    -------
+    ndarray of shapely geometries
+    """
+    geometry = np.asarray(geometry, dtype=object)
+    coverage = _coverage(geometry)
+    return _simplify(geometry if coverage is None else coverage,
+                     tolerance(zoom, tile_size), coverage is not None)
+
+
+def _simplify(geometry, tolerance, coverage):
+    if coverage:
+        return shapely.coverage_simplify(geometry, tolerance)
+    return shapely.simplify(geometry, tolerance, preserve_topology=True)
+
+
+def build_pyramid(data, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, path=None,
+                  tile_size=TILE_SIZE):
+    """
+    Simplify ``data`` once per zoom level and store the levels on disk.
+
+    Parameters
+    ----------
+    data : GeoDataFrame
+        Polygons or lines, in any CRS.
+    min_zoom, max_zoom : int, default 0 and 12
+        Zoom levels to build. Beyond ``max_zoom``, :meth:`Pyramid.level`
+        returns ``data`` itself.
+    path : str or Path, optional
+        GeoPackage to store the simplified geometries in. Defaults to
+        ``CACHE_DIR / "lod" / "<layer hash>.gpkg"``; an existing pyramid of
+        the same geometries is reused. The attributes are not stored: they
+        are taken from ``data`` when a level is read.
+    tile_size : int, default 256
+
+    Returns
+    -------
+    Pyramid
+    """
+    if min_zoom > max_zoom:
+        raise ValueError("min_zoom must not be larger than max_zoom.")
+    if path is None:
+        key = "{}-{}-{}-{}".format(layer_hash(data), min_zoom, max_zoom, tile_size)
+        path = CACHE_DIR / "lod" / "{}.gpkg".format(key)
+    path = Path(path)
+    zooms = range(min_zoom, max_zoom + 1)
+    if not path.exists():
+        mercator = to_mercator(data)
+        geometry = np.asarray(mercator.geometry.values)
+        coverage = _coverage(geometry)
+        if coverage is None and len(geometry) > 1 and _polygonal(geometry):
+            warnings.warn(
+                "The polygons do not form a coverage; they are simplified one "
+                "by one and shared borders may not match.",
+                stacklevel=2,
+            )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Keep the suffix, from which GDAL infers the format.
+        tmp = path.with_name("{}.tmp{}".format(path.stem, path.suffix))
+        if tmp.exists():
+            tmp.unlink()
+        for zoom in zooms:
+            level = geopandas.GeoDataFrame(geometry=_simplify(
+                geometry if coverage is None else coverage,
+                tolerance(zoom, tile_size), coverage is not None),
+                crs=mercator.crs)
+            pyogrio.write_dataframe(level.to_crs("EPSG:4326"), tmp,
+                                    layer="z{}".format(zoom))
+        os.replace(tmp, path)
+    return Pyramid(data, path, zooms)
+
+
+class Pyramid:
+    """
+    Simplified versions of a layer, one per zoom level, in EPSG:4326.
+
+    Build it with :func:`build_pyramid`. Levels are read from the
+    GeoPackage on first use and kept in memory.
+    """
+
+    def __init__(self, data, path, zooms):
+        self.data = data
+        self.path = Path(path)
+        self.zooms = zooms
+        self._levels = {}
+
+    def __repr__(self):
+        return "Pyramid({!r}, zooms={}-{})".format(
+            str(self.path), self.zooms[0], self.zooms[-1])
+
+    def level(self, zoom):
+        """
+        The layer simplified for ``zoom``, in EPSG:4326.
+
+        Zoom levels below the pyramid use its coarsest level, zoom levels
+        above it the full-resolution layer. Fractional zooms are rounded
+        up, so the geometries are never coarser than a pixel.
+        """
+        zoom = int(math.ceil(zoom))
+        if zoom > self.zooms[-1]:
+            zoom = None
+        else:
+            zoom = max(zoom, self.zooms[0])
+        if zoom not in self._levels:
+            if zoom is None:
+                level = self.data
+                if level.crs is not None and not level.crs.equals("EPSG:4326"):
+                    level = level.to_crs("EPSG:4326")
+            else:
+                geometry = pyogrio.read_dataframe(
+                    self.path, layer="z{}".format(zoom)).geometry.values
+                level = geopandas.GeoDataFrame(
+                    self.data.drop(columns=self.data.geometry.name),
+                    geometry=geometry, crs=geometry.crs,
+                )
+                level.index = self.data.index
+            self._levels[zoom] = level
+        return self._levels[zoom]
+
+    def geojson(self, zoom, columns=None):
+        """
+        GeoJSON-like mapping of the level for ``zoom``.
+
+        Coordinates are rounded to the size of a pixel at that zoom, which
+        makes the serialized GeoJSON several times smaller again. Pass
+        ``columns`` to only include some of the attributes as properties,
+        e.g. those shown in a tooltip.
+        """
+        level = self.level(zoom)
+        if columns is not None:
+            level = level[list(columns) + [level.geometry.name]]
+        level = level.copy()
+        digits = precision(math.ceil(zoom))
+        level.geometry = shapely.transform(
+            np.asarray(level.geometry.values), lambda xy: np.round(xy, digits))
+        return level.__geo_interface__
+
+    def ipyleaflet_layer(self, m, columns=None, **kwargs):
+        """
+        ``ipyleaflet.GeoJSON`` layer showing the level matching the zoom of
+        the map ``m``, updated whenever the map is zoomed.
+
+        ``kwargs`` are passed to ``ipyleaflet.GeoJSON``, e.g. ``style``.
+        """
+        import ipyleaflet
+
+        layer = ipyleaflet.GeoJSON(data=self.geojson(m.zoom, columns), **kwargs)
+
+        def update(change):
+            layer.data = self.geojson(change["new"], columns)
+
+        m.observe(update, names="zoom")
+        return layer
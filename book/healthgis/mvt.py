@@ -0,0 +1,317 @@
+"""
+Mapbox Vector Tile (MVT) encoding.
+
+A vector tile is a protocol buffer message holding named layers of
+features, whose geometries are integer coordinates on a grid of
+``extent`` x ``extent`` cells covering the tile (y pointing down). The
+encoder here is written against the `MVT 2.1 specification
+<https://github.com/mapbox/vector-tile-spec>`_ without a protobuf
+dependency: geometries are converted to the command stream of the spec
+with NumPy for a whole layer at once, and only the small per-feature
+messages are assembled in Python.
+
+>>> from healthgis.mvt import encode_tile, tile_geometry
+>>> geometry = tile_geometry(districts.geometry, tile_bounds(12, 2074, 1409))
+>>> data = encode_tile({"districts": (geometry, districts[["district_name"]])})
+"""
+
+import struct
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from .tiles import _ranges
+
+EXTENT = 4096
+
+# Margin around a tile, in grid cells, so that lines and polygon edges do
+# not show seams at tile borders.
+BUFFER = 64
+
+GEOM_TYPES = {"Point": 1, "LineString": 2, "Polygon": 3}
+
+MOVE_TO, LINE_TO, CLOSE_PATH = 1, 2, 7
+
+# Wire types of the protocol buffer encoding.
+VARINT, FIXED64, LENGTH = 0, 1, 2
+
+
+def _zigzag(values):
+    values = np.asarray(values, dtype="int64")
+    return ((values << 1) ^ (values >> 63)).astype("uint64")
+
+
+def _varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _varints(values):
+    """
+    Varint encoding of an array of unsigned integers.
+
+    Returns the concatenated bytes, as a uint8 array, and the number of
+    bytes of each value.
+    """
+    values = np.asarray(values, dtype="uint64")
+    shifts = 7 * np.arange(10, dtype="uint64")
+    sizes = 1 + (values[:, None] >= (np.uint64(1) << shifts[1:])).sum(axis=1)
+    groups = (values[:, None] >> shifts) & 0x7F
+    # All but the last byte of a value have their high bit set.
+    more = np.arange(10) < sizes[:, None] - 1
+    encoded = (groups | (more.astype("uint64") << 7)).astype("uint8")
+    return encoded[np.arange(10) < sizes[:, None]], sizes
+
+
+def _join(pieces):
+    """
+    Concatenate per-feature byte strings, feature by feature.
+
+    ``pieces`` is a list of ``(buffer, lengths)``, where ``buffer`` holds
+    one segment per feature, of ``lengths`` bytes, back to back. Returns
+    the segments of all pieces of the first feature, then of the second
+    feature, and so on, and the number of bytes of each feature.
+    """
+    lengths = np.stack([length for _, length in pieces]).astype("int64")
+    total = lengths.sum(axis=0)
+    start = np.cumsum(total) - total
+    within = np.cumsum(lengths, axis=0) - lengths
+    out = np.empty(total.sum(), dtype="uint8")
+    for (buffer, length), offset in zip(pieces, within):
+        out[np.repeat(start + offset, length) + _ranges(length)] = buffer
+    return out, total
+
+
+def _key(number, wire_type, present):
+    """The key of a field for the features where it is ``present``."""
+    present = np.asarray(present, dtype="int64")
+    return (np.full(present.sum(), (number << 3) | wire_type, dtype="uint8"),
+            present)
+
+
+def _field(number, wire_type, payload):
+    key = _varint((number << 3) | wire_type)
+    if wire_type == LENGTH:
+        return key + _varint(len(payload)) + payload
+    return key + payload
+
+
+def tile_geometry(geometry, bounds, extent=EXTENT, buffer=BUFFER):
+    """
+    Clip geometries to a tile and convert them to its integer grid.
+
+    Parameters
+    ----------
+    geometry : array-like of shapely geometries
+        Valid geometries, in the CRS of ``bounds`` (usually EPSG:3857).
+    bounds : tuple of (minx, miny, maxx, maxy)
+        Bounds of the tile, see :func:`healthgis.tiles.tile_bounds`.
+    extent : int, default 4096
+        Size of the grid.
+    buffer : int, default 64
+        Margin kept around the tile, in grid cells.
+
+    Returns
+    -------
+    ndarray of shapely geometries
+        In grid coordinates (y pointing down), with polygon exteriors
+        oriented as the specification requires. Geometries outside the
+        tile or that collapse on the grid are empty.
+    """
+    minx, miny, maxx, maxy = bounds
+    scale = extent / (maxx - minx)
+    margin = buffer / scale
+    geometry = np.asarray(geometry, dtype=object)
+    geometry = shapely.clip_by_rect(geometry, minx - margin, miny - margin,
+                                    maxx + margin, maxy + margin)
+    geometry = shapely.transform(
+        geometry, lambda xy: (xy - [minx, maxy]) * [scale, -scale])
+    geometry = shapely.set_precision(geometry, 1)
+    # Exteriors must have a positive area in grid coordinates, which the
+    # flip of the y axis turns into a clockwise ring on screen.
+    return shapely.orient_polygons(geometry, exterior_cw=False)
+
+
+def _commands(geometry):
+    """
+    Geometry type and command stream of each feature.
+
+    ``geometry`` must hold points, lines or polygons only (single or
+    multi-part). Returns the geometry type of the layer, the concatenated
+    command integers, and the number of integers of each feature.
+    """
+    geom_type, coords, offsets = shapely.to_ragged_array(geometry)
+    geom_type = {
+        shapely.GeometryType.POINT: "Point",
+        shapely.GeometryType.MULTIPOINT: "Point",
+        shapely.GeometryType.LINESTRING: "LineString",
+        shapely.GeometryType.MULTILINESTRING: "LineString",
+        shapely.GeometryType.POLYGON: "Polygon",
+        shapely.GeometryType.MULTIPOLYGON: "Polygon",
+    }[geom_type]
+    coords = np.round(coords).astype("int64")
+    # Each part (point group, line or ring) is a range of ``coords``; the
+    # other levels of offsets map features to their parts.
+    if not offsets:
+        offsets = (np.arange(len(coords) + 1),)
+    starts = offsets[0]
+    part_feature = np.arange(len(geometry))
+    for level in offsets[:0:-1]:
+        part_feature = np.repeat(part_feature, np.diff(level))
+    sizes = np.diff(starts)
+    # Rings repeat their first point at the end; the spec closes them with
+    # a ClosePath command instead.
+    if geom_type == "Polygon":
+        keep = np.ones(len(coords), dtype=bool)
+        keep[starts[1:] - 1] = False
+        coords = coords[keep]
+        sizes = sizes - 1
+    part_start = np.cumsum(sizes) - sizes
+
+    # Positions are relative to the previous point, starting from (0, 0)
+    # for every feature.
+    point_feature = np.repeat(part_feature, sizes)
+    deltas = np.diff(coords, axis=0, prepend=[[0, 0]])
+    first = np.r_[True, point_feature[1:] != point_feature[:-1]]
+    deltas[first] = coords[first]
+    params = _zigzag(deltas).ravel()
+
+    # Insert the commands before the parameters they apply to; at the same
+    # position, the ClosePath of a ring comes before the next MoveTo.
+    if geom_type == "Point":
+        positions = [part_start * 2]
+        commands = [MOVE_TO | (sizes << 3)]
+    else:
+        positions = [part_start * 2, (part_start + 1) * 2]
+        commands = [np.full(len(sizes), MOVE_TO | (1 << 3)),
+                    LINE_TO | ((sizes - 1) << 3)]
+    if geom_type == "Polygon":
+        positions.insert(0, (part_start + sizes) * 2)
+        commands.insert(0, np.full(len(sizes), CLOSE_PATH | (1 << 3)))
+    positions, commands = np.concatenate(positions), np.concatenate(commands)
+    order = np.argsort(positions, kind="stable")
+    stream = np.insert(params, positions[order], commands[order].astype("uint64"))
+
+    per_part = 2 * sizes + {"Point": 1, "LineString": 2, "Polygon": 3}[geom_type]
+    per_feature = np.bincount(part_feature, weights=per_part,
+                              minlength=len(geometry)).astype("int64")
+    return geom_type, stream, per_feature
+
+
+def _value(value):
+    """A Value message of the specification."""
+    if isinstance(value, (bool, np.bool_)):
+        return _field(7, VARINT, _varint(int(value)))
+    if isinstance(value, (int, np.integer)):
+        if value < 0:
+            return _field(6, VARINT, _varint(int(_zigzag([value])[0])))
+        return _field(5, VARINT, _varint(int(value)))
+    if isinstance(value, (float, np.floating)):
+        return _field(3, FIXED64, struct.pack("<d", value))
+    return _field(1, LENGTH, str(value).encode())
+
+
+def encode_layer(name, geometry, properties=None, ids=None, extent=EXTENT):
+    """
+    Encode a layer of a vector tile.
+
+    Parameters
+    ----------
+    name : str
+    geometry : array-like of shapely geometries
+        In grid coordinates, see :func:`tile_geometry`. Empty geometries
+        are skipped.
+    properties : DataFrame, optional
+        Attributes of the features, in the same order. Missing values are
+        left out.
+    ids : array-like of int, optional
+        Feature ids, e.g. the position of the features in the layer.
+    extent : int, default 4096
+
+    Returns
+    -------
+    bytes
+        A Layer message (without the tag of the Tile message).
+    """
+    geometry = np.asarray(geometry, dtype=object)
+    keep = ~shapely.is_empty(geometry) & ~shapely.is_missing(geometry)
+    out = _field(15, VARINT, _varint(2)) + _field(1, LENGTH, name.encode())
+    if not keep.any():
+        return out + _field(5, VARINT, _varint(extent))
+    geometry = geometry[keep]
+    geom_type, stream, per_feature = _commands(geometry)
+    encoded, sizes = _varints(stream)
+    n = len(geometry)
+    geometry_bytes = np.bincount(np.repeat(np.arange(n), per_feature),
+                                 weights=sizes, minlength=n).astype("int64")
+
+    # Each feature has a tag (key index, value index) pair for each of
+    # its non-missing attributes.
+    codes, keys, values = [], [], []
+    if properties is not None and len(properties.columns):
+        properties = properties[keep]
+        for column in properties.columns:
+            column_codes, uniques = pd.factorize(properties[column])
+            if not len(uniques):
+                continue
+            codes.append(np.where(column_codes >= 0, column_codes + len(values), -1))
+            keys.append(_field(3, LENGTH, str(column).encode()))
+            values.extend(_field(4, LENGTH, _value(v)) for v in uniques)
+    if codes:
+        codes = np.column_stack(codes)
+        present = codes >= 0
+        key_index = np.broadcast_to(np.arange(codes.shape[1]), codes.shape)
+        tags = np.stack([key_index[present], codes[present]], axis=1).ravel()
+        tag_bytes, tag_sizes = _varints(tags)
+        tag_count = 2 * present.sum(axis=1)
+        tag_lengths = np.bincount(np.repeat(np.arange(n), tag_count),
+                                  weights=tag_sizes, minlength=n).astype("int64")
+    else:
+        tag_bytes = np.empty(0, dtype="uint8")
+        tag_count = tag_lengths = np.zeros(n, dtype="int64")
+    has_tags = tag_count > 0
+    tag_length_bytes, tag_length_sizes = _varints(tag_lengths[has_tags])
+    tag_length_lengths = np.zeros(n, dtype="int64")
+    tag_length_lengths[has_tags] = tag_length_sizes
+
+    ids = np.arange(len(keep)) if ids is None else np.asarray(ids)
+    ones = np.ones(n, dtype="int64")
+    features, feature_lengths = _join([
+        _key(1, VARINT, ones), _varints(ids[keep]),
+        _key(2, LENGTH, has_tags), (tag_length_bytes, tag_length_lengths),
+        (tag_bytes, tag_lengths),
+        _key(3, VARINT, ones),
+        (np.full(n, GEOM_TYPES[geom_type], dtype="uint8"), ones),
+        _key(4, LENGTH, ones), _varints(geometry_bytes),
+        (encoded, geometry_bytes),
+    ])
+    features, _ = _join([_key(2, LENGTH, ones),
+                         _varints(feature_lengths), (features, feature_lengths)])
+    return (out + features.tobytes() + b"".join(keys) + b"".join(values)
+            + _field(5, VARINT, _varint(extent)))
+
+
+def encode_tile(layers, extent=EXTENT):
+    """
+    Encode a vector tile.
+
+    Parameters
+    ----------
+    layers : dict
+        ``{name: (geometry, properties)}`` or ``{name: (geometry,
+        properties, ids)}``, see :func:`encode_layer`.
+    extent : int, default 4096
+
+    Returns
+    -------
+    bytes
+    """
+    return b"".join(
+        _field(3, LENGTH, encode_layer(name, *layer, extent=extent))
+        for name, layer in layers.items()
+    )
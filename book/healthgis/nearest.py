@@ -0,0 +1,80 @@
+"""
+Nearest-feature lookups between two GeoDataFrames.
+
+Instead of computing the distance from every point to every polygon in a
+Python ``apply``, the spatial index of the polygon layer is built once and
+queried for all points in a single batched call.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def nearest(points, polygons, columns=None, max_distance=None,
+            distance_col="distance"):
+    """
+    Attach the attributes of the nearest feature of ``polygons`` to each point.
+
+    Parameters
+    ----------
+    points : GeoDataFrame
+        Query geometries (typically points, but any geometry type works).
+    polygons : GeoDataFrame
+        Features to search. Their spatial index (``polygons.sindex``) is
+        built on first use and cached on the frame, so repeated calls
+        against the same layer do not rebuild it.
+    columns : list of str, optional
+        Columns of ``polygons`` to attach. Defaults to all non-geometry
+        columns.
+    max_distance : float, optional
+        Only consider features within this distance. Points without a
+        feature in range get missing values. Setting a cutoff lets the
+        index prune the search early.
+    distance_col : str or None, default "distance"
+        Name of the column holding the distance to the nearest feature.
+        Pass None to leave it out.
+
+    Returns
+    -------
+    GeoDataFrame
+        Copy of ``points`` with the requested attributes, an
+        ``index_right`` column with the index label of the nearest feature
+        and the distance column.
+
+    Examples
+    --------
+    >>> closest = nearest(data_utm, protected_areas_utm, columns=['NAME_AP'])
+    >>> closest[['NAME_AP', 'distance']].head()  # doctest: +SKIP
+    """
+    if points.crs != polygons.crs:
+        raise ValueError(
+            "CRS mismatch between the points ({}) and polygons ({}). Use "
+            "'to_crs' to convert them to a common CRS first.".format(
+                points.crs, polygons.crs
+            )
+        )
+    if columns is None:
+        columns = [c for c in polygons.columns if c != polygons.geometry.name]
+
+    (input_idx, tree_idx), distances = polygons.sindex.nearest(
+        points.geometry,
+        return_all=False,
+        max_distance=max_distance,
+        return_distance=True,
+    )
+
+    right = pd.DataFrame(polygons[columns]).iloc[tree_idx]
+    right.insert(0, "index_right", polygons.index[tree_idx])
+    right.index = input_idx
+    right = right.reindex(np.arange(len(points)))
+    right.index = points.index
+    right.columns = [
+        "{}_right".format(c) if c in points.columns else c for c in right.columns
+    ]
+
+    result = pd.concat([points, right], axis=1)
+    if distance_col is not None:
+        dist = np.full(len(points), np.nan)
+        dist[input_idx] = distances
+        result[distance_col] = dist
+    return result
@@ -0,0 +1,129 @@
+"""
+Index-driven intersection overlay, parallelized per feature of the mask.
+
+Equivalent to ``geopandas.overlay(df1, df2, how="intersection")`` for
+polygon layers, but the candidate pairs found with the spatial index are
+first tested for containment: a land use polygon that lies completely in a
+district is passed through as is, and only the polygons crossing a district
+border are actually intersected. Those intersections are computed per
+district, spread over a process pool.
+
+>>> from healthgis.overlay import overlay_intersection
+>>> land_use_districts = overlay_intersection(land_use, districts, max_workers=4)
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import geopandas
+import shapely
+
+POLYGON_TYPES = ["Polygon", "MultiPolygon"]
+
+
+def _make_valid(df):
+    geometry = np.asarray(df.geometry.values)
+    invalid = ~shapely.is_valid(geometry)
+    if invalid.any():
+        geometry = geometry.copy()
+        geometry[invalid] = _polygonal(shapely.make_valid(geometry[invalid]))
+        df = df.copy()
+        df[df.geometry.name] = geopandas.GeoSeries(geometry, index=df.index,
+                                                   crs=df.crs)
+    return df
+
+
+def _polygonal(geometry):
+    """Keep only the polygonal parts of collections, None for the rest."""
+    geometry = np.array(geometry, dtype=object)
+    type_ids = shapely.get_type_id(geometry)
+    collection = type_ids == shapely.GeometryType.GEOMETRYCOLLECTION
+    for i in np.flatnonzero(collection):
+        parts = shapely.get_parts(shapely.get_parts(geometry[i]))
+        parts = parts[np.isin(shapely.get_type_id(parts),
+                              [shapely.GeometryType.POLYGON])]
+        geometry[i] = shapely.union_all(parts) if len(parts) else None
+    polygonal = np.isin(
+        shapely.get_type_id(geometry),
+        [shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON],
+    )
+    geometry[~polygonal | shapely.is_empty(geometry)] = None
+    return geometry
+
+
+def _intersect(args):
+    mask, geometry = args
+    shapely.prepare(mask)
+    return shapely.intersection(geometry, mask)
+
+
+def overlay_intersection(df1, df2, max_workers=1):
+    """
+    Intersection of two polygon layers.
+
+    Parameters
+    ----------
+    df1, df2 : GeoDataFrame
+        Polygon layers in the same CRS. The work is split per feature of
+        ``df2`` (e.g. per district), so that should be the smaller layer.
+    max_workers : int, default 1
+        Number of worker processes for the intersections. With 1, every
+        intersection is computed in the current process.
+
+    Returns
+    -------
+    GeoDataFrame
+        Same rows, columns and order as ``geopandas.overlay(df1, df2,
+        how="intersection")``: the attributes of both layers (clashing
+        names suffixed with ``_1`` and ``_2``) and the intersected
+        geometries, with non-polygonal results dropped.
+    """
+    if df1.crs != df2.crs:
+        raise ValueError(
+            "CRS mismatch between the layers ({}) and ({}).".format(
+                df1.crs, df2.crs
+            )
+        )
+    df1 = _make_valid(df1)
+    df2 = _make_valid(df2)
+    idx1, idx2 = df2.sindex.query(df1.geometry, predicate="intersects",
+                                  sort=True)
+    g1 = np.asarray(df1.geometry.values)[idx1]
+    g2 = np.asarray(df2.geometry.values)[idx2]
+
+    # Features lying completely in the other one need no intersection.
+    geometry = np.empty(len(idx1), dtype=object)
+    inside1 = shapely.covers(g2, g1)
+    geometry[inside1] = g1[inside1]
+    inside2 = ~inside1
+    inside2[inside2] = shapely.covers(g1[inside2], g2[inside2])
+    geometry[inside2] = g2[inside2]
+
+    crossing = np.flatnonzero(~inside1 & ~inside2)
+    groups = pd.Series(crossing).groupby(idx2[crossing]).indices
+    positions = [crossing[group] for group in groups.values()]
+    tasks = [(g2[pos[0]], g1[pos]) for pos in positions]
+    if max_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers) as pool:
+            results = list(pool.map(_intersect, tasks,
+                                    chunksize=max(1, len(tasks) // (4 * max_workers))))
+    else:
+        results = [_intersect(task) for task in tasks]
+    for pos, result in zip(positions, results):
+        geometry[pos] = result
+    if len(crossing):
+        geometry[crossing] = _polygonal(
+            shapely.make_valid(geometry[crossing].astype(object))
+        )
+
+    keep = ~pd.isna(geometry)
+    pairs = pd.DataFrame({"__idx1": idx1[keep], "__idx2": idx2[keep]})
+    attrs1 = pd.DataFrame(df1.drop(columns=df1.geometry.name)).reset_index(drop=True)
+    attrs2 = pd.DataFrame(df2.drop(columns=df2.geometry.name)).reset_index(drop=True)
+    result = pairs.merge(attrs1, left_on="__idx1", right_index=True)
+    result = result.merge(attrs2, left_on="__idx2", right_index=True,
+                          suffixes=("_1", "_2"))
+    result = result.drop(columns=["__idx1", "__idx2"]).reset_index(drop=True)
+    result["geometry"] = geopandas.GeoSeries(geometry[keep], crs=df1.crs)
+    return geopandas.GeoDataFrame(result, geometry="geometry", crs=df1.crs)
@@ -0,0 +1,167 @@
+"""
+GeoParquet cache of the bundled datasets.
+
+``geopandas.read_file`` parses every column and geometry of a shapefile,
+GeoJSON or GeoPackage each time it is called. :func:`convert` writes a
+dataset once as GeoParquet (WKB geometries plus a covering ``bbox``
+column), and :func:`read` reads from that cache, only loading the requested
+columns and the row groups that intersect a bounding box.
+
+>>> from healthgis.parquet import read
+>>> countries = read("ne_110m_admin_0_countries.zip", columns=["iso_a3", "name", "continent"])
+>>> districts = read("paris_districts.geojson", bbox=(2.25, 48.84, 2.30, 48.87))
+
+Run ``python -m healthgis.parquet`` from ``book/`` to convert all datasets
+up front.
+"""
+
+import functools
+import hashlib
+import json
+from pathlib import Path
+
+import geopandas
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pyproj import CRS
+
+from .paths import CACHE_DIR, DATA_DIR, resolve
+
+DATASET_SUFFIXES = (".zip", ".geojson", ".gpkg", ".shp")
+
+# Small row groups let bbox filters skip most of a large file. Rows are
+# written sorted along a Hilbert curve, so each row group covers a compact
+# area; the original row order is restored on read.
+ROW_GROUP_SIZE = 8192
+
+# Key of ``DataFrame.attrs`` recording the dataset a cached file was
+# converted from; pyarrow stores the attrs in the Parquet metadata.
+SOURCE_KEY = "healthgis_source"
+
+
+def cache_path(path, cache_dir=CACHE_DIR):
+    """
+    Location of the GeoParquet copy of the dataset at ``path``.
+
+    The file name holds a hash of the resolved source, including the path
+    inside an archive, so datasets with the same name in different
+    directories or archives get their own cache file.
+    """
+    file, source = resolve(path)
+    digest = hashlib.sha1(source.encode()).hexdigest()[:16]
+    stem = Path(source.split("!")[-1]).stem
+    return Path(cache_dir) / "{}-{}.parquet".format(stem, digest)
+
+
+def _cached_source(target):
+    """The source recorded in a cached file, None if there is none."""
+    metadata = pq.read_schema(target).metadata or {}
+    attrs = json.loads(metadata.get(b"PANDAS_ATTRS", b"{}"))
+    return attrs.get(SOURCE_KEY)
+
+
+def convert(path, cache_dir=CACHE_DIR, overwrite=False):
+    """
+    Write the dataset at ``path`` to the GeoParquet cache.
+
+    The conversion is skipped when the cached file was converted from the
+    same source and is newer than it, unless ``overwrite=True``.
+
+    Returns
+    -------
+    Path
+        The cached GeoParquet file.
+    """
+    file, source = resolve(path)
+    target = cache_path(path, cache_dir)
+    if (not overwrite and target.exists()
+            and target.stat().st_mtime_ns >= file.stat().st_mtime_ns
+            and _cached_source(target) == source):
+        return target
+
+    gdf = geopandas.read_file(source)
+    gdf = gdf.iloc[gdf.geometry.hilbert_distance().argsort(kind="stable")]
+    gdf.attrs[SOURCE_KEY] = source
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix(".parquet.tmp")
+    gdf.to_parquet(tmp, index=True, write_covering_bbox=True,
+                   row_group_size=ROW_GROUP_SIZE)
+    tmp.replace(target)
+    return target
+
+
+def convert_all(data_dir=DATA_DIR, cache_dir=CACHE_DIR, overwrite=False):
+    """Convert every dataset in ``data_dir``, see :func:`datasets`."""
+    return [convert(path, cache_dir=cache_dir, overwrite=overwrite)
+            for path in datasets(data_dir)]
+
+
+def datasets(data_dir=DATA_DIR):
+    """Paths of the vector datasets (zipped shapefiles, GeoJSON, GPKG)."""
+    return sorted(p for p in Path(data_dir).iterdir()
+                  if p.suffix in DATASET_SUFFIXES)
+
+
+def read(path, columns=None, bbox=None, cache_dir=CACHE_DIR):
+    """
+    Read a dataset through the GeoParquet cache, converting it if needed.
+
+    Parameters
+    ----------
+    path : str or Path
+        Dataset to read, see :func:`healthgis.paths.resolve`.
+    columns : list of str, optional
+        Only read these columns. Without the geometry column, a plain
+        DataFrame is returned and no geometry is decoded at all.
+    bbox : tuple of (minx, miny, maxx, maxy), optional
+        Only return the features whose bounding box intersects ``bbox``,
+        in the CRS of the dataset. Row groups outside the box are skipped
+        using the statistics of the covering bbox column.
+
+    Returns
+    -------
+    GeoDataFrame or DataFrame
+        In the row order of the original dataset.
+    """
+    target = convert(path, cache_dir=cache_dir)
+    meta = json.loads(pq.read_schema(target).metadata[b"geo"])
+    geometry = meta["primary_column"]
+
+    filters = None
+    if bbox is not None:
+        xmin, ymin, xmax, ymax = bbox
+        filters = (
+            (pc.field("bbox", "xmin") <= xmax) & (pc.field("bbox", "xmax") >= xmin)
+            & (pc.field("bbox", "ymin") <= ymax) & (pc.field("bbox", "ymax") >= ymin)
+        )
+    if columns is None:
+        columns = [c for c in pq.read_schema(target).names
+                   if c != "bbox" and not c.startswith("__index_level_")]
+    table = pq.read_table(target, columns=list(columns), filters=filters,
+                          use_pandas_metadata=True)
+
+    df = table.drop([geometry] if geometry in columns else []).to_pandas()
+    if geometry in columns:
+        # geopandas.read_parquet parses the PROJJSON of the CRS on every
+        # call, which dominates the read time of small layers.
+        crs = meta["columns"][geometry].get("crs", "OGC:CRS84")
+        values = geopandas.array.from_wkb(
+            table[geometry].to_numpy(zero_copy_only=False),
+            crs=_crs(json.dumps(crs)),
+        )
+        df.insert(list(columns).index(geometry), geometry, values)
+        df = geopandas.GeoDataFrame(df, geometry=geometry)
+    df.attrs.pop(SOURCE_KEY, None)
+    return df.sort_index()
+
+
+@functools.lru_cache()
+def _crs(projjson):
+    crs = json.loads(projjson)
+    return None if crs is None else CRS.from_user_input(crs)
+
+
+if __name__ == "__main__":
+    # python -m healthgis.parquet: convert every dataset in book/data.
+    for target in convert_all():
+        print(target)
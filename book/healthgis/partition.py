@@ -0,0 +1,182 @@
+"""
+Spatially partitioned processing of GeoDataFrames on a local process pool.
+
+This follows the dask-geopandas model: the rows of a large layer are sorted
+along a space-filling curve (or binned on a regular grid) and cut into
+partitions of spatially close features. Every partition is then processed
+independently by a worker process, and the partial results are merged.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import geopandas
+
+
+def partition(gdf, npartitions, method="hilbert"):
+    """
+    Split ``gdf`` into ``npartitions`` spatially coherent parts.
+
+    Parameters
+    ----------
+    gdf : GeoDataFrame
+    npartitions : int
+        Number of partitions. With ``method="grid"``, the grid has
+        ``ceil(sqrt(npartitions))`` cells along each axis and empty cells
+        are dropped, so fewer partitions can be returned.
+    method : {"hilbert", "grid"}, default "hilbert"
+        ``"hilbert"`` sorts the features by the Hilbert distance of the
+        center of their bounding box and cuts the result in equally sized
+        chunks. ``"grid"`` assigns every feature to the cell of a regular
+        grid over the total bounds that contains its bounding box center.
+
+    Returns
+    -------
+    list of GeoDataFrame
+    """
+    if npartitions < 1:
+        raise ValueError("npartitions should be at least 1")
+
+    if method == "hilbert":
+        distances = np.asarray(gdf.geometry.hilbert_distance())
+        order = np.argsort(distances, kind="stable")
+        return [gdf.iloc[chunk] for chunk in np.array_split(order, npartitions)
+                if len(chunk)]
+    elif method == "grid":
+        n = int(np.ceil(np.sqrt(npartitions)))
+        bounds = gdf.geometry.bounds.values
+        x = (bounds[:, 0] + bounds[:, 2]) / 2
+        y = (bounds[:, 1] + bounds[:, 3]) / 2
+        xmin, ymin, xmax, ymax = gdf.total_bounds
+        ix = np.clip(((x - xmin) / (xmax - xmin or 1) * n).astype(int), 0, n - 1)
+        iy = np.clip(((y - ymin) / (ymax - ymin or 1) * n).astype(int), 0, n - 1)
+        cell = iy * n + ix
+        return [gdf.iloc[np.flatnonzero(cell == c)] for c in np.unique(cell)]
+    else:
+        raise ValueError(
+            "method should be one of 'hilbert' or 'grid', got {!r}".format(method)
+        )
+
+
+def count_within(points, polygons, by, predicate="within"):
+    """
+    Count the points falling in each polygon, grouped by column ``by``.
+
+    This is the single-core version of the tree density exercise in
+    ``04-spatial-joins``: a spatial join followed by ``groupby().size()``.
+    """
+    joined = geopandas.sjoin(
+        points[[points.geometry.name]], polygons[[by, polygons.geometry.name]],
+        predicate=predicate,
+    )
+    return joined.groupby(by).size()
+
+
+# The polygon layer is sent to each worker once through the pool
+# initializer, instead of being pickled again for every partition.
+_polygons = None
+
+
+def _init_worker(polygons):
+    global _polygons
+    _polygons = polygons
+
+
+def _count_partition(args):
+    part, by, predicate = args
+    xmin, ymin, xmax, ymax = part.total_bounds
+    candidates = _polygons.cx[xmin:xmax, ymin:ymax]
+    return count_within(part, candidates, by, predicate=predicate)
+
+
+def parallel_count_within(points, polygons, by, npartitions=None,
+                          max_workers=None, method="hilbert",
+                          predicate="within"):
+    """
+    Partitioned, multi-process version of :func:`count_within`.
+
+    The points are spatially partitioned with :func:`partition`, each
+    partition is joined against the polygons that overlap its bounding box
+    in a worker process, and the per-partition counts are summed.
+
+    Parameters
+    ----------
+    points, polygons : GeoDataFrame
+        Both layers should use the same CRS.
+    by : str
+        Column of ``polygons`` to group the counts by.
+    npartitions : int, optional
+        Defaults to four partitions per worker, which keeps the workers
+        busy when some partitions are slower than others.
+    max_workers : int, optional
+        Number of worker processes. Defaults to ``os.cpu_count()``.
+    method, predicate : str
+        Passed to :func:`partition` and ``geopandas.sjoin``.
+
+    Returns
+    -------
+    Series
+        Number of points per value of ``by``, sorted by index.
+    """
+    if points.crs != polygons.crs:
+        raise ValueError(
+            "CRS mismatch between the points ({}) and polygons ({}).".format(
+                points.crs, polygons.crs
+            )
+        )
+    max_workers = max_workers or os.cpu_count() or 1
+    npartitions = npartitions or 4 * max_workers
+    parts = partition(points, npartitions, method=method)
+    polygons = polygons[[by, polygons.geometry.name]]
+
+    if max_workers == 1:
+        _init_worker(polygons)
+        results = [_count_partition((p, by, predicate)) for p in parts]
+    else:
+        with ProcessPoolExecutor(
+            max_workers, initializer=_init_worker, initargs=(polygons,)
+        ) as pool:
+            results = list(
+                pool.map(_count_partition, [(p, by, predicate) for p in parts])
+            )
+    counts = pd.concat(results).groupby(level=0).sum()
+    counts.index.name = by
+    return counts.sort_index()
+
+
+def scaling_curve(points, polygons, by, max_workers=None, repeat=3, **kwargs):
+    """
+    Time :func:`parallel_count_within` for 1 up to ``max_workers`` workers.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Largest number of workers to try. Defaults to ``os.cpu_count()``.
+    repeat : int, default 3
+        Number of runs per worker count; the fastest is reported.
+    **kwargs
+        Passed to :func:`parallel_count_within`.
+
+    Returns
+    -------
+    DataFrame
+        Indexed by the number of workers, with the wall time in seconds,
+        the speedup relative to one worker and the parallel efficiency
+        (speedup divided by the number of workers).
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    records = []
+    for n in range(1, max_workers + 1):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parallel_count_within(points, polygons, by, max_workers=n, **kwargs)
+            timings.append(time.perf_counter() - start)
+        records.append((n, min(timings)))
+    curve = pd.DataFrame(records, columns=["workers", "seconds"]).set_index("workers")
+    curve["speedup"] = curve["seconds"].iloc[0] / curve["seconds"]
+    curve["efficiency"] = curve["speedup"] / curve.index
+    return curve
@@ -0,0 +1,58 @@
+"""
+Locations of the bundled datasets and of the on-disk caches.
+"""
+
+import os
+import zipfile
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+# Derived files (spatial indexes, converted layers, ...) are written next to
+# the data, in a directory that is ignored by git. Set HEALTHGIS_CACHE_DIR
+# to put them elsewhere, e.g. on a shared volume.
+CACHE_DIR = Path(os.environ.get("HEALTHGIS_CACHE_DIR", DATA_DIR / ".cache"))
+
+
+def resolve(path):
+    """
+    Split a dataset path into the file on disk and the path to read.
+
+    ``path`` can be relative to :data:`DATA_DIR` or absolute, can carry a
+    ``zip://`` prefix and can point inside an archive with ``!``, as in
+    ``"cod_conservation.zip!Conservation/RDC_aire_protegee_2013.shp"``.
+    When an archive holds a single shapefile in a subdirectory, that
+    shapefile is used.
+
+    Returns
+    -------
+    file : Path
+        The file on disk (the archive for zipped datasets), e.g. to check
+        its modification time.
+    source : str
+        The path to pass to ``geopandas.read_file``.
+    """
+    path = str(path)
+    if path.startswith("zip://"):
+        path = path[len("zip://"):]
+    path, _, inner = path.partition("!")
+    file = Path(path)
+    if not file.is_absolute() and not file.exists():
+        file = DATA_DIR / file
+    file = file.resolve()
+    source = str(file)
+    if file.suffix == ".zip":
+        source = "zip://" + source
+        if not inner:
+            inner = _nested_shapefile(file)
+    if inner:
+        source += "!" + inner
+    return file, source
+
+
+def _nested_shapefile(file):
+    with zipfile.ZipFile(file) as archive:
+        shapefiles = [n for n in archive.namelist() if n.endswith(".shp")]
+    if len(shapefiles) == 1 and "/" in shapefiles[0]:
+        return shapefiles[0]
+    return ""
@@ -0,0 +1,76 @@
+"""
+Spatial predicates of a whole layer against one fixed geometry.
+
+``cities.within(france)`` tests every city against the full, unprepared
+France polygon. :func:`evaluate` computes the same result by preparing the
+fixed geometry once (GEOS prepared geometry), skipping the rows whose
+bounding box does not intersect it using the spatial index of the layer,
+and evaluating the remaining rows in one vectorized call. Shapely keeps
+the prepared state on the geometry object itself, so repeated filters
+against the same district (e.g. ``districts.geometry.iloc[52]``) reuse it
+without a cache of their own.
+
+>>> from healthgis.predicates import evaluate
+>>> cities[evaluate(cities, "within", france)]
+"""
+
+import numpy as np
+import shapely
+
+# ``layer.<predicate>(geometry)`` is computed as
+# ``<inverse>(geometry, layer)``, with the fixed geometry as the prepared
+# first argument.
+INVERSE = {
+    "intersects": "intersects",
+    "within": "contains",
+    "contains": "within",
+    "covered_by": "covers",
+    "covers": "covered_by",
+    "crosses": "crosses",
+    "overlaps": "overlaps",
+    "touches": "touches",
+    "disjoint": "disjoint",
+}
+
+
+def evaluate(layer, predicate, geometry):
+    """
+    Evaluate ``layer.<predicate>(geometry)`` for every row of ``layer``.
+
+    Parameters
+    ----------
+    layer : GeoDataFrame or GeoSeries
+        Its spatial index (``layer.sindex``) is built on first use and
+        cached on the object, like for ``geopandas.sjoin``.
+    predicate : str
+        One of the keys of :data:`INVERSE`, e.g. "within", "contains",
+        "intersects" or "crosses".
+    geometry : shapely geometry
+        The fixed geometry, in the CRS of ``layer``.
+
+    Returns
+    -------
+    ndarray of bool
+        Aligned with the rows of ``layer``; use it directly as a mask, as
+        in ``layer[evaluate(layer, "within", france)]``.
+    """
+    if predicate not in INVERSE:
+        raise ValueError(
+            "predicate should be one of {}, got {!r}".format(
+                sorted(INVERSE), predicate
+            )
+        )
+    # A no-op if ``geometry`` is already prepared.
+    shapely.prepare(geometry)
+    if predicate == "disjoint":
+        # Missing geometries are neither intersecting nor disjoint.
+        missing = shapely.is_missing(np.asarray(layer.geometry.values))
+        return ~evaluate(layer, "intersects", geometry) & ~missing
+
+    # Rows whose bounding box misses the geometry are False for all
+    # remaining predicates.
+    candidates = layer.sindex.query(geometry)
+    values = np.asarray(layer.geometry.values)[candidates]
+    result = np.zeros(len(layer), dtype=bool)
+    result[candidates] = getattr(shapely, INVERSE[predicate])(geometry, values)
+    return result
@@ -0,0 +1,111 @@
+"""
+"Within distance" spatial join, without building buffer polygons.
+
+Joining points to ``facilities.buffer(radius)`` first creates a polygon
+approximation of every buffer and then tests the points against those
+polygons. :func:`sjoin_dwithin` instead queries the spatial index with the
+bounding boxes expanded by the distance and checks the exact distance of
+the candidate pairs. The distance can differ per row, e.g. a different
+catchment radius per facility.
+
+>>> from healthgis.proximity import sjoin_dwithin
+>>> patients_in_catchment = sjoin_dwithin(patients, clinics, distance="radius")
+"""
+
+import numpy as np
+import pandas as pd
+import shapely
+
+
+def _join_pairs(left, right, left_idx, right_idx, how="inner"):
+    """
+    Combine the rows of ``left`` and ``right`` at the given positions.
+
+    Returns ``left`` with the attributes of the matching ``right`` rows and
+    an ``index_right`` column, sorted by the position in ``left``. With
+    ``how="left"``, the ``left`` rows without a match are kept, with
+    missing values for the ``right`` attributes.
+    """
+    order = np.lexsort((right_idx, left_idx))
+    left_idx, right_idx = left_idx[order], right_idx[order]
+    if how == "left":
+        unmatched = np.setdiff1d(np.arange(len(left)), left_idx)
+        left_idx = np.concatenate([left_idx, unmatched])
+        right_idx = np.concatenate([right_idx, np.full(len(unmatched), -1)])
+        order = np.argsort(left_idx, kind="stable")
+        left_idx, right_idx = left_idx[order], right_idx[order]
+    elif how != "inner":
+        raise ValueError(
+            "how should be one of 'inner' or 'left', got {!r}".format(how)
+        )
+
+    matched = right_idx >= 0
+    attrs = pd.DataFrame(right.drop(columns=right.geometry.name))
+    attrs.insert(0, "index_right", right.index)
+    attrs.columns = [
+        "{}_right".format(c) if c in left.columns else c for c in attrs.columns
+    ]
+    attrs = attrs.iloc[right_idx[matched]]
+    attrs.index = np.flatnonzero(matched)
+    attrs = attrs.reindex(np.arange(len(left_idx)))
+
+    result = left.iloc[left_idx]
+    attrs.index = result.index
+    return pd.concat([result, attrs], axis=1), left_idx, right_idx
+
+
+def sjoin_dwithin(left, right, distance, how="inner", distance_col=None):
+    """
+    Join the rows of ``right`` within ``distance`` of each row of ``left``.
+
+    Equivalent to ``geopandas.sjoin(left, right_buffered, predicate=
+    "intersects")`` with ``right_buffered`` the right geometries buffered
+    by ``distance``, but exact and without creating any buffer.
+
+    Parameters
+    ----------
+    left, right : GeoDataFrame
+        Layers in the same projected CRS. The spatial index of ``left`` is
+        used (and cached on it), so ``left`` is typically the larger
+        layer, e.g. the patients.
+    distance : float, str or array-like
+        Maximum distance, in the units of the CRS. A column name of
+        ``right`` or an array aligned with ``right`` gives a distance per
+        ``right`` row.
+    how : {"inner", "left"}, default "inner"
+        With "left", rows of ``left`` without any ``right`` row in range are
+        kept, with missing values.
+    distance_col : str, optional
+        Name of a column to hold the distance of each joined pair.
+
+    Returns
+    -------
+    GeoDataFrame
+        A row per (left, right) pair within distance, ordered by ``left``,
+        with the attributes of ``right`` and an ``index_right`` column, as
+        returned by ``geopandas.sjoin``.
+    """
+    if left.crs != right.crs:
+        raise ValueError(
+            "CRS mismatch between the left ({}) and right ({}) layers.".format(
+                left.crs, right.crs
+            )
+        )
+    if isinstance(distance, str):
+        distance = right[distance]
+    distance = np.asarray(distance, dtype="float64")
+
+    right_idx, left_idx = left.sindex.query(
+        right.geometry, predicate="dwithin", distance=distance
+    )
+    result, left_idx, right_idx = _join_pairs(left, right, left_idx,
+                                              right_idx, how=how)
+    if distance_col is not None:
+        matched = right_idx >= 0
+        dist = np.full(len(result), np.nan)
+        dist[matched] = shapely.distance(
+            np.asarray(left.geometry.values)[left_idx[matched]],
+            np.asarray(right.geometry.values)[right_idx[matched]],
+        )
+        result[distance_col] = dist
+    return result
@@ -0,0 +1,327 @@
+"""
+Process-wide registry of reference layers with a persistent spatial index.
+
+Reference layers such as the Natural Earth countries or the Paris districts
+are read, reprojected and indexed once per process. The reprojected layer
+and a packed R-tree over its bounding boxes are also written to
+:data:`~healthgis.paths.CACHE_DIR`, keyed by the file path, its
+modification time and the target CRS. A fresh kernel loads the layer from
+that cache and memory-maps the index instead of rebuilding it.
+
+>>> from healthgis.registry import load_layer
+>>> districts = load_layer("paris_districts.geojson", crs="EPSG:2154")
+>>> districts.lookup(patients, "district_name")  # doctest: +SKIP
+
+Lookups are evaluated for all points at once, so pass a whole batch of
+points rather than calling :meth:`Layer.lookup` point by point.
+"""
+
+import functools
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import geopandas
+import shapely
+from pyproj import CRS
+
+from .crs import to_crs
+from .paths import CACHE_DIR, resolve
+
+# Bump when the layout of the cached files changes.
+CACHE_VERSION = 3
+
+
+@functools.lru_cache()
+def _normalize_crs(crs):
+    return None if crs is None else CRS.from_user_input(crs).to_wkt()
+
+
+class PackedRTree:
+    """
+    Static, packed R-tree over a set of bounding boxes.
+
+    The boxes are sorted along a Hilbert curve and grouped ``node_size`` at
+    a time into parent nodes, level by level up to the root. All levels are
+    stored in a single ``(n, 4)`` array, so the index can be saved with
+    :meth:`save` and memory-mapped with :meth:`load` without any rebuild.
+    """
+
+    def __init__(self, boxes, order, level_bounds, node_size):
+        self.boxes = boxes
+        self.order = order
+        self.level_bounds = level_bounds
+        self.node_size = node_size
+
+    @classmethod
+    def build(cls, geometry, node_size=16):
+        """Build the tree over the bounding boxes of a GeoSeries."""
+        bounds = shapely.bounds(np.asarray(geometry.values))
+        if len(bounds):
+            order = np.argsort(np.asarray(geometry.hilbert_distance()),
+                               kind="stable")
+        else:
+            order = np.arange(0)
+        levels = [bounds[order]]
+        while len(levels[-1]) > 1:
+            child = levels[-1]
+            starts = np.arange(0, len(child), node_size)
+            levels.append(np.column_stack([
+                np.fmin.reduceat(child[:, 0], starts),
+                np.fmin.reduceat(child[:, 1], starts),
+                np.fmax.reduceat(child[:, 2], starts),
+                np.fmax.reduceat(child[:, 3], starts),
+            ]))
+        level_bounds = np.cumsum([0] + [len(level) for level in levels])
+        return cls(np.concatenate(levels), order, level_bounds, node_size)
+
+    def save(self, directory):
+        directory = Path(directory)
+        np.save(directory / "boxes.npy", self.boxes)
+        np.save(directory / "order.npy", self.order)
+        np.save(directory / "levels.npy",
+                np.append(self.level_bounds, self.node_size))
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        directory = Path(directory)
+        levels = np.load(directory / "levels.npy")
+        # np.asarray drops the np.memmap subclass (and its overhead on
+        # every indexing operation) but keeps the memory-mapped buffer.
+        return cls(
+            np.asarray(np.load(directory / "boxes.npy", mmap_mode=mmap_mode)),
+            np.asarray(np.load(directory / "order.npy", mmap_mode=mmap_mode)),
+            levels[:-1],
+            int(levels[-1]),
+        )
+
+    def __len__(self):
+        return len(self.order)
+
+    def query_bounds(self, bounds):
+        """
+        Find the indexed boxes that intersect each of the query ``bounds``.
+
+        The tree is traversed for all query boxes at once, one level at a
+        time, keeping the (query, node) pairs whose boxes overlap.
+
+        Parameters
+        ----------
+        bounds : array of shape (m, 4)
+            ``(minx, miny, maxx, maxy)`` of every query box.
+
+        Returns
+        -------
+        ndarray of shape (2, k)
+            Indices into the query boxes and into the indexed geometries.
+        """
+        bounds = np.atleast_2d(np.asarray(bounds, dtype="float64"))
+        if len(self) == 0 or len(bounds) == 0:
+            return np.empty((2, 0), dtype="intp")
+        lb = self.level_bounds
+        top = len(lb) - 2
+        nodes = np.arange(lb[top], lb[top + 1])
+        query = np.repeat(np.arange(len(bounds)), len(nodes))
+        nodes = np.tile(nodes, len(bounds))
+        query, nodes = self._overlapping(bounds, query, nodes)
+        for level in range(top, 0, -1):
+            size = lb[level] - lb[level - 1]
+            first = (nodes - lb[level]) * self.node_size
+            counts = np.minimum(self.node_size, size - first)
+            offsets = np.arange(counts.sum()) - np.repeat(
+                np.cumsum(counts) - counts, counts
+            )
+            nodes = np.repeat(lb[level - 1] + first, counts) + offsets
+            query = np.repeat(query, counts)
+            query, nodes = self._overlapping(bounds, query, nodes)
+        return np.vstack([query, self.order[nodes]])
+
+    def _overlapping(self, bounds, query, nodes):
+        q = bounds[query]
+        b = self.boxes[nodes]
+        keep = (
+            (q[:, 0] <= b[:, 2]) & (q[:, 2] >= b[:, 0])
+            & (q[:, 1] <= b[:, 3]) & (q[:, 3] >= b[:, 1])
+        )
+        return query[keep], nodes[keep]
+
+
+class Layer:
+    """
+    A reference layer together with its packed spatial index.
+
+    Attributes
+    ----------
+    frame : GeoDataFrame
+        The layer, in the CRS it was requested in. Treat it as read-only:
+        it is shared by every caller of the registry.
+    index : PackedRTree
+    """
+
+    def __init__(self, frame, index):
+        self.frame = frame
+        self.index = index
+        # Preparing the geometries once makes every later predicate
+        # evaluation against them cheaper.
+        shapely.prepare(np.asarray(frame.geometry.values))
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def crs(self):
+        return self.frame.crs
+
+    def query(self, geometry, predicate="intersects"):
+        """
+        Find the features of the layer that satisfy ``predicate``.
+
+        Parameters
+        ----------
+        geometry : Geometry, array-like or GeoSeries
+            Query geometries, in the CRS of the layer.
+        predicate : str or None, default "intersects"
+            Binary predicate of shapely, evaluated as
+            ``predicate(feature, query_geometry)``, e.g. "contains" for a
+            point-in-polygon lookup. With None, only the bounding boxes are
+            compared.
+
+        Returns
+        -------
+        ndarray of shape (2, k)
+            Indices into the query geometries and into the layer.
+        """
+        if isinstance(geometry, geopandas.GeoSeries):
+            geometry = geometry.values
+        geometry = np.atleast_1d(np.asarray(geometry))
+        input_idx, tree_idx = self.index.query_bounds(shapely.bounds(geometry))
+        if predicate is not None:
+            features = np.asarray(self.frame.geometry.values)
+            keep = getattr(shapely, predicate)(
+                features[tree_idx], geometry[input_idx]
+            )
+            input_idx, tree_idx = input_idx[keep], tree_idx[keep]
+        order = np.lexsort((tree_idx, input_idx))
+        return np.vstack([input_idx[order], tree_idx[order]])
+
+    def lookup(self, points, column, predicate="intersects"):
+        """
+        Look up ``column`` of the feature containing each point.
+
+        Points outside the layer get a missing value; points on a shared
+        border get the value of the first matching feature.
+
+        Returns
+        -------
+        Series
+            Aligned with ``points`` when it is a GeoSeries or GeoDataFrame.
+        """
+        index = None
+        if isinstance(points, (geopandas.GeoSeries, geopandas.GeoDataFrame)):
+            index = points.index
+            points = points.geometry.values
+        points = np.atleast_1d(np.asarray(points))
+        input_idx, tree_idx = self.query(points, predicate=predicate)
+        first = np.unique(input_idx, return_index=True)[1]
+        values = self.frame[column].iloc[tree_idx[first]]
+        result = pd.Series(values.values, index=input_idx[first], name=column)
+        result = result.reindex(np.arange(len(points)))
+        if index is not None:
+            result.index = index
+        return result
+
+
+class LayerRegistry:
+    """
+    Load each reference layer once and keep it, with its spatial index.
+
+    Parameters
+    ----------
+    cache_dir : path, optional
+        Directory of the persistent cache. Defaults to
+        :data:`~healthgis.paths.CACHE_DIR`. Pass None to keep the layers
+        in memory only.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = None if cache_dir is None else Path(cache_dir)
+        self._layers = {}
+
+    def key(self, path, crs=None):
+        """Cache key of a dataset: its path, modification time and CRS."""
+        file, source = resolve(path)
+        return (source, file.stat().st_mtime_ns, _normalize_crs(crs))
+
+    def get(self, path, crs=None):
+        """
+        Return the :class:`Layer` for ``path``, reprojected to ``crs``.
+
+        Parameters
+        ----------
+        path : str or Path
+            Dataset to load, see :func:`healthgis.paths.resolve`.
+        crs : optional
+            Target CRS, anything accepted by ``GeoDataFrame.to_crs``.
+            Defaults to the CRS of the file.
+        """
+        key = self.key(path, crs)
+        layer = self._layers.get(key)
+        if layer is None:
+            layer = self._load(key, crs)
+            self._layers[key] = layer
+        return layer
+
+    def clear(self, disk=False):
+        """Forget the loaded layers, and with ``disk=True`` the cache too."""
+        self._layers.clear()
+        if disk and self.cache_dir is not None and self.cache_dir.exists():
+            for entry in self.cache_dir.glob("*.layer"):
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def _cache_path(self, key):
+        digest = hashlib.sha1(repr((
+            CACHE_VERSION, geopandas.__version__, shapely.__version__, key
+        )).encode()).hexdigest()[:16]
+        stem = Path(key[0].split("!")[-1]).stem
+        return self.cache_dir / "{}-{}.layer".format(stem, digest)
+
+    def _load(self, key, crs):
+        cached = None if self.cache_dir is None else self._cache_path(key)
+        if cached is not None and cached.exists():
+            frame = geopandas.read_parquet(cached / "frame.parquet")
+            return Layer(frame, PackedRTree.load(cached))
+
+        frame = geopandas.read_file(key[0])
+        if crs is not None:
+            frame = to_crs(frame, crs)
+        index = PackedRTree.build(frame.geometry)
+        if cached is not None:
+            self._store(cached, frame, index)
+        return Layer(frame, index)
+
+    def _store(self, cached, frame, index):
+        # Write into a temporary directory first and move it in place, so
+        # concurrent processes never see a half-written entry. The cache
+        # may be on a shared volume, so nothing is pickled: the frame is
+        # GeoParquet and the index plain arrays.
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=cached.parent, suffix=".tmp"))
+        try:
+            frame.to_parquet(tmp / "frame.parquet", index=True)
+            index.save(tmp)
+            os.replace(tmp, cached)
+        except OSError:
+            # Another process stored the same entry in the meantime.
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+registry = LayerRegistry()
+
+
+def load_layer(path, crs=None):
+    """Load ``path`` through the default :class:`LayerRegistry`."""
+    return registry.get(path, crs=crs)
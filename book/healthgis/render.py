@@ -0,0 +1,368 @@
+"""
+Batch rendering of map figures for reports.
+
+``GeoDataFrame.plot`` converts every geometry to a matplotlib patch,
+classifies the column and builds the legend again for each figure, in a
+single process. :func:`render_maps` renders a whole list
+of figures of one layer instead, each described by a spec (a filter on the
+attributes, the column to color by and a classification scheme):
+
+* the layer is reprojected once, and the classes of each (column, scheme)
+  are computed once on the whole layer, so that all figures share the
+  same colors and legend;
+* each worker process receives the layer once, converts the geometries
+  to matplotlib paths and builds a spatial index once, and then renders
+  its share of the figures on Agg canvases (without pyplot, so the
+  backend of the calling notebook is left alone);
+* figures are written as PNG and/or SVG, and the time spent rendering and
+  writing each figure is returned.
+
+>>> from healthgis.render import render_maps
+>>> specs = [{"name": name, "filter": "district_name == {!r}".format(name),
+...           "column": "population", "scheme": "quantiles"}
+...          for name in districts["district_name"]]
+>>> timings = render_maps(districts, specs, "figures", formats=("png", "svg"),
+...                       max_workers=4)
+
+or, from ``book/``, with the specs in a JSON file::
+
+    python -m healthgis.render paris_districts.geojson specs.json figures --max-workers 4
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import geopandas
+import mapclassify
+import matplotlib
+import shapely
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import BoundaryNorm, Normalize, to_rgba
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
+from matplotlib.path import Path as MplPath
+
+from .distance import point_coordinates
+from .paths import resolve
+
+FORMATS = ("png", "svg")
+
+# Color of the features around the selected ones.
+CONTEXT_COLOR = "#e0e0e0"
+
+
+def _polygon_paths(geometry):
+    """One compound matplotlib path per polygon or multipolygon."""
+    # Agg fills with the nonzero rule, so holes must turn the other way.
+    geometry = shapely.orient_polygons(geometry, exterior_cw=False)
+    _, coords, offsets = shapely.to_ragged_array(geometry)
+    rings = offsets[0]
+    codes = np.full(len(coords), MplPath.LINETO, dtype=MplPath.code_type)
+    codes[rings[:-1]] = MplPath.MOVETO
+    codes[rings[1:] - 1] = MplPath.CLOSEPOLY
+    # Start of each feature in ``coords``, through the levels of offsets.
+    starts = offsets[-1]
+    for level in offsets[-2::-1]:
+        starts = level[starts]
+    return [MplPath(coords[a:b], codes[a:b]) for a, b in zip(starts[:-1], starts[1:])]
+
+
+class _Layer:
+    """A projected layer, ready to draw any subset of its features."""
+
+    def __init__(self, data):
+        self.attributes = pd.DataFrame(data.drop(columns=data.geometry.name))
+        geometry = np.asarray(data.geometry.values)
+        self.bounds = shapely.bounds(geometry)
+        self.tree = shapely.STRtree(geometry)
+        types = set(data.geom_type.dropna())
+        if types <= {"Point"}:
+            self.kind = "points"
+            # One row per feature, NaN (not drawn) for empty points.
+            self.xy = point_coordinates(geometry)
+        elif types <= {"LineString", "MultiLineString"}:
+            self.kind = "lines"
+            parts, self.owner = shapely.get_parts(geometry, return_index=True)
+            self.segments = [shapely.get_coordinates(part) for part in parts]
+        elif types <= {"Polygon", "MultiPolygon"}:
+            self.kind = "polygons"
+            self.paths = _polygon_paths(geometry)
+        else:
+            raise ValueError(
+                "Cannot render a layer of {}.".format(", ".join(sorted(types))))
+
+    def draw(self, ax, positions, colors, **kwargs):
+        if self.kind == "points":
+            ax.scatter(self.xy[positions, 0], self.xy[positions, 1], c=colors,
+                       s=kwargs.pop("markersize", 10), **kwargs)
+        elif self.kind == "lines":
+            keep = np.flatnonzero(np.isin(self.owner, positions))
+            if np.ndim(colors) == 2:
+                # From the colors of the features to those of their parts.
+                lookup = np.zeros((len(self.bounds), 4))
+                lookup[positions] = colors
+                colors = lookup[self.owner[keep]]
+            ax.add_collection(LineCollection(
+                [self.segments[i] for i in keep], colors=colors, **kwargs))
+        else:
+            ax.add_collection(PathCollection(
+                [self.paths[i] for i in positions], facecolors=colors,
+                edgecolors=kwargs.pop("edgecolor", "white"),
+                linewidths=kwargs.pop("linewidth", 0.5), **kwargs))
+
+
+def classify(values, scheme=None, k=5, cmap="viridis"):
+    """
+    Colors of a column shared by all figures.
+
+    Parameters
+    ----------
+    values : Series
+        The column, over the whole layer.
+    scheme : str, optional
+        A mapclassify scheme, e.g. "quantiles", "equal_interval" or
+        "natural_breaks". Without a scheme, numeric columns use a
+        continuous colormap and other columns one color per category.
+    k : int, default 5
+        Number of classes of the scheme.
+    cmap : str, default "viridis"
+
+    Returns
+    -------
+    dict
+        With the "norm" (or "categories") and "cmap" used by the workers,
+        and the "legend" labels.
+    """
+    cmap = matplotlib.colormaps[cmap]
+    values = values.dropna()
+    if not pd.api.types.is_numeric_dtype(values):
+        categories = sorted(values.unique())
+        return {"categories": categories, "cmap": cmap,
+                "legend": [str(c) for c in categories]}
+    if scheme is None:
+        return {"norm": Normalize(values.min(), values.max()), "cmap": cmap,
+                "legend": None}
+    bins = mapclassify.classify(values.to_numpy(), scheme, k=k).bins
+    # Tied values give repeated edges, i.e. empty classes.
+    edges = np.unique(np.concatenate([[values.min()], bins]))
+    if len(edges) == 1:
+        edges = np.repeat(edges, 2)
+    norm = BoundaryNorm(edges, cmap.N, extend="neither")
+    legend = ["{:,.6g} - {:,.6g}".format(low, high) if low < high
+              else "{:,.6g}".format(low)
+              for low, high in zip(edges[:-1], edges[1:])]
+    return {"norm": norm, "cmap": cmap, "legend": legend, "bins": edges}
+
+
+def _colors(values, classes):
+    if "categories" in classes:
+        index = pd.Index(classes["categories"]).get_indexer(values)
+        n = max(len(classes["categories"]) - 1, 1)
+        colors = classes["cmap"](index / n)
+        colors[index < 0] = to_rgba(CONTEXT_COLOR)
+        return colors
+    colors = classes["cmap"](classes["norm"](values.to_numpy(dtype="float64")))
+    colors[values.isna().to_numpy()] = to_rgba(CONTEXT_COLOR)
+    return colors
+
+
+def _legend(ax, classes):
+    if classes["legend"] is None:
+        ax.figure.colorbar(
+            ScalarMappable(classes["norm"], classes["cmap"]),
+            ax=ax, shrink=0.6)
+        return
+    if "categories" in classes:
+        n = max(len(classes["categories"]) - 1, 1)
+        colors = [classes["cmap"](i / n) for i in range(len(classes["categories"]))]
+    else:
+        bins = classes["bins"]
+        colors = [classes["cmap"](classes["norm"]((low + high) / 2))
+                  for low, high in zip(bins[:-1], bins[1:])]
+    ax.legend(handles=[Patch(facecolor=color, label=label)
+                       for color, label in zip(colors, classes["legend"])],
+              loc="lower right", fontsize="small", frameon=False)
+
+
+# The layer is sent to each worker once through the pool initializer,
+# instead of being pickled again for every figure.
+_layer = None
+
+
+def _init_worker(data):
+    global _layer
+    _layer = _Layer(data)
+
+
+def _render(task):
+    spec, classes, out_dir, formats, figsize, dpi = task
+    name = spec["name"]
+    record = {"name": name, "features": 0, "render": np.nan, "save": np.nan,
+              "error": None}
+    start = time.perf_counter()
+    try:
+        attributes = _layer.attributes
+        if spec.get("filter"):
+            selected = attributes.query(spec["filter"])
+            positions = attributes.index.get_indexer(selected.index)
+        else:
+            positions = np.arange(len(attributes))
+        record["features"] = len(positions)
+        if not len(positions):
+            raise ValueError("The filter selects no features.")
+
+        bounds = _layer.bounds[positions]
+        if np.isnan(bounds).all():
+            raise ValueError("The filter selects only empty geometries.")
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        minx, miny = np.nanmin(bounds[:, :2], axis=0)
+        maxx, maxy = np.nanmax(bounds[:, 2:], axis=0)
+        margin = 0.05 * max(maxx - minx, maxy - miny, 1e-9)
+        extent = (minx - margin, miny - margin, maxx + margin, maxy + margin)
+        if spec.get("context", True):
+            around = np.setdiff1d(_layer.tree.query(shapely.box(*extent)), positions)
+            _layer.draw(ax, around, CONTEXT_COLOR)
+        if spec.get("column"):
+            values = attributes[spec["column"]].iloc[positions]
+            _layer.draw(ax, positions, _colors(values, classes))
+            _legend(ax, classes)
+        else:
+            _layer.draw(ax, positions, spec.get("color", "C0"))
+        ax.set_xlim(extent[0], extent[2])
+        ax.set_ylim(extent[1], extent[3])
+        ax.set_aspect("equal")
+        # Fixed margins: bbox_inches="tight" would draw every figure twice.
+        fig.subplots_adjust(left=0.02, right=0.98, bottom=0.02, top=0.92)
+        ax.set_axis_off()
+        ax.set_title(spec.get("title", name))
+        record["render"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for fmt in formats:
+            path = Path(out_dir) / "{}.{}".format(name, fmt)
+            # Fast PNG compression, as for the tiles: the files are a bit
+            # larger but written in half the time.
+            kwargs = {"pil_kwargs": {"compress_level": 1}} if fmt == "png" else {}
+            fig.savefig(path, dpi=dpi, **kwargs)
+            record[fmt] = str(path)
+        record["save"] = time.perf_counter() - start
+    except Exception as error:
+        record["error"] = "{}: {}".format(type(error).__name__, error)
+    return record
+
+
+def render_maps(data, specs, out_dir, formats=("png",), crs=None,
+                figsize=(8, 8), dpi=100, max_workers=1):
+    """
+    Render one map figure per spec.
+
+    Parameters
+    ----------
+    data : GeoDataFrame
+        Points, lines or polygons.
+    specs : list of dict
+        One per figure, with the keys
+
+        * "name": the name of the output files (required, unique);
+        * "filter": a ``DataFrame.query`` expression selecting the
+          features drawn, by default all of them;
+        * "column": the column the features are colored by;
+        * "scheme", "k" and "cmap": see :func:`classify`; the classes are
+          computed on the whole layer;
+        * "title": defaults to the name;
+        * "context": draw the other features in view in grey, default True;
+        * "color": the color of the features without a column.
+    out_dir : str or Path
+    formats : tuple of {"png", "svg"}, default ("png",)
+    crs : optional
+        CRS of the figures. Defaults to the CRS of ``data``.
+    figsize : tuple, default (8, 8)
+    dpi : int, default 100
+    max_workers : int, default 1
+        Number of worker processes. With 1, the figures are rendered in the
+        current process.
+
+    Returns
+    -------
+    DataFrame
+        Indexed by name, with the number of features drawn, the time spent
+        drawing ("render") and writing ("save") each figure, the path of
+        each format, and the error raised, if any.
+    """
+    names = [spec["name"] for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("The names of the specs must be unique.")
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError("Unknown formats: {}.".format(", ".join(sorted(unknown))))
+    if crs is not None:
+        data = data.to_crs(crs)
+    data = data.reset_index(drop=True)
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+
+    classes = {}
+    for spec in specs:
+        if spec.get("column"):
+            key = (spec["column"], spec.get("scheme"), spec.get("k", 5),
+                   spec.get("cmap", "viridis"))
+            if key not in classes:
+                classes[key] = classify(data[key[0]], *key[1:])
+    tasks = [
+        (spec,
+         classes.get((spec.get("column"), spec.get("scheme"), spec.get("k", 5),
+                      spec.get("cmap", "viridis"))),
+         str(out_dir), formats, figsize, dpi)
+        for spec in specs
+    ]
+    if max_workers == 1:
+        _init_worker(data)
+        records = [_render(task) for task in tasks]
+    else:
+        # A few chunks per worker balance the load with little overhead.
+        chunksize = max(len(tasks) // (4 * max_workers), 1)
+        with ProcessPoolExecutor(
+            max_workers, initializer=_init_worker, initargs=(data,)
+        ) as pool:
+            records = list(pool.map(_render, tasks, chunksize=chunksize))
+    return pd.DataFrame(records).set_index("name")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("dataset", help="dataset in book/data, e.g. paris_districts.geojson")
+    parser.add_argument("specs", help="JSON file with the list of specs")
+    parser.add_argument("out_dir")
+    parser.add_argument("--formats", nargs="+", default=["png"], choices=FORMATS)
+    parser.add_argument("--crs", help="CRS of the figures, e.g. EPSG:2154")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--max-workers", type=int, default=1)
+    parser.add_argument("--timings", help="CSV file for the per-figure timings")
+    args = parser.parse_args()
+
+    with open(args.specs, encoding="utf-8") as f:
+        specs = json.load(f)
+    data = geopandas.read_file(resolve(args.dataset)[1])
+    start = time.perf_counter()
+    timings = render_maps(data, specs, args.out_dir, formats=tuple(args.formats),
+                          crs=args.crs, dpi=args.dpi, max_workers=args.max_workers)
+    seconds = time.perf_counter() - start
+    if args.timings:
+        timings.to_csv(args.timings)
+    errors = timings["error"].notna()
+    print("{} figures in {:.1f}s ({:.1f} figures/s), {} errors".format(
+        len(timings) - errors.sum(), seconds, len(timings) / seconds, errors.sum()))
+    for name, error in timings.loc[errors, "error"].items():
+        print("  {}: {}".format(name, error))
+
+
+if __name__ == "__main__":
+    main()
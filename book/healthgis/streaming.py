@@ -0,0 +1,111 @@
+"""
+Bounded-memory processing of point layers that do not fit in memory.
+
+:func:`read_chunks` streams a GPKG, GeoJSON or shapefile as GeoDataFrames of
+at most ``chunksize`` rows, and :func:`count_within` folds a spatial join
+and ``groupby().size()`` over those chunks. Peak memory then depends on the
+chunk size, not on the size of the input.
+
+>>> from healthgis.streaming import count_within
+>>> trees_by_district = count_within("paris_trees.gpkg", districts, by="district_name")
+"""
+
+import functools
+
+import numpy as np
+import pandas as pd
+import geopandas
+from pyogrio.raw import open_arrow
+from pyproj import CRS
+
+from . import partition
+from .paths import resolve
+
+
+def read_chunks(path, chunksize=100_000, columns=None, bbox=None, layer=None):
+    """
+    Read a dataset in chunks of at most ``chunksize`` rows.
+
+    The features are streamed from GDAL in Arrow record batches, so only
+    one chunk is held in memory at a time.
+
+    Parameters
+    ----------
+    path : str or Path
+        Dataset to read, see :func:`healthgis.paths.resolve`.
+    chunksize : int, default 100_000
+    columns : list of str, optional
+        Attribute columns to read; the geometry is always read.
+    bbox : tuple of (minx, miny, maxx, maxy), optional
+        Only read the features intersecting this box, in the CRS of the
+        dataset.
+    layer : str or int, optional
+        Layer to read from a multi-layer dataset such as a GeoPackage.
+
+    Yields
+    ------
+    GeoDataFrame
+        Consecutive chunks, indexed by the row number in the dataset.
+    """
+    source = resolve(path)[1]
+    with open_arrow(source, layer=layer, columns=columns, bbox=bbox,
+                    batch_size=chunksize, use_pyarrow=True) as (meta, reader):
+        geometry = meta["geometry_name"] or "wkb_geometry"
+        crs = _crs(meta["crs"])
+        start = 0
+        for batch in reader:
+            df = batch.drop_columns([geometry]).to_pandas()
+            df.index = pd.RangeIndex(start, start + len(df))
+            df["geometry"] = geopandas.array.from_wkb(
+                batch.column(geometry).to_numpy(zero_copy_only=False), crs=crs
+            )
+            start += len(df)
+            yield geopandas.GeoDataFrame(df, geometry="geometry")
+
+
+@functools.lru_cache()
+def _crs(crs):
+    return None if crs is None else CRS.from_user_input(crs)
+
+
+def count_within(points, polygons, by, chunksize=100_000, predicate="within"):
+    """
+    Count the points in each polygon without loading all points at once.
+
+    Parameters
+    ----------
+    points : str, Path or iterable of GeoDataFrame
+        Dataset to stream with :func:`read_chunks`, or an iterable of
+        chunks, e.g. the result of :func:`read_chunks` with a ``bbox``.
+    polygons : GeoDataFrame
+        Chunks in another CRS are reprojected to the CRS of the polygons.
+        The spatial index of the polygons is built once and reused for
+        every chunk.
+    by : str
+        Column of ``polygons`` to group the counts by.
+    chunksize : int, default 100_000
+        Used when ``points`` is a path.
+    predicate : str, default "within"
+        Passed to ``geopandas.sjoin``.
+
+    Returns
+    -------
+    Series
+        Number of points per value of ``by``; values without any point
+        are left out, as with ``groupby().size()``.
+    """
+    if isinstance(points, (str, bytes)) or hasattr(points, "__fspath__"):
+        points = read_chunks(points, chunksize=chunksize, columns=[])
+    polygons = polygons[[by, polygons.geometry.name]]
+
+    counts = pd.Series(dtype="int64")
+    for chunk in points:
+        if chunk.crs != polygons.crs:
+            chunk = chunk.to_crs(polygons.crs)
+        counts = counts.add(
+            partition.count_within(chunk, polygons, by, predicate=predicate),
+            fill_value=0,
+        )
+    counts = counts.astype(np.int64).sort_index()
+    counts.index.name = by
+    return counts
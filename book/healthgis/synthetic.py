@@ -0,0 +1,305 @@
+"""
+Synthetic, production-scale versions of the bundled layers.
+
+The bundled datasets are small (80 districts, 177 countries, a few
+thousand trees), too small to test how a workflow scales. The generators
+here take one of them as a template and produce a statistically similar
+layer of any size:
+
+* from a point layer (trees, bike stations), points drawn from a kernel
+  density estimate of the template, with the attributes of the template
+  point they were drawn from;
+* from a polygon layer (districts, countries), either points distributed
+  uniformly within the polygons, or polygons obtained by splitting each
+  template polygon into Voronoi cells, densified to a maximum segment
+  length.
+
+Sampling is vectorized with NumPy and shapely, reproducible with a seed,
+and :func:`generate` streams the output to GeoParquet or GeoPackage chunk
+by chunk, so that layers of 10^8 points never have to fit in memory.
+
+>>> from healthgis.synthetic import generate
+>>> generate("paris_trees.gpkg", 100_000_000, "trees_1e8.parquet", seed=0)
+
+or, from ``book/``::
+
+    python -m healthgis.synthetic paris_trees.gpkg 100000000 trees_1e8.parquet
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import geopandas
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyogrio
+import shapely
+from scipy.spatial import cKDTree
+
+from .paths import resolve
+from .sampling import sample_points
+
+CHUNKSIZE = 1_000_000
+
+
+def _rng(seed):
+    return seed if isinstance(seed, np.random.Generator) else (
+        np.random.default_rng(seed))
+
+
+def allocate(n, weights, seed=None):
+    """Split ``n`` into counts proportional to ``weights``, at random."""
+    weights = np.asarray(weights, dtype="float64")
+    return _rng(seed).multinomial(n, weights / weights.sum())
+
+
+def points_like(template, n, seed=None, bandwidth=None):
+    """
+    Points drawn from a kernel density estimate of a point layer.
+
+    Each point is a template point, picked at random, moved by a Gaussian
+    offset, and keeps the attributes of that template point.
+
+    Parameters
+    ----------
+    template : GeoDataFrame of points
+    n : int
+    seed : int or numpy.random.Generator, optional
+    bandwidth : float, optional
+        Standard deviation of the offsets, in the units of the CRS.
+        Defaults to the median distance between a template point and its
+        nearest neighbour.
+
+    Returns
+    -------
+    GeoDataFrame
+    """
+    rng = _rng(seed)
+    coords = shapely.get_coordinates(np.asarray(template.geometry.values))
+    if bandwidth is None:
+        bandwidth = _nearest_spacing(coords)
+    pick = rng.integers(0, len(template), n)
+    xy = coords[pick] + rng.normal(0, bandwidth, (n, 2))
+    result = template.drop(columns=template.geometry.name).iloc[pick]
+    return geopandas.GeoDataFrame(
+        result.reset_index(drop=True),
+        geometry=geopandas.points_from_xy(xy[:, 0], xy[:, 1]),
+        crs=template.crs,
+    )
+
+
+def _nearest_spacing(coords):
+    distances, _ = cKDTree(coords).query(coords, k=2)
+    return float(np.median(distances[:, 1]))
+
+
+def points_within(template, n, seed=None, weights=None):
+    """
+    Points distributed uniformly within the polygons of a layer.
+
+    Parameters
+    ----------
+    template : GeoDataFrame of polygons
+    n : int
+    seed : int or numpy.random.Generator, optional
+    weights : str or array-like, optional
+        Column or values the number of points per polygon is proportional
+        to, e.g. a population. Defaults to the area.
+
+    Returns
+    -------
+    GeoDataFrame
+        With the attributes of the polygon of each point.
+    """
+    x, y, parent = sample_points(template, n, weights=weights, seed=_rng(seed))
+    result = template.drop(columns=template.geometry.name).iloc[parent]
+    return geopandas.GeoDataFrame(
+        result.reset_index(drop=True),
+        geometry=geopandas.points_from_xy(x, y), crs=template.crs,
+    )
+
+
+def polygons_like(template, n, seed=None, max_segment_length=None):
+    """
+    Split the polygons of a layer into about ``n`` Voronoi cells.
+
+    Each template polygon gets a number of cells proportional to its area;
+    the cells are clipped to the polygon, so they cover it exactly, and
+    keep its attributes.
+
+    Parameters
+    ----------
+    template : GeoDataFrame of polygons
+    n : int
+    seed : int or numpy.random.Generator, optional
+    max_segment_length : float, optional
+        Densify the cells so that no segment is longer than this, in the
+        units of the CRS.
+
+    Returns
+    -------
+    GeoDataFrame
+        With a "parent" column holding the index label of the template
+        polygon of each cell.
+    """
+    rng = _rng(seed)
+    polygons = np.asarray(template.geometry.values)
+    counts = np.maximum(allocate(n, shapely.area(polygons), rng), 1)
+    x, y, parent = sample_points(template, counts=counts, seed=rng)
+    seeds = geopandas.GeoSeries(geopandas.points_from_xy(x, y))
+    cells, owners = [], []
+    for i, points in seeds.groupby(parent):
+        if counts[i] == 1:
+            parts = np.array([polygons[i]])
+        else:
+            parts = shapely.get_parts(shapely.voronoi_polygons(
+                shapely.multipoints(np.asarray(points.values)),
+                extend_to=polygons[i],
+            ))
+        cells.append(parts)
+        owners.append(np.full(len(parts), i))
+    cells, owners = np.concatenate(cells), np.concatenate(owners)
+    cells = shapely.intersection(cells, polygons[owners])
+    if max_segment_length is not None:
+        cells = shapely.segmentize(cells, max_segment_length)
+    result = template.drop(columns=template.geometry.name).iloc[owners]
+    result.insert(0, "parent", template.index[owners])
+    return geopandas.GeoDataFrame(
+        result.reset_index(drop=True), geometry=cells, crs=template.crs
+    )
+
+
+def chunks(template, n, chunksize=CHUNKSIZE, seed=0, geometry=None, **kwargs):
+    """
+    Generate a layer like ``template`` in chunks of ``chunksize`` features.
+
+    Parameters
+    ----------
+    template : str, Path or GeoDataFrame
+        Template layer, or the path to a dataset, see
+        :func:`healthgis.paths.resolve`.
+    n : int
+        Number of features to generate. Polygon chunks have at least one
+        cell per template polygon, so they can be slightly larger.
+    chunksize : int, default 1_000_000
+    seed : int, default 0
+        The same seed and chunk size give the same layer.
+    geometry : {"points", "polygons"}, optional
+        Type of features to generate; points can be generated from any
+        template, polygons only from polygon templates. Defaults to the
+        type of the template.
+    **kwargs
+        Passed to :func:`points_like`, :func:`points_within` or
+        :func:`polygons_like`.
+
+    Yields
+    ------
+    GeoDataFrame
+        Indexed by the position of the features in the whole layer.
+    """
+    if not isinstance(template, geopandas.GeoDataFrame):
+        template = geopandas.read_file(resolve(template)[1])
+    polygonal = template.geom_type.isin(["Polygon", "MultiPolygon"]).all()
+    if geometry is None:
+        geometry = "polygons" if polygonal else "points"
+    if geometry == "polygons" and polygonal:
+        generate_chunk = polygons_like
+    elif geometry == "points":
+        generate_chunk = points_within if polygonal else points_like
+    else:
+        raise ValueError(
+            "Cannot generate {} from a layer of {}.".format(
+                geometry, ", ".join(template.geom_type.unique()))
+        )
+    sizes = [chunksize] * (n // chunksize) + ([n % chunksize] if n % chunksize else [])
+    start = 0
+    for size, child in zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))):
+        chunk = generate_chunk(template, size, np.random.default_rng(child),
+                               **kwargs)
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+
+def generate(template, n, path, chunksize=CHUNKSIZE, seed=0, geometry=None,
+             **kwargs):
+    """
+    Write a layer like ``template`` to ``path``, one chunk at a time.
+
+    The format follows the suffix of ``path``: GeoParquet for
+    ``.parquet``, otherwise any format GDAL can append to, such as
+    GeoPackage. See :func:`chunks` for the parameters.
+
+    Returns
+    -------
+    Path
+    """
+    path = Path(path)
+    # Keep the suffix, from which GDAL infers the format.
+    tmp = path.with_name("{}.tmp{}".format(path.stem, path.suffix))
+    if tmp.exists():
+        tmp.unlink()
+    parts = chunks(template, n, chunksize=chunksize, seed=seed,
+                   geometry=geometry, **kwargs)
+    if path.suffix == ".parquet":
+        _write_parquet(parts, tmp)
+    else:
+        driver = pyogrio.detect_write_driver(str(path))
+        for i, chunk in enumerate(parts):
+            pyogrio.write_dataframe(chunk, tmp, driver=driver, append=i > 0)
+    os.replace(tmp, path)
+    return path
+
+
+def _write_parquet(parts, path):
+    writer = None
+    try:
+        for chunk in parts:
+            df = pd.DataFrame(chunk.drop(columns=chunk.geometry.name))
+            df["geometry"] = shapely.to_wkb(np.asarray(chunk.geometry.values))
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                schema = table.schema.with_metadata(
+                    {**table.schema.metadata, b"geo": _geo_metadata(chunk)}
+                )
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _geo_metadata(chunk):
+    crs = None if chunk.crs is None else chunk.crs.to_json_dict()
+    return json.dumps({
+        "version": "1.0.0",
+        "primary_column": "geometry",
+        "columns": {"geometry": {
+            "encoding": "WKB",
+            # The schema is written with the first chunk, before the types
+            # of the later ones are known; an empty list means "unknown".
+            "geometry_types": [],
+            "crs": crs,
+        }},
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("template", help="dataset in book/data, e.g. paris_trees.gpkg")
+    parser.add_argument("n", type=int, help="number of features")
+    parser.add_argument("path", help="output file (.parquet, .gpkg, ...)")
+    parser.add_argument("--geometry", choices=["points", "polygons"])
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate(args.template, args.n, args.path, chunksize=args.chunksize,
+                   seed=args.seed, geometry=args.geometry))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""
+Raster tiles of vector layers, rendered with vectorized rasterization.
+
+``GeoDataFrame.plot`` draws one matplotlib patch per feature, so the time
+to draw a choropleth grows with the number (and size) of the polygons.
+:class:`TileLayer` rasterizes a layer into 256x256 web mercator (XYZ)
+tiles instead: the polygon under each pixel center is found with one
+spatial index query per tile, and points are aggregated into per-pixel
+counts (as Datashader does). The time per tile depends on the number of
+pixels, not on the number of features, and rendered tiles are cached on
+disk by layer hash, zoom, x, y and style.
+
+>>> from healthgis.tiles import TileLayer
+>>> ax = TileLayer(countries, column="gdp_per_cap").plot(figsize=(15, 15))
+>>> TileLayer(land_use, column="class", cmap="tab20").path(12, 2074, 1409)
+"""
+
+import hashlib
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import geopandas
+import matplotlib
+import matplotlib.image
+import shapely
+
+from .crs import reproject
+from .hashing import layer_hash
+from .paths import CACHE_DIR
+
+TILE_SIZE = 256
+
+# Half the width of the web mercator (EPSG:3857) world, in meters.
+ORIGIN = 20037508.342789244
+
+# Latitude where web mercator tiles end.
+MAX_LATITUDE = 85.0511287798066
+
+MERCATOR = "EPSG:3857"
+
+
+def tile_bounds(z, x, y):
+    """Bounds (minx, miny, maxx, maxy) of tile (z, x, y) in EPSG:3857."""
+    size = 2 * ORIGIN / 2 ** z
+    minx = -ORIGIN + x * size
+    maxy = ORIGIN - y * size
+    return (minx, maxy - size, minx + size, maxy)
+
+
+def tiles_for_bounds(bounds, z):
+    """The (x, y) of the tiles at zoom ``z`` covering ``bounds`` (EPSG:3857)."""
+    n = 2 ** z
+    size = 2 * ORIGIN / n
+    minx, miny, maxx, maxy = bounds
+
+    def clamp(value):
+        return min(max(int(math.floor(value)), 0), n - 1)
+
+    x0, x1 = clamp((minx + ORIGIN) / size), clamp((maxx + ORIGIN) / size)
+    y0, y1 = clamp((ORIGIN - maxy) / size), clamp((ORIGIN - miny) / size)
+    return [(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)]
+
+
+def zoom_for_bounds(bounds, width=1024, tile_size=TILE_SIZE):
+    """Zoom level at which ``bounds`` (EPSG:3857) is about ``width`` pixels wide."""
+    extent = max(bounds[2] - bounds[0], bounds[3] - bounds[1], 1e-9)
+    z = math.log2(2 * ORIGIN * width / (tile_size * extent))
+    return int(min(max(round(z), 0), 22))
+
+
+def to_mercator(data):
+    """
+    Reproject a layer to web mercator, clipping geographic layers to the
+    latitudes covered by web mercator tiles.
+    """
+    if data.crs is None:
+        raise ValueError("Cannot render a layer without a CRS.")
+    if data.crs.is_geographic:
+        # Web mercator is infinite at the poles.
+        data = data.copy()
+        data.geometry = shapely.clip_by_rect(
+            np.asarray(data.geometry.values), -180, -MAX_LATITUDE, 180,
+            MAX_LATITUDE,
+        )
+    return reproject(data, MERCATOR)
+
+
+def _ranges(counts):
+    """Concatenation of ``arange(c)`` for each ``c`` in ``counts``."""
+    counts = np.asarray(counts, dtype="int64")
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.arange(counts.sum()) - offsets
+
+
+class TileLayer:
+    """
+    A layer of polygons or points rendered as XYZ tiles.
+
+    Parameters
+    ----------
+    data : GeoDataFrame or GeoSeries
+        Polygons or points, in any CRS.
+    column : str, optional
+        Column to color by. Numeric columns are mapped to ``cmap`` between
+        ``vmin`` and ``vmax``, other columns are treated as categories.
+        For points, the mean of the column over the points of a pixel is
+        shown.
+    cmap : str, default "viridis"
+    vmin, vmax : float, optional
+        Default to the range of ``column``.
+    color : default "C0"
+        Color of the features without ``column``.
+    alpha : float, default 1
+    saturation : float, default 10
+        For points without ``column``, the number of points per pixel at
+        which a pixel is fully opaque (on a log scale).
+    tile_size : int, default 256
+    cache_dir : str or Path, optional
+        Defaults to ``CACHE_DIR / "tiles"``.
+    """
+
+    def __init__(self, data, column=None, cmap="viridis", vmin=None,
+                 vmax=None, color="C0", alpha=1.0, saturation=10,
+                 tile_size=TILE_SIZE, cache_dir=None):
+        if isinstance(data, geopandas.GeoSeries):
+            data = data.to_frame("geometry")
+        types = set(data.geom_type.dropna().unique())
+        if types <= {"Point", "MultiPoint"}:
+            self.kind = "points"
+        elif types <= {"Polygon", "MultiPolygon"}:
+            self.kind = "polygons"
+        else:
+            raise ValueError(
+                "Only polygon or point layers can be rendered, got {}.".format(
+                    ", ".join(sorted(types)))
+            )
+        self.data = to_mercator(data)
+        self._edge_arrays = None
+        self.column = column
+        self.tile_size = tile_size
+        self.key = layer_hash(data, columns=[column] if column else None)
+
+        values = None if column is None else data[column]
+        categorical = values is not None and not (
+            pd.api.types.is_numeric_dtype(values)
+            and not isinstance(values.dtype, pd.CategoricalDtype)
+        )
+        if values is not None and not categorical:
+            values = values.to_numpy(dtype="float64", na_value=np.nan)
+            vmin = np.nanmin(values) if vmin is None else vmin
+            vmax = np.nanmax(values) if vmax is None else vmax
+        self.style = {
+            "column": column, "cmap": cmap, "vmin": vmin, "vmax": vmax,
+            "color": color, "alpha": alpha, "saturation": saturation,
+            "tile_size": tile_size,
+        }
+        self._cmap = matplotlib.colormaps[cmap]
+        self._rgba = np.asarray(matplotlib.colors.to_rgba(color, alpha))
+
+        if values is None:
+            self.values = None
+            self.colors = np.tile(self._rgba, (len(data), 1))
+        elif categorical:
+            codes, categories = pd.factorize(values, sort=True)
+            self.style["categories"] = [str(c) for c in categories]
+            self.values = codes.astype("float64")
+            self.values[codes < 0] = np.nan
+            self.colors = self._colormap(
+                self.values / max(len(categories) - 1, 1))
+        else:
+            self.values = values
+            self.colors = self._colormap(self._normalize(values))
+        self.colors = (self.colors * 255).round().astype("uint8")
+
+        style_key = hashlib.sha1(
+            json.dumps(self.style, sort_keys=True, default=str).encode()
+        ).hexdigest()[:12]
+        self.cache_dir = (
+            Path(cache_dir or CACHE_DIR / "tiles") / self.key / style_key
+        )
+
+    def _normalize(self, values):
+        vmin, vmax = self.style["vmin"], self.style["vmax"]
+        return (values - vmin) / (vmax - vmin if vmax > vmin else 1)
+
+    def _colormap(self, fraction):
+        colors = self._cmap(np.clip(np.nan_to_num(fraction), 0, 1))
+        colors[:, 3] = np.where(np.isnan(fraction), 0, self.style["alpha"])
+        return colors
+
+    def _edges(self):
+        """
+        Coordinates of all polygon rings, computed once per layer.
+
+        Returns the coordinates, the feature of each coordinate, whether a
+        coordinate closes its ring (so no edge starts there), and the
+        offsets of the coordinates of each feature.
+        """
+        if self._edge_arrays is None:
+            geometry = np.asarray(self.data.geometry.values)
+            parts, part_owner = shapely.get_parts(geometry, return_index=True)
+            rings, ring_part = shapely.get_rings(parts, return_index=True)
+            coords, coord_ring = shapely.get_coordinates(rings, return_index=True)
+            owner = part_owner[ring_part][coord_ring]
+            closing = np.append(coord_ring[1:] != coord_ring[:-1], True)
+            offsets = np.searchsorted(owner, np.arange(len(geometry) + 1))
+            self._edge_arrays = (coords, owner, closing, offsets)
+        return self._edge_arrays
+
+    def _render_polygons(self, bounds):
+        n = self.tile_size
+        image = np.zeros((n * n, 4), dtype="uint8")
+        minx, miny, maxx, maxy = bounds
+        box = shapely.box(*bounds)
+        candidates = np.sort(self.data.sindex.query(box, predicate="intersects"))
+        if len(candidates) == 0:
+            return image
+        geometry = np.asarray(self.data.geometry.values)[candidates]
+        covering = shapely.covers(geometry, box)
+        if covering[-1]:
+            # Nothing is drawn on top of a polygon covering the whole tile.
+            image[:] = self.colors[candidates[-1]]
+            return image
+
+        # Scanline fill: the crossings of all polygon edges with the rows
+        # of pixel centers are computed at once, sorted, and paired up
+        # (even-odd rule, so holes are left empty).
+        coords, coord_owner, closing, offsets = self._edges()
+        start = offsets[candidates]
+        size = offsets[candidates + 1] - start
+        edge = np.repeat(start, size) + _ranges(size)
+        edge = edge[~closing[edge]]
+        # Edge end points in pixel units: column, and row from the top.
+        resolution = (maxx - minx) / n
+        c0 = (coords[edge, 0] - minx) / resolution
+        c1 = (coords[edge + 1, 0] - minx) / resolution
+        r0 = (maxy - coords[edge, 1]) / resolution
+        r1 = (maxy - coords[edge + 1, 1]) / resolution
+
+        # Rows whose center (i + 0.5) lies in [min(r0, r1), max(r0, r1)).
+        first = np.maximum(np.ceil(np.minimum(r0, r1) - 0.5), 0).astype("int64")
+        last = np.minimum(np.ceil(np.maximum(r0, r1) - 0.5), n).astype("int64")
+        count = np.maximum(last - first, 0)
+        crossing = np.repeat(np.arange(len(edge)), count)
+        row = first[crossing] + _ranges(count)
+        t = (row + 0.5 - r0[crossing]) / (r1[crossing] - r0[crossing])
+        column = c0[crossing] + t * (c1[crossing] - c0[crossing])
+        owner = coord_owner[edge[crossing]]
+
+        order = np.lexsort((column, row, owner))
+        column, row, owner = column[order], row[order], owner[order]
+        start = np.clip(np.ceil(column[0::2] - 0.5), 0, n).astype("int64")
+        stop = np.clip(np.ceil(column[1::2] - 0.5), 0, n).astype("int64")
+        length = np.maximum(stop - start, 0)
+        pixel = np.repeat(row[0::2] * n + start, length) + _ranges(length)
+        # Polygons are painted in order, so where they overlap the last
+        # one wins, as when plotting.
+        image[pixel] = self.colors[np.repeat(owner[0::2], length)]
+        return image
+
+    def _render_points(self, bounds):
+        minx, miny, maxx, maxy = bounds
+        n = self.tile_size
+        candidates = self.data.sindex.query(shapely.box(*bounds))
+        coords, index = shapely.get_coordinates(
+            np.asarray(self.data.geometry.values)[candidates], return_index=True
+        )
+        feature = candidates[index]
+        col = np.floor((coords[:, 0] - minx) / (maxx - minx) * n).astype("int64")
+        row = np.floor((maxy - coords[:, 1]) / (maxy - miny) * n).astype("int64")
+        keep = (col >= 0) & (col < n) & (row >= 0) & (row < n)
+        pixel = (row * n + col)[keep]
+        counts = np.bincount(pixel, minlength=n * n)
+        image = np.zeros((n * n, 4))
+        if self.values is None:
+            image[:] = self._rgba
+            image[:, 3] *= np.minimum(
+                np.log1p(counts) / np.log1p(self.style["saturation"]), 1)
+        else:
+            values = self.values[feature[keep]]
+            valid = ~np.isnan(values)
+            total = np.bincount(pixel[valid], weights=values[valid],
+                                minlength=n * n)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean = total / np.bincount(pixel[valid], minlength=n * n)
+            if "categories" in self.style:
+                fraction = mean / max(len(self.style["categories"]) - 1, 1)
+            else:
+                fraction = self._normalize(mean)
+            image = self._colormap(fraction)
+        return (image * 255).round().astype("uint8")
+
+    def render(self, z, x, y):
+        """
+        Render tile (z, x, y) without using the cache.
+
+        Returns
+        -------
+        ndarray of shape (tile_size, tile_size, 4)
+            RGBA pixels, as uint8.
+        """
+        bounds = tile_bounds(z, x, y)
+        if self.kind == "points":
+            image = self._render_points(bounds)
+        else:
+            image = self._render_polygons(bounds)
+        return image.reshape(self.tile_size, self.tile_size, 4)
+
+    def path(self, z, x, y):
+        """PNG file of tile (z, x, y), rendered and cached if needed."""
+        path = self.cache_dir / str(z) / str(x) / "{}.png".format(y)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp.png")
+            matplotlib.image.imsave(tmp, self.render(z, x, y),
+                                    pil_kwargs={"compress_level": 1})
+            tmp.replace(path)
+        return path
+
+    def tile(self, z, x, y):
+        """RGBA pixels of tile (z, x, y), from the cache if possible."""
+        image = matplotlib.image.imread(self.path(z, x, y))
+        return (image * 255).round().astype("uint8")
+
+    def image(self, z=None, bounds=None):
+        """
+        Mosaic of the tiles covering ``bounds``.
+
+        Parameters
+        ----------
+        z : int, optional
+            Zoom level. Defaults to a level where the image is about 1024
+            pixels wide.
+        bounds : tuple, optional
+            In EPSG:3857. Defaults to the bounds of the layer.
+
+        Returns
+        -------
+        image : ndarray of shape (height, width, 4)
+        extent : tuple of (minx, maxx, miny, maxy)
+            In EPSG:3857, as expected by ``imshow``.
+        """
+        bounds = self.data.total_bounds if bounds is None else bounds
+        z = zoom_for_bounds(bounds, tile_size=self.tile_size) if z is None else z
+        tiles = tiles_for_bounds(bounds, z)
+        xs = sorted({x for x, _ in tiles})
+        ys = sorted({y for _, y in tiles})
+        n = self.tile_size
+        image = np.zeros((len(ys) * n, len(xs) * n, 4), dtype="uint8")
+        for x, y in tiles:
+            i, j = ys.index(y), xs.index(x)
+            image[i * n:(i + 1) * n, j * n:(j + 1) * n] = self.tile(z, x, y)
+        minx, _, _, maxy = tile_bounds(z, xs[0], ys[0])
+        _, miny, maxx, _ = tile_bounds(z, xs[-1], ys[-1])
+        return image, (minx, maxx, miny, maxy)
+
+    def plot(self, ax=None, z=None, bounds=None, figsize=None, **kwargs):
+        """
+        Draw the layer on a matplotlib axes, in EPSG:3857.
+
+        Additional keyword arguments are passed to ``imshow``.
+        """
+        import matplotlib.pyplot as plt
+
+        if ax is None:
+            _, ax = plt.subplots(figsize=figsize)
+        image, extent = self.image(z=z, bounds=bounds)
+        ax.imshow(image, extent=extent, interpolation="nearest", **kwargs)
+        minx, miny, maxx, maxy = (self.data.total_bounds if bounds is None
+                                  else bounds)
+        ax.set_xlim(minx, maxx)
+        ax.set_ylim(miny, maxy)
+        ax.set_aspect("equal")
+        return ax
@@ -0,0 +1,373 @@
+"""
+Local, offline vector tile server for the bundled layers.
+
+Layers are cut into Mapbox Vector Tiles (see :mod:`healthgis.mvt`) on
+demand: each tile is clipped from a spatial index query on the layer in
+web mercator, polygons and lines are taken from the level of detail
+pyramid of :mod:`healthgis.lod` matching the zoom, and encoded tiles are
+kept in an LRU cache. A small asyncio HTTP/1.1 front end (with
+keep-alive, no extra dependency) serves
+
+* ``/`` the list of layers,
+* ``/<layer>.json`` the TileJSON of a layer,
+* ``/<layer>/<z>/<x>/<y>.pbf`` its tiles,
+
+so that ipyleaflet's ``VectorTileLayer`` or folium's
+``VectorGridProtobuf`` only load the visible tiles instead of whole
+layers as GeoJSON.
+
+>>> from healthgis.tileserver import TileServer
+>>> server = TileServer(port=8765).start()
+>>> m.add(ipyleaflet.VectorTileLayer(url=server.url("paris_districts")))
+
+or, from ``book/``::
+
+    python -m healthgis.tileserver --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import geopandas
+import shapely
+
+from .lod import build_pyramid
+from .mvt import BUFFER, EXTENT, encode_tile, tile_geometry
+from .paths import resolve
+from .tiles import tile_bounds, to_mercator
+
+LAYERS = {
+    "paris_districts": "paris_districts.geojson",
+    "paris_trees": "paris_trees.gpkg",
+    "paris_bike_stations": "paris_bike_stations.geojson",
+    "ne_110m_admin_0_countries": "ne_110m_admin_0_countries.zip",
+    "ne_110m_populated_places": "ne_110m_populated_places.zip",
+    "ne_50m_rivers_lake_centerlines": "ne_50m_rivers_lake_centerlines.zip",
+}
+
+MAX_ZOOM = 22
+
+# Number of encoded tiles kept in memory.
+CACHE_SIZE = 4096
+
+CONTENT_TYPE = "application/vnd.mapbox-vector-tile"
+
+_TILE = re.compile(r"^/(?P<layer>[\w.-]+)/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.(pbf|mvt)$")
+
+# Geometry types that can share an MVT layer.
+DIMENSIONS = {
+    "Point": "points", "MultiPoint": "points",
+    "LineString": "lines", "MultiLineString": "lines", "LinearRing": "lines",
+    "Polygon": "polygons", "MultiPolygon": "polygons",
+}
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class VectorLayer:
+    """
+    A layer cut into vector tiles.
+
+    Parameters
+    ----------
+    data : GeoDataFrame
+    name : str
+        Name of the layer in the tiles.
+    columns : list of str, optional
+        Attributes included in the tiles. Defaults to all columns.
+    max_zoom : int, default 12
+        Last zoom level of the simplification pyramid of polygon and line
+        layers; deeper tiles use the full-resolution geometries.
+    extent, buffer : int
+        See :func:`healthgis.mvt.tile_geometry`.
+
+    Raises
+    ------
+    ValueError
+        When ``data`` mixes points, lines and polygons, or holds geometry
+        collections: a layer of a vector tile has a single geometry type.
+    """
+
+    def __init__(self, data, name, columns=None, max_zoom=12, extent=EXTENT,
+                 buffer=BUFFER):
+        types = set(data.geom_type.dropna().unique())
+        kinds = {DIMENSIONS.get(t) for t in types}
+        if None in kinds or len(kinds) > 1:
+            raise ValueError(
+                "Layer {!r} holds {} geometries; a vector tile layer has a "
+                "single kind of points, lines or polygons, so split it into "
+                "one layer per kind.".format(name, ", ".join(sorted(types)))
+            )
+        self.name = name
+        self.extent = extent
+        self.buffer = buffer
+        if columns is not None:
+            data = data[list(columns) + [data.geometry.name]]
+        self.data = to_mercator(data)
+        self.properties = self.data.drop(columns=self.data.geometry.name)
+        points = self.data.geom_type.isin(["Point", "MultiPoint"]).all()
+        self.pyramid = None if points else build_pyramid(data, max_zoom=max_zoom)
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    def _level(self, z):
+        """Geometries in web mercator and their index for zoom ``z``."""
+        if self.pyramid is None or z > self.pyramid.zooms[-1]:
+            key, level = None, self.data
+        else:
+            key = max(z, self.pyramid.zooms[0])
+            level = self.pyramid.level(key)
+        with self._lock:
+            if key not in self._levels:
+                geometry = np.asarray(to_mercator(level).geometry.values)
+                # clip_by_rect needs valid polygons; reprojection and
+                # simplification can leave a few self-intersections.
+                geometry = shapely.make_valid(geometry, method="structure",
+                                              keep_collapsed=False)
+                self._levels[key] = (geometry, shapely.STRtree(geometry))
+        return self._levels[key]
+
+    def tile(self, z, x, y):
+        """Tile ``(z, x, y)`` of the layer, encoded as MVT."""
+        geometry, tree = self._level(z)
+        bounds = tile_bounds(z, x, y)
+        margin = (bounds[2] - bounds[0]) * self.buffer / self.extent
+        box = shapely.box(bounds[0] - margin, bounds[1] - margin,
+                          bounds[2] + margin, bounds[3] + margin)
+        index = np.sort(tree.query(box, predicate="intersects"))
+        clipped = tile_geometry(geometry[index], bounds, self.extent, self.buffer)
+        return encode_tile(
+            {self.name: (clipped, self.properties.iloc[index], index)},
+            extent=self.extent,
+        )
+
+    def tilejson(self, url):
+        lon_lat = self.data.to_crs("EPSG:4326").total_bounds
+        return {
+            "tilejson": "3.0.0",
+            "name": self.name,
+            "tiles": [url],
+            "minzoom": 0,
+            "maxzoom": MAX_ZOOM,
+            "bounds": [round(float(v), 6) for v in lon_lat],
+            "vector_layers": [{
+                "id": self.name,
+                "fields": {column: str(dtype) for column, dtype
+                           in self.properties.dtypes.items()},
+            }],
+        }
+
+
+class TileServer:
+    """
+    Serve vector tiles of a set of layers over HTTP.
+
+    Parameters
+    ----------
+    layers : dict, optional
+        ``{name: dataset or GeoDataFrame}``; datasets are resolved with
+        :func:`healthgis.paths.resolve` and read on first request.
+        Defaults to :data:`LAYERS`.
+    host : str, default "127.0.0.1"
+    port : int, default 8765
+        Pass 0 to pick a free port.
+    cache_size : int, default 4096
+        Number of encoded tiles kept in memory.
+    max_workers : int, optional
+        Threads encoding tiles.
+    """
+
+    def __init__(self, layers=None, host="127.0.0.1", port=8765,
+                 cache_size=CACHE_SIZE, max_workers=None):
+        self.sources = dict(LAYERS if layers is None else layers)
+        self.host = host
+        self.port = port
+        self.cache_size = cache_size
+        self.max_workers = max_workers
+        self._layers = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self.hits = self.misses = 0
+
+    def layer(self, name):
+        """The :class:`VectorLayer` called ``name``, read on first use."""
+        if name not in self.sources:
+            raise KeyError(name)
+        with self._lock:
+            if name not in self._layers:
+                data = self.sources[name]
+                if not isinstance(data, geopandas.GeoDataFrame):
+                    data = geopandas.read_file(resolve(data)[1])
+                self._layers[name] = VectorLayer(data, name)
+            return self._layers[name]
+
+    def tile(self, name, z, x, y):
+        """Encoded tile, from the cache if it was requested before."""
+        if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise KeyError((z, x, y))
+        key = (name, z, x, y)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+        data = self.layer(name).tile(z, x, y)
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = data
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return data
+
+    def clear_cache(self):
+        """Forget all encoded tiles."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+    def url(self, name):
+        """XYZ url template of the tiles of layer ``name``."""
+        return "http://{}:{}/{}/{{z}}/{{x}}/{{y}}.pbf".format(
+            self.host, self.port, name)
+
+    async def _respond(self, method, target):
+        if method != "GET":
+            return 405, "text/plain", b""
+        path = target.split("?", 1)[0]
+        loop = asyncio.get_running_loop()
+        try:
+            match = _TILE.match(path)
+            if match:
+                z, x, y = (int(match[k]) for k in "zxy")
+                data = await loop.run_in_executor(
+                    self._executor, self.tile, match["layer"], z, x, y)
+                return 200, CONTENT_TYPE, data
+            if path == "/":
+                body = {name: "http://{}:{}/{}.json".format(self.host, self.port, name)
+                        for name in self.sources}
+            elif path.endswith(".json"):
+                name = path[1:-len(".json")]
+                layer = await loop.run_in_executor(self._executor, self.layer, name)
+                body = layer.tilejson(self.url(name))
+            else:
+                return 404, "text/plain", b""
+        except KeyError:
+            return 404, "text/plain", b""
+        return 200, "application/json", json.dumps(body).encode()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = header.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip().lower()
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    status, content_type, body = 400, "text/plain", b""
+                    version = "HTTP/1.0"
+                else:
+                    try:
+                        status, content_type, body = await self._respond(
+                            method, target)
+                    except Exception as error:
+                        status, content_type = 500, "text/plain"
+                        body = str(error).encode()
+                keep_alive = (version == "HTTP/1.1"
+                              and headers.get("connection") != "close")
+                writer.write((
+                    "HTTP/1.1 {} {}\r\n"
+                    "Content-Type: {}\r\n"
+                    "Content-Length: {}\r\n"
+                    "Access-Control-Allow-Origin: *\r\n"
+                    "Connection: {}\r\n\r\n"
+                ).format(status, _REASONS[status], content_type, len(body),
+                         "keep-alive" if keep_alive else "close").encode()
+                    + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        """Serve until cancelled."""
+        self._executor = ThreadPoolExecutor(self.max_workers)
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        self._server = server
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def start(self):
+        """Serve in a background thread, e.g. from a notebook."""
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            try:
+                self._loop.run_until_complete(self.serve())
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        # Wait for the socket, so that a port of 0 is replaced by the
+        # actual port.
+        while self._server is None and self._thread.is_alive():
+            self._thread.join(0.01)
+        return self
+
+    def stop(self):
+        """Stop a server started with :meth:`start`."""
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._thread.join()
+            self._loop = self._server = self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--layer", nargs=2, action="append", default=[],
+                        metavar=("NAME", "DATASET"),
+                        help="serve an extra dataset, e.g. paris_land_use.zip")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    args = parser.parse_args()
+    layers = {**LAYERS, **{name: Path(path) for name, path in args.layer}}
+    server = TileServer(layers, args.host, args.port, args.cache_size)
+    print("Serving {} on http://{}:{}/".format(", ".join(layers), args.host,
+                                              args.port))
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
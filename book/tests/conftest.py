@@ -0,0 +1,35 @@
+"""
+Shared fixtures of the ``healthgis`` tests.
+
+Run the tests from ``book/`` with ``python -m pytest``. The caches are
+written to a temporary directory instead of ``data/.cache``.
+"""
+
+import os
+import tempfile
+
+# Set before any healthgis module reads it.
+os.environ["HEALTHGIS_CACHE_DIR"] = tempfile.mkdtemp(prefix="healthgis-tests-")
+
+import geopandas
+import pytest
+
+from healthgis.paths import DATA_DIR
+
+
+@pytest.fixture(scope="session")
+def districts():
+    """The 80 Paris districts, in UTM zone 31N."""
+    return geopandas.read_file(DATA_DIR / "paris_districts_utm.geojson")
+
+
+@pytest.fixture(scope="session")
+def stations():
+    """The 1226 Paris bike stations, in UTM zone 31N."""
+    return geopandas.read_file(DATA_DIR / "paris_sharing_bike_stations_utm.geojson")
+
+
+@pytest.fixture(scope="session")
+def trees():
+    """The 7856 Paris trees, in UTM zone 31N."""
+    return geopandas.read_file(DATA_DIR / "paris_trees.gpkg")
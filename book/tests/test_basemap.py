@@ -0,0 +1,73 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from healthgis import crs
+from healthgis.basemap import TileStore, _warp
+from healthgis.tiles import tile_bounds, tiles_for_bounds
+
+PARIS = (2.25, 48.82, 2.42, 48.90)
+ZOOM = 11
+
+
+def png(color, size=256):
+    buffer = io.BytesIO()
+    Image.new("RGBA", (size, size), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TileStore(tmp_path / "test.mbtiles",
+                      provider={"name": "Test", "url": "", "attribution": "test"})
+    bounds = crs.transform_xy(PARIS[::2], PARIS[1::2], "EPSG:4326", "EPSG:3857")
+    bounds = (bounds[0][0], bounds[1][0], bounds[0][1], bounds[1][1])
+    tiles = {(ZOOM, x, y): png((x % 256, y % 256, 0, 255))
+             for x, y in tiles_for_bounds(bounds, ZOOM)}
+    store.put(tiles)
+    store.bounds = bounds
+    return store
+
+
+def test_store_round_trip(store, tmp_path):
+    z = ZOOM
+    x, y = tiles_for_bounds(store.bounds, z)[0]
+    assert (z, x, y) in store
+    assert store.image(z, x, y)[0, 0].tolist() == [x % 256, y % 256, 0, 255]
+    assert store.get(z + 1, x, y) is None
+    # The tiles and the provider are read back from the file.
+    reopened = TileStore(tmp_path / "test.mbtiles")
+    assert len(reopened) == len(store)
+    assert reopened.attribution == "test"
+
+
+def test_mosaic(store):
+    image, extent = store.mosaic(store.bounds, ZOOM)
+    tiles = tiles_for_bounds(store.bounds, ZOOM)
+    xs = sorted({x for x, _ in tiles})
+    ys = sorted({y for _, y in tiles})
+    assert image.shape == (256 * len(ys), 256 * len(xs), 4)
+    assert image[0, 0].tolist() == [xs[0] % 256, ys[0] % 256, 0, 255]
+    assert image[-1, -1].tolist() == [xs[-1] % 256, ys[-1] % 256, 0, 255]
+    assert extent[0] == tile_bounds(ZOOM, xs[0], ys[0])[0]
+    assert store.missing(store.bounds, [ZOOM]) == []
+    with pytest.raises(ValueError, match="not in"):
+        store.mosaic(store.bounds, ZOOM + 1)
+
+
+def test_warp_uses_the_cached_transformer(store):
+    image, extent = store.mosaic(store.bounds, ZOOM)
+    x, y = tiles_for_bounds(store.bounds, ZOOM)[0]
+    minx, miny, maxx, maxy = tile_bounds(ZOOM, x, y)
+    # The inside of one tile, in Lambert 93.
+    (lx, ux), (ly, uy) = crs.transform_xy(
+        [minx + 1000, maxx - 1000], [miny + 1000, maxy - 1000],
+        "EPSG:3857", "EPSG:2154")
+    crs.get_transformer("EPSG:2154", "EPSG:3857")
+    hits = crs._transformer.cache_info().hits
+    warped, warped_extent = _warp(image, extent, (lx, ly, ux, uy), "EPSG:2154")
+    assert crs._transformer.cache_info().hits == hits + 1
+    assert warped_extent == (lx, ux, ly, uy)
+    assert (warped.reshape(-1, 4) == [x % 256, y % 256, 0, 255]).all()
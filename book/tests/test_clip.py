@@ -0,0 +1,46 @@
+import numpy as np
+import geopandas
+import pytest
+
+from healthgis.clip import clip
+from healthgis.paths import DATA_DIR
+
+
+@pytest.fixture(scope="module")
+def land_use():
+    return geopandas.read_file(DATA_DIR / "paris_land_use.zip")
+
+
+@pytest.fixture(scope="module")
+def muette(land_use):
+    districts = geopandas.read_file(DATA_DIR / "paris_districts.geojson")
+    districts = districts.to_crs(land_use.crs)
+    return districts.loc[districts["district_name"] == "Muette", "geometry"].item()
+
+
+def test_clip_matches_geopandas(land_use, muette):
+    expected = geopandas.clip(land_use, muette)
+    result = clip(land_use, muette)
+    assert len(result) > 0
+    assert result.index.equals(expected.sort_index().index)
+    expected = expected.loc[result.index]
+    assert (result["class"] == expected["class"]).all()
+    np.testing.assert_allclose(result.area, expected.area, rtol=1e-9, atol=1e-6)
+    assert result.geometry.symmetric_difference(expected.geometry).area.max() < 1e-6
+
+
+def test_clip_geoseries_and_frame_mask(land_use, muette):
+    mask = geopandas.GeoDataFrame(geometry=[muette], crs=land_use.crs)
+    before = land_use.geometry.copy()
+    result = clip(land_use.geometry, mask)
+    assert isinstance(result, geopandas.GeoSeries)
+    assert result.name == land_use.geometry.name
+    assert result.index.equals(clip(land_use, muette).index)
+    # The input is left untouched.
+    assert land_use.geometry.geom_equals_exact(before, 0).all()
+
+
+def test_clip_crs_mismatch(land_use, muette):
+    mask = geopandas.GeoSeries([muette], crs=land_use.crs).to_crs("EPSG:4326")
+    with pytest.raises(ValueError, match="CRS mismatch"):
+        clip(land_use, mask)
@@ -0,0 +1,117 @@
+import numpy as np
+import geopandas
+import pytest
+import shapely
+from pyproj import CRS
+
+from healthgis import crs
+from healthgis.crs import reproject, to_crs, to_local_crs, utm_epsg
+from healthgis.registry import LayerRegistry
+
+
+def test_to_crs_matches_geopandas(districts):
+    result = to_crs(districts, "EPSG:4326")
+    expected = districts.to_crs("EPSG:4326")
+    assert result.crs == expected.crs
+    assert shapely.equals_exact(
+        result.geometry.values, expected.geometry.values, tolerance=1e-9
+    ).all()
+
+
+def test_to_crs_keeps_z():
+    points = geopandas.GeoSeries(
+        shapely.points([[2.35, 48.85, 35.0], [2.29, 48.86, 120.0]]),
+        crs="EPSG:4979",
+    )
+    result = to_crs(points, "EPSG:4978")
+    expected = points.to_crs("EPSG:4978")
+    assert shapely.has_z(result.values).all()
+    np.testing.assert_allclose(
+        shapely.get_coordinates(result.values, include_z=True),
+        shapely.get_coordinates(expected.values, include_z=True),
+    )
+
+
+def test_registry_keeps_z(tmp_path):
+    path = tmp_path / "stations_3d.gpkg"
+    geopandas.GeoDataFrame(
+        {"name": ["a", "b"]},
+        geometry=shapely.points([[650000, 6860000, 35], [651000, 6861000, 80]]),
+        crs="EPSG:2154",
+    ).to_file(path)
+    registry = LayerRegistry(cache_dir=tmp_path / "cache")
+    for _ in range(2):  # built, then read back from the cache
+        layer = registry.get(path, crs="EPSG:4326")
+        registry.clear()
+        z = shapely.get_coordinates(layer.frame.geometry.values, include_z=True)[:, 2]
+        np.testing.assert_allclose(z, [35, 80])
+
+
+def test_reproject_is_memoized(districts, monkeypatch):
+    calls = []
+    monkeypatch.setattr(crs, "to_crs", lambda data, target: calls.append(
+        target) or to_crs(data, target))
+    data = districts.copy()
+    first = reproject(data, "EPSG:4326")
+    first["extra"] = 1
+    second = reproject(data, "EPSG:4326")
+    assert len(calls) == 1
+    assert "extra" not in second.columns
+
+
+def test_utm_epsg():
+    np.testing.assert_array_equal(
+        utm_epsg([2.35, -74.0, 5.3, 15.0], [48.85, 40.7, 60.4, 78.2]),
+        [32631, 32618, 32632, 32633],
+    )
+    local = to_local_crs(geopandas.GeoSeries(shapely.points([[2.35, 48.85]]),
+                                             crs="EPSG:4326"))
+    assert local.crs == CRS.from_epsg(32631)
+
+
+def test_equal_area_crs(districts):
+    local = to_local_crs(districts.to_crs("EPSG:4326"), kind="equal_area")
+    np.testing.assert_allclose(local.area, districts.area, rtol=2e-3)
+    with pytest.raises(ValueError, match="kind"):
+        to_local_crs(districts, kind="mercator")
+
+
+def _area(df):
+    return df.area
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_apply_by_utm_zone(max_workers):
+    cells = geopandas.GeoSeries(
+        [shapely.box(lon, 45, lon + 1, 46) for lon in [-4.5, 2.0, 8.5, 2.5]],
+        index=[10, 11, 12, 13], crs="EPSG:4326",
+    )
+    assert list(crs.utm_zones(cells)) == [32630, 32631, 32632, 32631]
+    result = crs.apply_by_utm_zone(cells, _area, max_workers=max_workers)
+    assert result.index.equals(cells.index)
+    expected = [cell.to_crs(epsg).area.item() for cell, epsg in
+                zip((cells.iloc[[i]] for i in range(4)), crs.utm_zones(cells))]
+    np.testing.assert_allclose(result, expected)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_apply_by_utm_zone_duplicates_and_empty(max_workers):
+    cells = geopandas.GeoSeries(
+        [shapely.box(-4.5, 45, -3.5, 46), shapely.Polygon(), None,
+         shapely.box(2.0, 45, 3.0, 46)],
+        index=[1, 1, 2, 2], crs="EPSG:4326",
+    )
+    zones = crs.utm_zones(cells)
+    assert zones.index.equals(cells.index)
+    assert zones.isna().tolist() == [False, True, True, False]
+    result = crs.apply_by_utm_zone(cells, _area, max_workers=max_workers)
+    assert result.index.equals(cells.index)
+    assert result.isna().tolist() == [False, True, True, False]
+    np.testing.assert_allclose(
+        result.iloc[[0, 3]],
+        [cells.iloc[[0]].to_crs(32630).area.item(),
+         cells.iloc[[3]].to_crs(32631).area.item()],
+    )
+    empty = crs.apply_by_utm_zone(cells.iloc[[1, 2]], _area,
+                                  max_workers=max_workers)
+    assert empty.isna().all() and empty.index.equals(cells.index[[1, 2]])
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import geopandas
+import pytest
+
+from healthgis.dissolve import dissolve, union_all
+from healthgis.paths import DATA_DIR
+
+
+@pytest.fixture(scope="module")
+def land_use():
+    return geopandas.read_file(DATA_DIR / "paris_land_use.zip")
+
+
+@pytest.fixture(scope="module")
+def land_use_by_class(land_use):
+    return land_use.dissolve("class")
+
+
+def _assert_same_area(result, expected):
+    np.testing.assert_allclose(result.area, expected.area, rtol=1e-9)
+    difference = result.geometry.symmetric_difference(expected.geometry)
+    assert (difference.area < 1e-6 * expected.area).all()
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_dissolve_matches_geopandas(land_use, land_use_by_class, max_workers):
+    expected = land_use_by_class
+    result = dissolve(land_use, "class", chunk_size=64, max_workers=max_workers)
+    assert list(result.columns) == list(expected.columns)
+    assert result.index.equals(expected.index)
+    assert result.crs == expected.crs
+    _assert_same_area(result, expected)
+
+
+def test_dissolve_aggfunc(districts):
+    districts = districts.assign(group=districts["id"] // 4)
+    expected = districts.dissolve("group", aggfunc={"population": "sum"})
+    result = dissolve(districts[["group", "population", "geometry"]], "group",
+                      aggfunc={"population": "sum"}, chunk_size=2)
+    pd.testing.assert_series_equal(result["population"], expected["population"])
+    _assert_same_area(result, expected)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_union_all(districts, max_workers):
+    expected = districts.union_all()
+    result = union_all(districts.geometry, chunk_size=8, max_workers=max_workers)
+    assert abs(result.area - expected.area) < 1e-9 * expected.area
+    assert result.symmetric_difference(expected).area < 1e-6 * expected.area
@@ -0,0 +1,71 @@
+import numpy as np
+import geopandas
+import pytest
+import shapely
+from pyproj import Geod
+
+from healthgis.distance import distance, lonlat, point_distance
+from healthgis.knn import PointIndex
+
+PARIS = (2.3522, 48.8566)
+LONDON = (-0.1276, 51.5072)
+
+
+def test_modes_against_known_distances():
+    # Paris - London is about 343.5 km on the ellipsoid.
+    geodesic = distance(*PARIS, *LONDON, mode="geodesic")
+    expected = Geod(ellps="WGS84").inv(*PARIS, *LONDON)[2]
+    assert geodesic == pytest.approx(expected)
+    assert distance(*PARIS, *LONDON, mode="haversine") == pytest.approx(
+        expected, rel=5e-3)
+    assert distance(0, 0, 3, 4) == 5
+    with pytest.raises(ValueError, match="mode"):
+        distance(0, 0, 1, 1, mode="manhattan")
+
+
+def test_point_distance_matches_projected_distance(stations):
+    center = stations.geometry.iloc[0]
+    haversine = point_distance(stations, center, mode="haversine")
+    planar = point_distance(stations, center, mode="planar")
+    np.testing.assert_allclose(planar, stations.distance(center))
+    # The sphere and UTM zone 31N agree to a few tenths of a percent.
+    np.testing.assert_allclose(haversine, planar, rtol=5e-3, atol=1e-6)
+
+
+def test_empty_and_missing_points_stay_aligned():
+    points = geopandas.GeoDataFrame(
+        {"name": list("abcd")},
+        geometry=[shapely.Point(PARIS), shapely.Point(), None,
+                  shapely.Point(LONDON)],
+        crs="EPSG:4326",
+    )
+    lon, lat = lonlat(points)
+    np.testing.assert_array_equal(lon, [PARIS[0], np.nan, np.nan, LONDON[0]])
+    result = point_distance(points, shapely.Point(PARIS))
+    assert result.index.equals(points.index)
+    assert result.iloc[0] == 0 and result.iloc[1:3].isna().all()
+    assert result.iloc[3] == pytest.approx(distance(*PARIS, *LONDON,
+                                                    mode="haversine"))
+
+    index = PointIndex(points, ids="name", metric="haversine")
+    ids, distances = index.query(points, k=1)
+    assert list(ids[:, 0]) == ["a", None, None, "d"]
+    np.testing.assert_allclose(distances[:, 0], [0, np.nan, np.nan, 0],
+                               atol=1e-6)
+
+
+def test_non_point_geometries_are_rejected(districts):
+    with pytest.raises(ValueError, match="point"):
+        lonlat(districts)
+    with pytest.raises(ValueError, match="point"):
+        PointIndex(districts, metric="haversine")
+
+
+def test_haversine_index_matches_brute_force(stations):
+    queries = stations.iloc[::100]
+    ids, distances = PointIndex(stations, metric="haversine").query(queries, k=2)
+    lon, lat = lonlat(stations)
+    qlon, qlat = lonlat(queries)
+    expected = distance(qlon[:, None], qlat[:, None], lon, lat, mode="haversine")
+    np.testing.assert_allclose(distances, np.sort(expected, axis=1)[:, :2],
+                               atol=1e-3)
@@ -0,0 +1,44 @@
+import nbformat
+from nbformat.v4 import new_code_cell, new_notebook
+
+from healthgis.execute import execute_all
+
+
+def write_notebook(path, *sources):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    nb = new_notebook(cells=[new_code_cell(source) for source in sources])
+    nb.metadata["kernelspec"] = {"name": "python3", "display_name": "Python 3",
+                                 "language": "python"}
+    nbformat.write(nb, str(path))
+    return path
+
+
+def test_execute_all(tmp_path):
+    (tmp_path / "data.txt").write_text("42")
+    ok = write_notebook(
+        tmp_path / "notebooks" / "ok.ipynb",
+        "import healthgis",
+        # Relative paths are resolved from the directory of the notebook.
+        "assert open('../data.txt').read() == '42'",
+    )
+    failing = write_notebook(
+        tmp_path / "notebooks" / "failing.ipynb",
+        "x = 1",
+        "1 / 0",
+        "y = 2",
+    )
+    cache_dir = tmp_path / "cache"
+
+    report = execute_all([ok, failing], cache_dir=cache_dir)
+    ok_record, failing_record = report["notebooks"]
+    assert ok_record["error"] is None and not ok_record["cached"]
+    assert [cell["index"] for cell in ok_record["cells"]] == [0, 1]
+    # The timings of the cells run before the error are kept.
+    assert "ZeroDivisionError" in failing_record["error"]
+    assert [(cell["index"], cell["error"]) for cell in failing_record["cells"]] \
+        == [(0, False), (1, True)]
+
+    report = execute_all([ok, failing], cache_dir=cache_dir)
+    ok_record, failing_record = report["notebooks"]
+    assert ok_record["cached"] and len(ok_record["cells"]) == 2
+    assert not failing_record["cached"]
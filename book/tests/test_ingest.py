@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+from healthgis.ingest import parse_xy, points_from_xy, read_csv
+
+
+@pytest.fixture
+def cases():
+    return pd.DataFrame({
+        "case": ["a", "b", "c", "d", "e", "f"],
+        "XY": ["48.85, 2.35", " 48.86,2.34 ", None, "48.9", "95.0, 2.0",
+               "-1e-1,+.5"],
+        "lat": ["48.85", 48.86, None, "n/a", 95.0, -0.1],
+        "lon": [2.35, 2.34, 2.36, 2.37, 2.0, 0.5],
+    }, index=[10, 11, 12, 13, 14, 15])
+
+
+def test_parse_xy(cases):
+    x, y = parse_xy(cases["XY"])
+    np.testing.assert_array_equal(x, [2.35, 2.34, np.nan, np.nan, 2.0, 0.5])
+    np.testing.assert_array_equal(y, [48.85, 48.86, np.nan, np.nan, 95.0, -0.1])
+    x, y = parse_xy(["1;2"], xy_sep=";", order="lonlat")
+    assert (x[0], y[0]) == (1, 2)
+    with pytest.raises(ValueError, match="order"):
+        parse_xy(cases["XY"], order="xy")
+
+
+@pytest.mark.parametrize("columns", [dict(xy="XY"), dict(x="lon", y="lat")])
+def test_points_from_xy(cases, columns):
+    result = points_from_xy(cases, **columns)
+    assert result.crs == "EPSG:4326"
+    assert list(result.columns) == ["case", "XY", "lat", "lon", "geometry"]
+    assert list(result.index) == [10, 11, 15]
+    expected = shapely.points([[2.35, 48.85], [2.34, 48.86], [0.5, -0.1]])
+    assert shapely.equals(result.geometry.values, expected).all()
+
+
+def test_points_from_xy_keep_invalid(cases):
+    result = points_from_xy(cases, x="lon", y="lat", drop_invalid=False)
+    assert result.index.equals(cases.index)
+    assert list(result.geometry.isna()) == [False, False, True, True, True, False]
+
+
+def test_points_from_xy_arguments(cases):
+    with pytest.raises(ValueError, match="either"):
+        points_from_xy(cases, xy="XY", x="lon", y="lat")
+    with pytest.raises(ValueError, match="either"):
+        points_from_xy(cases, x="lon")
+
+
+def test_read_csv(tmp_path, cases):
+    path = tmp_path / "cases.csv"
+    cases.to_csv(path, index=False)
+    result = read_csv(path, x="lon", y="lat")
+    chunks = list(read_csv(path, x="lon", y="lat", chunksize=4))
+    assert len(chunks) == 2
+    assert list(result["case"]) == ["a", "b", "f"]
+    assert list(pd.concat(chunks)["case"]) == ["a", "b", "f"]
+    assert shapely.equals(pd.concat(chunks).geometry.values,
+                          result.geometry.values).all()
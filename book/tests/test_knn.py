@@ -0,0 +1,57 @@
+import numpy as np
+import geopandas
+import shapely
+
+from healthgis.knn import PointIndex
+
+
+def brute_force(points, queries, k):
+    coords = shapely.get_coordinates(points.geometry.values)
+    query = shapely.get_coordinates(queries.geometry.values)
+    distances = np.linalg.norm(query[:, None] - coords[None], axis=2)
+    order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+    return order, np.take_along_axis(distances, order, axis=1)
+
+
+def test_query_matches_brute_force(stations):
+    queries = stations.iloc[::50].copy()
+    queries.geometry = queries.geometry.translate(123, -77)
+    ids, distances = PointIndex(stations).query(queries, k=3)
+    order, expected = brute_force(stations, queries, 3)
+    np.testing.assert_allclose(distances, expected)
+    np.testing.assert_array_equal(ids, stations.index.values[order])
+
+
+def test_query_max_distance_and_k_beyond_size(stations):
+    index = PointIndex(stations.iloc[:2], ids="name")
+    ids, distances = index.query(stations.iloc[:1], k=3, max_distance=1e9)
+    assert ids[0, 0] == stations["name"].iloc[0] and distances[0, 0] == 0
+    assert ids[0, 2] is None and np.isnan(distances[0, 2])
+
+
+def test_query_radius_matches_brute_force(stations):
+    queries = stations.iloc[:20]
+    result = PointIndex(stations).query_radius(queries, 500)
+    coords = shapely.get_coordinates(stations.geometry.values)
+    for i, point in enumerate(shapely.get_coordinates(queries.geometry.values)):
+        distance = np.linalg.norm(coords - point, axis=1)
+        rows = result[result["query"] == i]
+        assert set(rows["id"]) == set(stations.index[distance <= 500])
+        assert rows["distance"].is_monotonic_increasing
+
+
+def test_empty_and_missing_points_keep_ids_aligned():
+    points = geopandas.GeoDataFrame(
+        {"name": list("abcde")},
+        geometry=[shapely.Point(0, 0), shapely.Point(), shapely.Point(10, 0),
+                  None, shapely.Point(20, 0)],
+        crs="EPSG:2154",
+    )
+    index = PointIndex(points, ids="name")
+    assert len(index) == 3
+    ids, distances = index.query(points, k=1)
+    assert list(ids[:, 0]) == ["a", None, "c", None, "e"]
+    np.testing.assert_array_equal(distances[:, 0], [0, np.nan, 0, np.nan, 0])
+    result = index.query_radius(points, 1)
+    assert list(result["query"]) == [0, 2, 4]
+    assert list(result["id"]) == ["a", "c", "e"]
@@ -0,0 +1,41 @@
+import numpy as np
+import shapely
+
+from healthgis.lod import build_pyramid, simplify, tolerance
+from healthgis.tiles import to_mercator
+
+
+def test_simplify_keeps_a_valid_coverage(districts):
+    geometry = np.asarray(to_mercator(districts).geometry.values)
+    for zoom in (8, 12):
+        simplified = simplify(geometry, zoom)
+        assert shapely.coverage_is_valid(simplified)
+        assert (shapely.get_num_coordinates(simplified).sum()
+                < shapely.get_num_coordinates(geometry).sum())
+        # Within a pixel of the original borders.
+        distance = shapely.hausdorff_distance(
+            simplified, shapely.coverage_clean(geometry))
+        assert (distance <= 2 * tolerance(zoom)).all()
+
+
+def test_levels(districts, tmp_path):
+    pyramid = build_pyramid(districts, min_zoom=8, max_zoom=12,
+                            path=tmp_path / "districts.gpkg")
+    assert pyramid.level(5) is pyramid.level(8)
+    assert pyramid.level(13).geom_equals(districts.to_crs("EPSG:4326")).all()
+    level = pyramid.level(10.2)
+    assert level.index.equals(districts.index)
+    assert level.crs == "EPSG:4326"
+    assert list(level.columns) == list(districts.columns)
+    features = pyramid.geojson(10, columns=["district_name"])["features"]
+    assert set(features[0]["properties"]) == {"district_name"}
+
+
+def test_attributes_follow_the_data(districts):
+    data = districts.copy()
+    build_pyramid(data, min_zoom=10, max_zoom=10).level(10)
+    data["population"] = data["population"] * 2
+    data["density"] = data["population"] / data.area
+    level = build_pyramid(data, min_zoom=10, max_zoom=10).level(10)
+    assert (level["population"] == data["population"]).all()
+    assert (level["density"] == data["density"]).all()
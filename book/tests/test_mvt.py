@@ -0,0 +1,178 @@
+import json
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+import shapely.geometry
+
+from healthgis.mvt import EXTENT, encode_tile, tile_geometry
+from healthgis.tiles import tile_bounds
+from healthgis.tileserver import TileServer, VectorLayer
+
+mapbox_vector_tile = pytest.importorskip("mapbox_vector_tile")
+
+TILE = (13, 4149, 2818)
+
+
+def decode(data):
+    return mapbox_vector_tile.decode(data, default_options={"y_coord_down": True})
+
+
+def _geometries(layer):
+    return [shapely.geometry.shape(f["geometry"]) for f in layer["features"]]
+
+
+def test_encode_geometry_types():
+    polygon = shapely.Polygon([(0, 0), (100, 0), (100, 100), (0, 100)],
+                              [[(20, 20), (20, 40), (40, 40), (40, 20)]])
+    layers = {
+        "polygons": [polygon, shapely.MultiPolygon([
+            shapely.box(200, 200, 300, 300, ccw=False),
+            shapely.box(400, 400, 500, 500, ccw=False)])],
+        "lines": [shapely.LineString([(0, 0), (10, 5), (-3, 7)]),
+                  shapely.MultiLineString([[(1, 1), (2, 2)], [(5, 5), (9, 1)]])],
+        "points": [shapely.Point(5, 6), shapely.MultiPoint([(1, 2), (3, 4)])],
+    }
+    tile = decode(encode_tile({name: (geometry, None)
+                               for name, geometry in layers.items()}))
+    assert list(tile) == list(layers)
+    for name, geometry in layers.items():
+        assert tile[name]["extent"] == EXTENT
+        assert tile[name]["version"] == 2
+        decoded = _geometries(tile[name])
+        assert shapely.equals(decoded, geometry).all()
+        assert [f["id"] for f in tile[name]["features"]] == [0, 1]
+
+
+def test_encode_properties():
+    geometry = [shapely.Point(i, i) for i in range(5)]
+    properties = pd.DataFrame({
+        "name": ["a", "b", None, "a", "é"],
+        "count": [0, 1, 2**40, -5, 3],
+        "value": [0.5, np.nan, -1.25, 2.0, 1e300],
+        "flag": [True, False, True, True, False],
+    })
+    layer = decode(encode_tile({"points": (geometry, properties,
+                                           [10, 11, 12, 13, 14])}))["points"]
+    features = layer["features"]
+    assert [f["id"] for f in features] == [10, 11, 12, 13, 14]
+    for feature, (_, row) in zip(features, properties.iterrows()):
+        expected = {k: v for k, v in row.items() if not pd.isna(v)}
+        assert feature["properties"] == expected
+
+
+def test_encode_skips_empty():
+    geometry = [shapely.Point(1, 1), shapely.Point(), None, shapely.Point(2, 2)]
+    layer = decode(encode_tile({"points": (geometry, None)}))["points"]
+    assert [f["id"] for f in layer["features"]] == [0, 3]
+    empty = decode(encode_tile({"none": ([None], None)}))
+    assert empty["none"]["features"] == []
+
+
+def test_tile_geometry_round_trip(districts):
+    mercator = districts.to_crs("EPSG:3857")
+    bounds = tile_bounds(*TILE)
+    geometry = tile_geometry(mercator.geometry.values, bounds)
+    keep = ~shapely.is_empty(geometry)
+    assert 0 < keep.sum() < len(districts)
+    layer = decode(encode_tile({"districts": (
+        geometry, districts[["district_name", "population"]])}))["districts"]
+    features = layer["features"]
+    assert [f["id"] for f in features] == list(np.flatnonzero(keep))
+    assert [f["properties"]["district_name"] for f in features] == list(
+        districts["district_name"][keep])
+    decoded = _geometries(layer)
+    assert shapely.equals(decoded, geometry[keep]).all()
+    # Exterior rings have a positive area in grid coordinates.
+    exteriors = shapely.get_exterior_ring(shapely.get_parts(decoded))
+    assert shapely.is_ccw(exteriors).all()
+
+    # Back in web mercator, the decoded tile matches the clipped input
+    # up to the grid resolution.
+    minx, miny, maxx, maxy = bounds
+    scale = (maxx - minx) / EXTENT
+    box = shapely.box(*bounds)
+    for feature, original in zip(decoded, mercator.geometry.values[keep]):
+        feature = shapely.transform(
+            feature, lambda xy: xy * [scale, -scale] + [minx, maxy])
+        expected = shapely.intersection(original, box)
+        difference = shapely.symmetric_difference(
+            shapely.intersection(feature, box), expected)
+        assert difference.area < 1e-3 * box.area
+
+
+def test_vector_layer_tile(districts, trees):
+    layer = VectorLayer(districts, "districts", columns=["district_name"])
+    tile = decode(layer.tile(*TILE))["districts"]
+    assert tile["features"]
+    for feature in tile["features"]:
+        assert feature["properties"] == {
+            "district_name": districts["district_name"].iloc[feature["id"]]}
+
+    points = VectorLayer(trees, "trees", columns=["species"])
+    assert points.pyramid is None
+    tile = decode(points.tile(15, 16598, 11273))["trees"]
+    ids = [f["id"] for f in tile["features"]]
+    box = shapely.box(*tile_bounds(15, 16598, 11273))
+    inside = np.flatnonzero(points.data.intersects(box))
+    assert set(inside) <= set(ids)
+
+
+@pytest.fixture
+def server(districts):
+    server = TileServer({"districts": districts}, port=0).start()
+    yield server
+    server.stop()
+
+
+def _get(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.status, response.headers["Content-Type"], response.read()
+
+
+def test_tileserver(server):
+    base = "http://{}:{}".format(server.host, server.port)
+    status, _, body = _get(base + "/")
+    assert json.loads(body) == {"districts": base + "/districts.json"}
+
+    status, _, body = _get(base + "/districts.json")
+    tilejson = json.loads(body)
+    assert tilejson["tiles"] == [server.url("districts")]
+    assert tilejson["vector_layers"][0]["id"] == "districts"
+
+    status, content_type, body = _get(
+        server.url("districts").format(z=TILE[0], x=TILE[1], y=TILE[2]))
+    assert status == 200
+    assert content_type == "application/vnd.mapbox-vector-tile"
+    assert body == server.layer("districts").tile(*TILE)
+    assert decode(body)["districts"]["features"]
+    assert server.tile("districts", *TILE) == body
+    assert (server.hits, server.misses) == (1, 1)
+
+    for path in ["/unknown/0/0/0.pbf", "/districts/1/5/0.pbf", "/missing"]:
+        with pytest.raises(urllib.error.HTTPError) as error:
+            _get(base + path)
+        assert error.value.code == 404
+
+
+def test_vector_layer_mixed_dimensions(districts, stations):
+    mixed = pd.concat([districts[["geometry"]], stations[["geometry"]]])
+    with pytest.raises(ValueError, match="split it into one layer per kind"):
+        VectorLayer(mixed, "mixed")
+    lines = districts.assign(geometry=districts.boundary)
+    assert VectorLayer(lines, "borders").tile(*TILE)
+
+
+def test_tileserver_error_message(districts, stations):
+    mixed = pd.concat([districts[["geometry"]], stations[["geometry"]]])
+    server = TileServer({"mixed": mixed}, port=0).start()
+    try:
+        with pytest.raises(urllib.error.HTTPError) as error:
+            _get(server.url("mixed").format(z=TILE[0], x=TILE[1], y=TILE[2]))
+        assert error.value.code == 500
+        assert b"split it into one layer per kind" in error.value.read()
+    finally:
+        server.stop()
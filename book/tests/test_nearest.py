@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from healthgis.nearest import nearest
+
+
+def test_nearest_matches_sjoin_nearest(districts, stations):
+    points = stations.copy()
+    points.geometry = points.geometry.translate(300, 300)
+    result = nearest(points, districts, columns=["district_name"])
+    expected = points.sjoin_nearest(districts, distance_col="distance")
+    expected = expected[~expected.index.duplicated()]
+    # Points on a border can be equally close to two districts.
+    np.testing.assert_allclose(result["distance"], expected["distance"])
+    same = result["index_right"] == expected["index_right"]
+    assert same.mean() > 0.99
+    assert result.index.equals(points.index)
+
+
+def test_nearest_max_distance(districts, stations):
+    points = stations.copy()
+    points.geometry = points.geometry.translate(20000, 0)
+    result = nearest(points, districts, max_distance=10000)
+    far = result["distance"].isna()
+    assert far.any() and (~far).any()
+    assert (result.loc[~far, "distance"] <= 10000).all()
+    assert result.loc[far, "index_right"].isna().all()
+
+
+def test_nearest_crs_mismatch(districts, stations):
+    with pytest.raises(ValueError, match="CRS mismatch"):
+        nearest(stations.to_crs("EPSG:4326"), districts)
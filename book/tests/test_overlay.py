@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import geopandas
+import pytest
+
+from healthgis.overlay import overlay_intersection
+from healthgis.paths import DATA_DIR
+
+
+@pytest.fixture(scope="module")
+def land_use():
+    return geopandas.read_file(DATA_DIR / "paris_land_use.zip")
+
+
+@pytest.mark.filterwarnings("ignore:`keep_geom_type=True`:UserWarning")
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_overlay_matches_geopandas(land_use, districts, max_workers):
+    districts = districts.to_crs(land_use.crs)
+    expected = geopandas.overlay(land_use, districts, how="intersection")
+    result = overlay_intersection(land_use, districts, max_workers=max_workers)
+    pd.testing.assert_frame_equal(pd.DataFrame(result.drop(columns="geometry")),
+                                  pd.DataFrame(expected.drop(columns="geometry")))
+    assert result.crs == expected.crs
+    np.testing.assert_allclose(result.area, expected.area, rtol=1e-9, atol=1e-6)
+    difference = result.geometry.symmetric_difference(expected.geometry)
+    assert difference.area.max() < 1e-6
+
+
+def test_overlay_suffixes(districts):
+    left = districts.iloc[:10]
+    right = districts.iloc[5:20].assign(geometry=lambda df: df.buffer(50))
+    expected = geopandas.overlay(left, right, how="intersection")
+    result = overlay_intersection(left, right)
+    assert list(result.columns) == list(expected.columns)
+    assert "district_name_1" in result.columns
+    np.testing.assert_allclose(result.area, expected.area)
+
+
+def test_overlay_crs_mismatch(districts):
+    with pytest.raises(ValueError, match="CRS mismatch"):
+        overlay_intersection(districts, districts.to_crs("EPSG:4326"))
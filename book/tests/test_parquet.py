@@ -0,0 +1,72 @@
+import geopandas
+import pandas as pd
+import shapely
+from geopandas.testing import assert_geodataframe_equal
+
+from healthgis.parquet import cache_path, convert, read
+from healthgis.paths import DATA_DIR
+
+
+def test_read_round_trip(tmp_path, districts):
+    result = read("paris_districts_utm.geojson", cache_dir=tmp_path)
+    assert cache_path("paris_districts_utm.geojson", tmp_path).exists()
+    assert result.crs == districts.crs
+    assert_geodataframe_equal(result, districts)
+
+
+def test_read_zipped_shapefile(tmp_path):
+    expected = geopandas.read_file(DATA_DIR / "ne_110m_admin_0_countries.zip")
+    result = read("ne_110m_admin_0_countries.zip", cache_dir=tmp_path)
+    assert_geodataframe_equal(result, expected)
+
+
+def test_read_columns(tmp_path, districts):
+    result = read("paris_districts_utm.geojson", columns=["district_name"],
+                  cache_dir=tmp_path)
+    assert not isinstance(result, geopandas.GeoDataFrame)
+    pd.testing.assert_frame_equal(result, pd.DataFrame(districts[["district_name"]]))
+
+    result = read("paris_districts_utm.geojson",
+                  columns=["geometry", "population"], cache_dir=tmp_path)
+    assert_geodataframe_equal(
+        result, districts[["geometry", "population"]]
+    )
+
+
+def test_read_bbox(tmp_path, trees):
+    bbox = (450000, 5410000, 452000, 5412000)
+    result = read("paris_trees.gpkg", bbox=bbox, cache_dir=tmp_path)
+    expected = trees[trees.intersects(shapely.box(*bbox))]
+    assert len(result) > 0
+    assert result.index.equals(expected.index)
+
+
+def test_convert_is_skipped_when_up_to_date(tmp_path):
+    target = convert("paris_districts_utm.geojson", cache_dir=tmp_path)
+    mtime = target.stat().st_mtime_ns
+    assert convert("paris_districts_utm.geojson", cache_dir=tmp_path) == target
+    assert target.stat().st_mtime_ns == mtime
+    convert("paris_districts_utm.geojson", cache_dir=tmp_path, overwrite=True)
+    assert target.stat().st_mtime_ns >= mtime
+
+
+def test_same_stem_datasets(tmp_path, districts, trees):
+    (tmp_path / "sub").mkdir()
+    districts.to_file(tmp_path / "layer.geojson")
+    trees.to_file(tmp_path / "sub" / "layer.gpkg")
+    cache_dir = tmp_path / "cache"
+    first = read(tmp_path / "layer.geojson", cache_dir=cache_dir)
+    second = read(tmp_path / "sub" / "layer.gpkg", cache_dir=cache_dir)
+    assert len(first) == len(districts)
+    assert len(second) == len(trees)
+    assert (cache_path(tmp_path / "layer.geojson", cache_dir)
+            != cache_path(tmp_path / "sub" / "layer.gpkg", cache_dir))
+
+
+def test_convert_checks_the_source(tmp_path, districts):
+    districts.to_file(tmp_path / "layer.geojson")
+    target = convert(tmp_path / "layer.geojson", cache_dir=tmp_path)
+    # A file left at that location by another dataset is not reused.
+    districts.iloc[:3].to_parquet(target)
+    assert len(read(tmp_path / "layer.geojson", cache_dir=tmp_path)) == len(districts)
+    assert read(tmp_path / "layer.geojson", cache_dir=tmp_path).attrs == {}
@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+from healthgis.partition import count_within, parallel_count_within, partition
+
+
+@pytest.mark.parametrize("method", ["hilbert", "grid"])
+def test_partition_keeps_every_row_once(trees, method):
+    parts = partition(trees, 9, method=method)
+    assert 1 < len(parts) <= 9
+    index = pd.concat([part.index.to_series() for part in parts])
+    assert index.sort_values().tolist() == trees.index.tolist()
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_parallel_count_within_matches_sjoin(trees, districts, max_workers):
+    expected = count_within(trees, districts, "district_name")
+    result = parallel_count_within(trees, districts, "district_name",
+                                   max_workers=max_workers, npartitions=7)
+    pd.testing.assert_series_equal(result, expected.sort_index(),
+                                   check_names=False)
+
+
+def test_partition_arguments(trees):
+    with pytest.raises(ValueError):
+        partition(trees, 0)
+    with pytest.raises(ValueError, match="method"):
+        partition(trees, 2, method="quadtree")
@@ -0,0 +1,16 @@
+from healthgis.paths import DATA_DIR, resolve
+
+
+def test_resolve_from_any_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    file, source = resolve("paris_districts_utm.geojson")
+    assert file == DATA_DIR / "paris_districts_utm.geojson"
+    assert source == str(file)
+
+
+def test_resolve_archives():
+    file, source = resolve("zip://ne_110m_admin_0_countries.zip")
+    assert file == DATA_DIR / "ne_110m_admin_0_countries.zip"
+    assert source.startswith("zip://" + str(file))
+    file, source = resolve("cod_conservation.zip!Conservation/RDC_aire_protegee_2013.shp")
+    assert source == "zip://{}!Conservation/RDC_aire_protegee_2013.shp".format(file)
@@ -0,0 +1,51 @@
+import numpy as np
+import geopandas
+import pytest
+import shapely
+
+from healthgis.paths import DATA_DIR
+from healthgis.predicates import INVERSE, evaluate
+
+
+@pytest.fixture(scope="module")
+def rivers():
+    return geopandas.read_file(DATA_DIR / "ne_50m_rivers_lake_centerlines.zip")
+
+
+@pytest.fixture(scope="module")
+def countries():
+    return geopandas.read_file(DATA_DIR / "ne_110m_admin_0_countries.zip")
+
+
+@pytest.mark.parametrize("predicate", sorted(INVERSE))
+def test_evaluate_matches_geopandas(countries, rivers, predicate):
+    france = countries.loc[countries["name"] == "France", "geometry"].item()
+    for layer in [countries, rivers]:
+        expected = getattr(layer, predicate)(france).values
+        np.testing.assert_array_equal(evaluate(layer, predicate, france), expected)
+
+
+@pytest.mark.parametrize("predicate", ["within", "contains", "covers", "touches"])
+def test_evaluate_districts(stations, districts, predicate):
+    for geometry in districts.geometry.iloc[[0, 52]]:
+        expected = getattr(stations, predicate)(geometry).values
+        result = evaluate(stations, predicate, geometry)
+        np.testing.assert_array_equal(result, expected)
+    assert evaluate(stations, "within", districts.geometry.iloc[52]).any()
+
+
+def test_evaluate_unknown_predicate(districts):
+    with pytest.raises(ValueError, match="predicate"):
+        evaluate(districts, "dwithin", districts.geometry.iloc[0])
+
+
+def test_evaluate_missing_geometries(districts):
+    layer = districts.geometry.copy()
+    layer.iloc[[3, 52]] = None
+    layer.iloc[10] = shapely.Polygon()
+    geometry = districts.geometry.iloc[52]
+    for predicate in sorted(INVERSE):
+        expected = getattr(layer, predicate)(geometry).values
+        np.testing.assert_array_equal(evaluate(layer, predicate, geometry), expected)
+    assert not evaluate(layer, "disjoint", geometry)[[3, 52]].any()
+    assert shapely.is_prepared(geometry)
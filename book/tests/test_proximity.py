@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import geopandas
+import pytest
+import shapely
+
+from healthgis.proximity import sjoin_dwithin
+
+
+def _expected(left, right, distance, how="inner"):
+    expected = geopandas.sjoin(left, right, how=how, predicate="dwithin",
+                               distance=distance)
+    return expected.reset_index().sort_values(
+        ["index", "index_right"], kind="stable"
+    ).set_index("index").rename_axis(None)
+
+
+@pytest.mark.parametrize("how", ["inner", "left"])
+def test_sjoin_dwithin_matches_sjoin(trees, stations, how):
+    expected = _expected(trees, stations, 100, how=how)
+    result = sjoin_dwithin(trees, stations, 100, how=how)
+    assert list(result.columns) == list(expected.columns)
+    assert len(result) > len(trees) // 4
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(result.drop(columns="geometry")),
+        pd.DataFrame(expected.drop(columns="geometry")),
+        check_dtype=False,
+    )
+
+
+def test_sjoin_dwithin_matches_buffer(trees, stations):
+    buffered = stations.assign(geometry=stations.buffer(100, quad_segs=64))
+    result = sjoin_dwithin(trees, stations, 100)
+    expected = geopandas.sjoin(trees, buffered, predicate="intersects")
+    # The buffer polygons are inscribed in the circles: every pair they
+    # find is in range, and the rest lies within a sliver of the radius.
+    pairs = set(zip(result.index, result["index_right"]))
+    assert set(zip(expected.index, expected["index_right"])) <= pairs
+    assert len(pairs) - len(expected) < 0.01 * len(expected)
+
+
+def test_sjoin_dwithin_distance_per_row(trees, stations):
+    radius = np.where(stations["bike_stands"] > 30, 150.0, 50.0)
+    result = sjoin_dwithin(trees, stations.assign(radius=radius), "radius",
+                           distance_col="distance")
+    assert (result["distance"] <= result["radius"]).all()
+    distance = shapely.distance(
+        np.asarray(trees.geometry.values)[:, None],
+        np.asarray(stations.geometry.values)[None, :],
+    )
+    expected = np.argwhere(distance <= radius[None, :])
+    pairs = sorted(zip(trees.index.get_indexer(result.index),
+                       stations.index.get_indexer(result["index_right"])))
+    assert pairs == sorted(map(tuple, expected.tolist()))
+
+
+def test_sjoin_dwithin_left_distance_col(trees, stations):
+    result = sjoin_dwithin(trees, stations, 20, how="left",
+                           distance_col="distance")
+    unmatched = result["index_right"].isna()
+    assert unmatched.any() and not unmatched.all()
+    assert result.loc[unmatched, "distance"].isna().all()
+    assert (result.loc[~unmatched, "distance"] <= 20).all()
+
+
+def test_sjoin_dwithin_arguments(trees, stations):
+    with pytest.raises(ValueError, match="how"):
+        sjoin_dwithin(trees, stations, 100, how="right")
+    with pytest.raises(ValueError, match="CRS mismatch"):
+        sjoin_dwithin(trees, stations.to_crs("EPSG:4326"), 100)
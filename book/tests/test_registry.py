@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import geopandas
+import pytest
+import shapely
+from geopandas.testing import assert_geodataframe_equal
+
+from healthgis.registry import LayerRegistry, PackedRTree
+
+
+def _pairs(result):
+    return set(zip(*result.tolist()))
+
+
+@pytest.mark.parametrize("node_size", [2, 16])
+def test_query_bounds_matches_strtree(trees, districts, node_size):
+    tree = PackedRTree.build(districts.geometry, node_size=node_size)
+    assert len(tree) == len(districts)
+    bounds = trees.geometry.buffer(200).bounds.values
+    expected = shapely.STRtree(districts.geometry.values).query(
+        shapely.box(*bounds.T)
+    )
+    assert _pairs(tree.query_bounds(bounds)) == _pairs(expected)
+
+
+def test_query_bounds_empty(districts):
+    tree = PackedRTree.build(districts.geometry)
+    assert tree.query_bounds(np.empty((0, 4))).shape == (2, 0)
+    assert tree.query_bounds([0, 0, 1, 1]).shape == (2, 0)
+    empty = PackedRTree.build(districts.geometry.iloc[:0])
+    assert empty.query_bounds([0, 0, 1, 1]).shape == (2, 0)
+
+
+def test_save_load(tmp_path, districts):
+    tree = PackedRTree.build(districts.geometry)
+    tree.save(tmp_path)
+    loaded = PackedRTree.load(tmp_path)
+    bounds = districts.geometry.bounds.values
+    np.testing.assert_array_equal(loaded.query_bounds(bounds),
+                                  tree.query_bounds(bounds))
+
+
+def test_lookup_matches_sjoin(stations, districts):
+    layer = LayerRegistry(cache_dir=None).get("paris_districts_utm.geojson")
+    result = layer.lookup(stations, "district_name")
+    assert result.index.equals(stations.index)
+
+    joined = geopandas.sjoin(stations, districts, predicate="intersects")
+    expected = joined.groupby(level=0)["district_name"].first()
+    expected = expected.reindex(stations.index)
+    pd.testing.assert_series_equal(result, expected, check_names=False)
+
+
+def test_query_matches_sjoin(stations, districts):
+    layer = LayerRegistry(cache_dir=None).get("paris_districts_utm.geojson")
+    result = layer.query(stations.geometry, predicate="contains")
+    expected = districts.sindex.query(stations.geometry, predicate="within")
+    assert _pairs(result) == _pairs(expected)
+
+
+def test_registry_cache(tmp_path, districts):
+    registry = LayerRegistry(cache_dir=tmp_path)
+    layer = registry.get("paris_districts_utm.geojson", crs="EPSG:4326")
+    assert registry.get("paris_districts_utm.geojson", crs=4326) is layer
+    entry, = tmp_path.glob("*.layer")
+    # Nothing in the cache is unpickled on load.
+    assert sorted(p.suffix for p in entry.iterdir()) == [".npy"] * 3 + [".parquet"]
+    assert_geodataframe_equal(layer.frame, districts.to_crs("EPSG:4326"),
+                              check_less_precise=True)
+
+    registry.clear()
+    reloaded = registry.get("paris_districts_utm.geojson", crs="EPSG:4326")
+    assert reloaded is not layer
+    assert_geodataframe_equal(reloaded.frame, layer.frame)
+
+    registry.clear(disk=True)
+    assert not list(tmp_path.glob("*.layer"))
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+import pandas as pd
+import geopandas
+import shapely
+from PIL import Image
+
+from healthgis.render import _Layer, classify, render_maps
+
+
+def test_render_maps(districts, tmp_path):
+    specs = [
+        {"name": "all", "column": "population", "scheme": "quantiles"},
+        {"name": "one", "filter": "district_name == 'Sorbonne'",
+         "column": "population", "scheme": "quantiles"},
+        {"name": "none", "filter": "district_name == 'Atlantis'"},
+    ]
+    result = render_maps(districts, specs, tmp_path, formats=("png", "svg"),
+                         figsize=(4, 4))
+    assert result.loc["all", "features"] == len(districts)
+    assert result.loc["one", "features"] == 1
+    assert result.loc[["all", "one"], "error"].isna().all()
+    assert "selects no features" in result.loc["none", "error"]
+    image = np.asarray(Image.open(result.loc["one", "png"]))
+    assert image.shape[:2] == (400, 400)
+    assert (tmp_path / "one.svg").exists()
+
+
+@pytest.mark.filterwarnings("ignore:Not enough unique values")
+def test_classify_drops_tied_edges():
+    classes = classify(pd.Series([0.0, 0.0, 10.0]), scheme="quantiles")
+    assert (np.diff(classes["bins"]) > 0).all()
+    assert "0 - 0" not in classes["legend"]
+    assert len(classes["legend"]) == len(classes["bins"]) - 1
+    constant = classify(pd.Series([5.0, 5.0]), scheme="quantiles")
+    assert constant["legend"] == ["5"]
+
+
+def test_empty_points_keep_rows_aligned(tmp_path):
+    points = geopandas.GeoDataFrame(
+        {"name": ["a", "b", "c"], "value": [1.0, 2.0, 3.0]},
+        geometry=[shapely.Point(0, 0), shapely.Point(), shapely.Point(10, 5)],
+        crs="EPSG:2154",
+    )
+    layer = _Layer(points)
+    np.testing.assert_array_equal(layer.xy[[0, 2]], [[0, 0], [10, 5]])
+    assert np.isnan(layer.xy[1]).all()
+    specs = [{"name": name, "filter": "name == {!r}".format(name),
+              "column": "value"} for name in "abc"]
+    result = render_maps(points, specs, tmp_path)
+    assert result.loc[["a", "c"], "error"].isna().all()
+    assert "empty" in result.loc["b", "error"]
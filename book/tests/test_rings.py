@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import geopandas
+import pytest
+import shapely
+
+from healthgis.hashing import layer_hash
+from healthgis.rings import clear_cache, count_in_rings, ring_buffers
+
+
+@pytest.mark.parametrize("inner", [0, 100])
+def test_ring_buffers(districts, inner):
+    clear_cache()
+    rings = ring_buffers(districts.geometry, 500, inner=inner)
+    assert rings.index.equals(districts.index)
+    assert rings.crs == districts.crs
+    inner_zone = districts.buffer(inner) if inner else districts.geometry
+    expected = districts.buffer(500).difference(inner_zone)
+    assert rings.geom_equals_exact(expected, 1e-6).all()
+
+
+def test_ring_buffers_cache(districts):
+    clear_cache()
+    first = ring_buffers(districts.geometry, 500)
+    first.iloc[0] = None
+    shifted = districts.geometry.set_axis(districts.index + 100)
+    second = ring_buffers(shifted, 500)
+    # Memoized per geometries, but aligned with the new index and not
+    # affected by changes to an earlier result.
+    assert second.index.equals(shifted.index)
+    assert second.notna().all()
+    assert ring_buffers(shifted, 500).geom_equals(second).all()
+    assert not ring_buffers(shifted, 600).geom_equals(second).any()
+
+
+def test_ring_buffers_arguments(districts):
+    with pytest.raises(ValueError):
+        ring_buffers(districts.geometry, 100, inner=100)
+
+
+@pytest.mark.parametrize("inner", [0, 50])
+def test_count_in_rings(stations, districts, inner):
+    result = count_in_rings(stations, districts, 200, inner=inner,
+                            by="district_name")
+    assert result.index.equals(pd.Index(districts["district_name"]))
+    distance = shapely.distance(
+        np.asarray(districts.geometry.values)[:, None],
+        np.asarray(stations.geometry.values)[None, :],
+    )
+    expected = (distance <= 200).sum(axis=1) - (distance <= inner).sum(axis=1)
+    np.testing.assert_array_equal(result.values, expected)
+    assert (result > 0).any()
+
+
+def test_count_in_rings_crs_mismatch(stations, districts):
+    with pytest.raises(ValueError, match="CRS mismatch"):
+        count_in_rings(stations.to_crs("EPSG:4326"), districts, 200)
+
+
+def test_layer_hash(districts):
+    assert layer_hash(districts) == layer_hash(districts.set_axis(districts.index + 1))
+    assert layer_hash(districts) != layer_hash(districts.iloc[::-1])
+    assert layer_hash(districts) != layer_hash(districts.to_crs("EPSG:4326"))
+    assert (layer_hash(districts, columns=["population"])
+            != layer_hash(districts.assign(population=0), columns=["population"]))
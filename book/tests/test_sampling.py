@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import shapely
+
+from healthgis.sampling import clear_cache, sample_points, triangulate
+
+
+def _inside(polygons, x, y, parent):
+    points = shapely.points(x, y)
+    distance = shapely.distance(np.asarray(polygons.geometry.values)[parent], points)
+    return distance < 1e-6
+
+
+def test_triangulate(districts):
+    clear_cache()
+    triangles, owner, area = triangulate(districts)
+    assert triangles.shape == (len(owner), 3, 2)
+    polygon_area = np.bincount(owner, weights=area, minlength=len(districts))
+    np.testing.assert_allclose(polygon_area, districts.area, rtol=1e-9)
+    assert triangulate(districts.geometry)[0] is triangles
+
+
+def test_sample_points_counts(districts):
+    counts = np.arange(len(districts)) % 5
+    x, y, parent = sample_points(districts, counts=counts, seed=0)
+    np.testing.assert_array_equal(np.bincount(parent, minlength=len(districts)),
+                                  counts)
+    assert _inside(districts, x, y, parent).all()
+
+
+def test_sample_points_weights(districts):
+    weights = np.zeros(len(districts))
+    weights[[3, 7]] = [1, 3]
+    x, y, parent = sample_points(districts, 20_000, weights=weights, seed=1)
+    assert len(x) == len(y) == 20_000
+    assert set(parent) == {3, 7}
+    assert abs((parent == 7).mean() - 0.75) < 0.02
+    assert _inside(districts, x, y, parent).all()
+
+
+def test_sample_points_uniform(districts):
+    x, y, parent = sample_points(districts, 200_000, seed=2)
+    expected = districts.area / districts.area.sum()
+    share = np.bincount(parent, minlength=len(districts)) / len(parent)
+    np.testing.assert_allclose(share, expected, atol=0.002)
+    # Uniform within a polygon too: half of the points of a district lie
+    # left of the vertical line splitting its area in two.
+    district = np.argmax(share)
+    points = parent == district
+    xmin, ymin, xmax, ymax = districts.geometry.iloc[district].bounds
+    geometry = districts.geometry.iloc[district]
+    lo, hi = xmin, xmax
+    for _ in range(50):
+        mid = (lo + hi) / 2
+        left = geometry.intersection(shapely.box(xmin, ymin, mid, ymax)).area
+        lo, hi = (mid, hi) if left < geometry.area / 2 else (lo, mid)
+    assert abs((x[points] < lo).mean() - 0.5) < 0.02
+
+
+def test_sample_points_seed(districts):
+    first = sample_points(districts, 1000, weights="population", seed=42)
+    second = sample_points(districts, 1000, weights="population",
+                           seed=np.random.default_rng(42))
+    for a, b in zip(first, second):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_sample_points_arguments(districts):
+    with pytest.raises(ValueError, match="either"):
+        sample_points(districts)
+    with pytest.raises(ValueError, match="either"):
+        sample_points(districts, 10, counts=np.ones(len(districts)))
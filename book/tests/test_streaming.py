@@ -0,0 +1,42 @@
+import pandas as pd
+import shapely
+from geopandas.testing import assert_geodataframe_equal
+
+from healthgis import partition
+from healthgis.streaming import count_within, read_chunks
+
+
+def test_read_chunks_round_trip(trees):
+    chunks = list(read_chunks("paris_trees.gpkg", chunksize=1000))
+    assert len(chunks) == 8
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    result = pd.concat(chunks)
+    assert result.crs == trees.crs
+    assert_geodataframe_equal(result, trees, check_like=True)
+
+
+def test_read_chunks_columns_and_bbox(trees):
+    bbox = (450000, 5410000, 452000, 5412000)
+    result = pd.concat(read_chunks("paris_trees.gpkg", columns=["species"],
+                                   bbox=bbox, chunksize=100))
+    assert list(result.columns) == ["species", "geometry"]
+    expected = trees[trees.intersects(shapely.box(*bbox))]
+    assert sorted(result["species"].dropna()) == sorted(expected["species"].dropna())
+    assert len(result) == len(expected)
+
+
+def test_count_within_matches_sjoin(trees, districts):
+    expected = partition.count_within(trees, districts, "district_name")
+    result = count_within("paris_trees.gpkg", districts, "district_name",
+                          chunksize=1000)
+    pd.testing.assert_series_equal(result, expected.sort_index(),
+                                   check_names=False)
+
+
+def test_count_within_reprojects_chunks(trees, districts):
+    expected = partition.count_within(trees, districts, "district_name")
+    chunks = (trees.iloc[i:i + 2000].to_crs("EPSG:4326")
+              for i in range(0, len(trees), 2000))
+    result = count_within(chunks, districts, "district_name")
+    pd.testing.assert_series_equal(result, expected.sort_index(),
+                                   check_names=False)
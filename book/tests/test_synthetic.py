@@ -0,0 +1,42 @@
+import json
+
+import numpy as np
+import pandas as pd
+import geopandas
+import pyarrow.parquet as pq
+import shapely
+
+from healthgis.synthetic import _write_parquet, generate, polygons_like
+
+
+def test_polygons_like_covers_the_template(districts):
+    cells = polygons_like(districts, 400, seed=0)
+    assert len(cells) >= 400
+    area = cells.area.groupby(cells["parent"]).sum()
+    np.testing.assert_allclose(area.sort_index(),
+                               districts.area.sort_index(), rtol=1e-6)
+
+
+def test_generate_is_reproducible(trees, tmp_path):
+    first = generate(trees, 2500, tmp_path / "a.parquet", chunksize=1000, seed=3)
+    second = generate(trees, 2500, tmp_path / "b.parquet", chunksize=1000, seed=3)
+    a, b = geopandas.read_parquet(first), geopandas.read_parquet(second)
+    assert len(a) == 2500 and a.crs == trees.crs
+    assert set(a["species"].dropna()) <= set(trees["species"].dropna())
+    assert a.geom_equals(b).all()
+
+
+def test_parquet_metadata_of_mixed_chunks(districts, tmp_path):
+    # The first chunk only has Polygons, the second has MultiPolygons.
+    first = districts.iloc[:40]
+    second = districts.iloc[40:].copy()
+    second.geometry = shapely.multipolygons(
+        [[polygon] for polygon in second.geometry])
+    path = tmp_path / "mixed.parquet"
+    _write_parquet([first, second], path)
+    result = geopandas.read_parquet(path)
+    assert result.geom_equals(pd.concat([first, second]).geometry.reset_index(
+        drop=True)).all()
+    geo = json.loads(pq.read_schema(path).metadata[b"geo"])
+    types = geo["columns"]["geometry"]["geometry_types"]
+    assert types == [] or set(result.geom_type) <= set(types)
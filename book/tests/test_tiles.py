@@ -0,0 +1,115 @@
+import numpy as np
+import geopandas
+import pytest
+import shapely
+
+from healthgis.tiles import (MERCATOR, TileLayer, tile_bounds,
+                             tiles_for_bounds, zoom_for_bounds)
+
+
+def _pixel_centers(bounds, n):
+    minx, miny, maxx, maxy = bounds
+    resolution = (maxx - minx) / n
+    col, row = np.meshgrid(np.arange(n), np.arange(n))
+    x = minx + (col.ravel() + 0.5) * resolution
+    y = maxy - (row.ravel() + 0.5) * resolution
+    return shapely.points(x, y)
+
+
+def test_tile_grid():
+    assert tile_bounds(0, 0, 0) == pytest.approx(
+        (-20037508.342789244, -20037508.342789244,
+         20037508.342789244, 20037508.342789244))
+    bounds = tile_bounds(12, 2074, 1409)
+    inner = (bounds[0] + 1, bounds[1] + 1, bounds[2] - 1, bounds[3] - 1)
+    assert tiles_for_bounds(inner, 12) == [(2074, 1409)]
+    wider = (bounds[0] + 1, bounds[1] + 1, bounds[2] + 1, bounds[3] - 1)
+    assert tiles_for_bounds(wider, 12) == [(2074, 1409), (2075, 1409)]
+    assert zoom_for_bounds(bounds, width=256) == 12
+    assert zoom_for_bounds(bounds, width=1024) == 14
+
+
+@pytest.mark.parametrize("tile", [(12, 2074, 1409), (14, 8299, 5636)])
+def test_render_polygons_matches_point_in_polygon(districts, tmp_path, tile):
+    layer = TileLayer(districts, column="population", cache_dir=tmp_path)
+    image = layer.render(*tile).reshape(-1, 4)
+
+    mercator = districts.to_crs(MERCATOR)
+    centers = _pixel_centers(tile_bounds(*tile), layer.tile_size)
+    pixel, feature = mercator.sindex.query(centers, predicate="within")
+    expected = np.zeros_like(image)
+    expected[pixel] = layer.colors[feature]
+    assert len(pixel) > 0
+    # Pixel centers lying exactly on a shared border may go either way.
+    assert (image != expected).any(axis=1).mean() < 1e-3
+
+
+def test_render_polygons_categories_and_holes(tmp_path):
+    bounds = tile_bounds(12, 2074, 1409)
+    minx, miny, maxx, maxy = bounds
+    width = maxx - minx
+    outer = shapely.box(minx + 0.1 * width, miny + 0.1 * width,
+                        minx + 0.9 * width, miny + 0.9 * width)
+    hole = shapely.box(minx + 0.4 * width, miny + 0.4 * width,
+                       minx + 0.6 * width, miny + 0.6 * width)
+    data = geopandas.GeoDataFrame(
+        {"kind": ["b", "a"]},
+        geometry=[outer.difference(hole), shapely.box(minx, miny, minx + 0.2 * width,
+                                                      miny + 0.2 * width)],
+        crs="EPSG:3857",
+    )
+    layer = TileLayer(data, column="kind", cmap="tab10", cache_dir=tmp_path)
+    image = layer.render(12, 2074, 1409).reshape(-1, 4)
+    centers = _pixel_centers(bounds, layer.tile_size)
+    expected = np.zeros_like(image)
+    x, y = shapely.get_coordinates(centers).T
+    for i, geometry in enumerate(data.geometry):
+        # Later features are painted over earlier ones.
+        expected[shapely.contains_xy(geometry, x, y)] = layer.colors[i]
+    np.testing.assert_array_equal(image, expected)
+    assert layer.style["categories"] == ["a", "b"]
+
+
+def test_render_points_counts(trees, tmp_path):
+    layer = TileLayer(trees, column="species", cache_dir=tmp_path)
+    z, x, y = 14, 8299, 5636
+    image = layer.render(z, x, y)
+
+    coords = shapely.get_coordinates(trees.to_crs(MERCATOR).geometry.values)
+    minx, miny, maxx, maxy = tile_bounds(z, x, y)
+    counts, _, _ = np.histogram2d(
+        maxy - coords[:, 1], coords[:, 0] - minx, bins=layer.tile_size,
+        range=[[0, maxy - miny], [0, maxx - minx]],
+    )
+    assert counts.sum() > 0
+    # Pixels with a tree (of a known species) are drawn, the others not.
+    species = trees["species"].notna().to_numpy()
+    with_species, _, _ = np.histogram2d(
+        maxy - coords[species, 1], coords[species, 0] - minx,
+        bins=layer.tile_size, range=[[0, maxy - miny], [0, maxx - minx]],
+    )
+    np.testing.assert_array_equal(image[..., 3] > 0, with_species > 0)
+
+    density = TileLayer(trees, saturation=4, cache_dir=tmp_path).render(z, x, y)
+    alpha = np.round(255 * np.minimum(np.log1p(counts) / np.log1p(4), 1))
+    np.testing.assert_array_equal(density[..., 3], alpha)
+
+
+def test_tile_cache(districts, tmp_path):
+    layer = TileLayer(districts, column="district_name", cache_dir=tmp_path)
+    path = layer.path(13, 4149, 2818)
+    assert path.exists() and path.is_relative_to(tmp_path)
+    np.testing.assert_array_equal(layer.tile(13, 4149, 2818),
+                                  layer.render(13, 4149, 2818))
+    other = TileLayer(districts, column="population", cache_dir=tmp_path)
+    assert other.cache_dir != layer.cache_dir
+
+    image, extent = layer.image(z=12)
+    assert image.shape[2] == 4 and image.shape[0] % 256 == 0
+    assert extent[0] <= layer.data.total_bounds[0]
+
+
+def test_mixed_geometry_types(districts):
+    mixed = districts.assign(geometry=districts.geometry.boundary)
+    with pytest.raises(ValueError, match="polygon or point"):
+        TileLayer(mixed)